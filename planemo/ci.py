@@ -8,6 +8,7 @@ import os
 
 from planemo import git
 from planemo import io
+from planemo.ci_index import dependency_index
 from planemo.shed import SHED_CONFIG_NAME
 
 
@@ -20,9 +21,15 @@ def filter_paths(ctx, raw_paths, path_type="repo", **kwds):
 
     filter_kwds = copy.deepcopy(kwds)
     changed_in_commit_range = kwds.get("changed_in_commit_range", None)
+    unique_paths = sorted(set(map(lambda p: os.path.relpath(p, cwd), raw_paths)))
+    filtered_paths = io.filter_paths(unique_paths, cwd=cwd, **filter_kwds)
+
     diff_paths = None
     if changed_in_commit_range is not None:
         diff_files = git.diff(ctx, cwd, changed_in_commit_range)
+        # Also select paths depending on changed files outside of them (shared
+        # macros, test data, data tables, .shed.yml includes).
+        index = dependency_index(ctx, cwd)
         if path_type == "repo":
             diff_dirs = set(os.path.dirname(p) for p in diff_files)
             diff_paths = set()
@@ -32,12 +39,12 @@ def filter_paths(ctx, raw_paths, path_type="repo", **kwds):
                         diff_paths.add(diff_dir)
                         break
                     diff_dir = os.path.dirname(diff_dir)
+            diff_paths.update(index.affected_repositories(ctx, filtered_paths, diff_files))
         else:
-            diff_paths = diff_files
+            diff_paths = set(diff_files)
+            diff_paths.update(index.affected_tools(filtered_paths, diff_files))
+        index.save()
         diff_paths = sorted(diff_paths)
-
-    unique_paths = sorted(set(map(lambda p: os.path.relpath(p, cwd), raw_paths)))
-    filtered_paths = io.filter_paths(unique_paths, cwd=cwd, **filter_kwds)
     if diff_paths is not None:
         new_filtered_paths = []
         for path in filtered_paths:
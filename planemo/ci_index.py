@@ -0,0 +1,262 @@
+"""Reverse index from files to the tools and repositories depending on them.
+
+A tool depends on its own file, imported macro files (recursively), test
+data referenced by its tests, the data table configurations and ``.loc``
+files for data tables it uses and the ``.shed.yml`` publishing it. Test data
+and data table configurations are looked for where ``planemo test`` looks for
+them - next to the tool and in the working directory. A shed repository
+depends on every file its ``.shed.yml`` includes and on the dependencies of
+the tools among them.
+
+Parsing tools is the expensive part, so dependencies are persisted per tool
+along with the modification times of the files involved and only recomputed
+once one of those files changes.
+"""
+import hashlib
+import json
+import os
+from xml.etree import ElementTree
+
+from galaxy.tools.loader import load_tool_with_refereces
+from galaxy.tools.loader_directory import looks_like_a_tool
+
+from planemo.io import write_json_file
+from planemo.shed import (
+    find_raw_repositories,
+    SHED_CONFIG_NAME,
+)
+
+INDEX_VERSION = 2
+TEST_DATA_DIRECTORY = "test-data"
+TEST_DATA_ATTRIBUTES = ["value", "file"]
+DATA_TABLE_CONF_NAME = "tool_data_table_conf.xml.sample"
+DATA_TABLE_TEST_CONF_NAME = "tool_data_table_conf.xml.test"
+
+
+class FileDependencyIndex(object):
+    """Map files below ``root`` to the tools and repositories using them.
+
+    Paths returned are relative to ``root`` as are relative paths passed in
+    (git reports changed files that way). If ``cache_path`` is set, tool
+    dependencies are loaded from and saved to that JSON file.
+    """
+
+    def __init__(self, root, cache_path=None):
+        self.root = os.path.abspath(root)
+        self.cache_path = cache_path
+        self._tools = self._load()
+
+    def tool_dependencies(self, tool_path):
+        """Return set of files the tool at ``tool_path`` depends on."""
+        key = self._relative(tool_path)
+        entry = self._tools.get(key, None)
+        if entry is None or not self._is_current(entry):
+            files = _tool_dependencies(self._absolute(key), self.root)
+            entry = {"files": dict((f, self._mtime(f)) for f in map(self._relative, files))}
+            entry["files"][key] = self._mtime(key)
+            self._tools[key] = entry
+        return set(entry["files"].keys())
+
+    def repository_dependencies(self, ctx, repository_path):
+        """Return set of files the shed repository at ``repository_path`` depends on."""
+        key = self._relative(repository_path)
+        dependencies = set([os.path.join(key, SHED_CONFIG_NAME)])
+        kwds = {"recursive": False, "fail_fast": False}
+        for raw_repository in find_raw_repositories(ctx, [self._absolute(key)], **kwds):
+            if isinstance(raw_repository, Exception):
+                continue
+            for source in raw_repository.source_files():
+                dependencies.add(self._relative(source))
+                if _looks_like_a_tool(source):
+                    dependencies.update(self.tool_dependencies(source))
+        return dependencies
+
+    def affected_tools(self, tool_paths, changed_files):
+        """Return those of ``tool_paths`` depending on any of ``changed_files``."""
+        changed = set(self._relative(f) for f in changed_files)
+        return set(p for p in tool_paths if self.tool_dependencies(p) & changed)
+
+    def affected_repositories(self, ctx, repository_paths, changed_files):
+        """Return those of ``repository_paths`` depending on any of ``changed_files``."""
+        changed = set(self._relative(f) for f in changed_files)
+        return set(p for p in repository_paths if self.repository_dependencies(ctx, p) & changed)
+
+    def save(self):
+        """Persist tool dependencies to ``cache_path`` (if set)."""
+        if self.cache_path is None:
+            return
+        write_json_file(
+            self.cache_path,
+            {"version": INDEX_VERSION, "root": self.root, "cwd": os.getcwd(), "tools": self._tools},
+        )
+
+    def _load(self):
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                index = json.load(f)
+        except (OSError, IOError, ValueError):
+            return {}
+        # Dependencies found in the working directory depend on it as well.
+        if (index.get("version") != INDEX_VERSION or index.get("root") != self.root or
+                index.get("cwd") != os.getcwd()):
+            return {}
+        return index.get("tools", {})
+
+    def _is_current(self, entry):
+        return all(self._mtime(f) == mtime for f, mtime in entry["files"].items())
+
+    def _mtime(self, path):
+        try:
+            return os.path.getmtime(self._absolute(path))
+        except OSError:
+            return None
+
+    def _relative(self, path):
+        # Relative paths are relative to root.
+        path = os.path.join(self.root, path)
+        return os.path.normpath(os.path.relpath(path, self.root))
+
+    def _absolute(self, path):
+        return os.path.join(self.root, path)
+
+
+def dependency_index(ctx, root):
+    """Return :class:`FileDependencyIndex` for ``root`` cached in ``ctx``'s workspace."""
+    root = os.path.abspath(root)
+    root_hash = hashlib.sha1(root.encode("utf-8")).hexdigest()[:8]
+    cache_path = os.path.join(ctx.cache_directory, "ci_index", "%s.json" % root_hash)
+    return FileDependencyIndex(root, cache_path=cache_path)
+
+
+def _tool_dependencies(tool_path, root):
+    dependencies = set()
+    if os.path.islink(tool_path):
+        dependencies.add(os.path.realpath(tool_path))
+    tool_directory = os.path.dirname(tool_path)
+    shed_config = _find_upwards(tool_directory, root, SHED_CONFIG_NAME)
+    if shed_config is not None:
+        dependencies.add(shed_config)
+    if not tool_path.endswith(".xml"):
+        return dependencies
+
+    try:
+        tree, macro_paths = load_tool_with_refereces(tool_path)
+    except Exception:
+        # Unparsable tools only depend on themselves, linting reports them.
+        return dependencies
+    dependencies.update(macro_paths)
+    tool = tree.getroot()
+
+    search_directories = _search_directories(tool_directory, root)
+    dependencies.update(_test_data_dependencies(tool, search_directories))
+
+    table_names = set()
+    for element in tool.iter():
+        table_name = element.get("from_data_table", None)
+        if table_name:
+            table_names.add(table_name)
+    if table_names:
+        dependencies.update(_data_table_dependencies(tool_directory, root, search_directories, table_names))
+    return dependencies
+
+
+def _search_directories(tool_directory, root):
+    # Where planemo looks for test artifacts (see search_tool_path_for in
+    # planemo.test.data): the tool's directory, then the working directory.
+    directories = [os.path.abspath(tool_directory)]
+    cwd = os.getcwd()
+    if cwd not in directories and (cwd == root or cwd.startswith(root + os.sep)):
+        directories.append(cwd)
+    return directories
+
+
+def _test_data_dependencies(tool, search_directories):
+    dependencies = set()
+    test_data_directories = [os.path.join(d, TEST_DATA_DIRECTORY) for d in search_directories]
+    for tests in tool.findall("tests"):
+        for element in tests.iter():
+            for attribute in TEST_DATA_ATTRIBUTES:
+                value = element.get(attribute, None)
+                if not value:
+                    continue
+                # Missing files are recorded too, adding them affects the tool.
+                # Non-file parameter values end up here as well, harmlessly.
+                for test_data_directory in test_data_directories:
+                    dependencies.add(os.path.join(test_data_directory, value))
+    return dependencies
+
+
+def _data_table_conf_paths(tool_directory, root, search_directories):
+    # Test Galaxy prefers a .test data table configuration (also searched for
+    # in test-data) over a .sample one, shed repositories ship the latter at
+    # their root.
+    test_data_directories = [os.path.join(d, TEST_DATA_DIRECTORY) for d in search_directories]
+    paths = [os.path.join(d, DATA_TABLE_TEST_CONF_NAME) for d in search_directories + test_data_directories]
+    paths.extend(os.path.join(d, DATA_TABLE_CONF_NAME) for d in search_directories)
+    shed_conf_path = _find_upwards(tool_directory, root, DATA_TABLE_CONF_NAME)
+    if shed_conf_path is not None and shed_conf_path not in paths:
+        paths.append(shed_conf_path)
+    return paths
+
+
+def _data_table_dependencies(tool_directory, root, search_directories, table_names):
+    conf_paths = _data_table_conf_paths(tool_directory, root, search_directories)
+    # Missing configurations are recorded too, adding one affects the tool.
+    dependencies = set(conf_paths)
+    for conf_path in conf_paths:
+        if os.path.isfile(conf_path):
+            dependencies.update(_loc_file_dependencies(conf_path, table_names))
+    return dependencies
+
+
+def _loc_file_dependencies(conf_path, table_names):
+    dependencies = set()
+    conf_directory = os.path.dirname(conf_path)
+    try:
+        tables = ElementTree.parse(conf_path).getroot()
+    except Exception:
+        return dependencies
+    for table in tables.findall("table"):
+        if table.get("name") not in table_names:
+            continue
+        for file_element in table.findall("file"):
+            loc_path = file_element.get("path", None)
+            if not loc_path:
+                continue
+            loc_path = loc_path.replace("${__HERE__}", conf_directory)
+            # Shed repositories ship tool-data/<name>.loc.sample files.
+            candidates = [
+                os.path.join(conf_directory, loc_path),
+                os.path.join(conf_directory, loc_path + ".sample"),
+                os.path.join(conf_directory, "tool-data", os.path.basename(loc_path) + ".sample"),
+            ]
+            for candidate in candidates:
+                if os.path.isfile(candidate):
+                    dependencies.add(candidate)
+    return dependencies
+
+
+def _find_upwards(directory, root, name):
+    directory = os.path.abspath(directory)
+    while True:
+        candidate = os.path.join(directory, name)
+        if os.path.isfile(candidate):
+            return candidate
+        if directory == root or os.path.dirname(directory) == directory:
+            return None
+        directory = os.path.dirname(directory)
+
+
+def _looks_like_a_tool(path):
+    try:
+        return looks_like_a_tool(path, enable_beta_formats=True)
+    except IOError:
+        return False
+
+
+__all__ = (
+    "dependency_index",
+    "FileDependencyIndex",
+)
@@ -100,6 +100,12 @@ class Context(object):
         path = os.path.join(self.workspace, "profiles")
         return self._ensure_directory(path, "Galaxy profiles")
 
+    @property
+    def cache_directory(self):
+        """Create and return a directory for caching downloads and indices."""
+        path = os.path.join(self.workspace, "cache")
+        return self._ensure_directory(path, "cache")
+
     def _ensure_directory(self, path, name):
         if not os.path.exists(path):
             os.makedirs(path)
@@ -115,9 +121,7 @@ class Context(object):
         raise ExitCodeException(exit_code)
 
     def cache_download(self, url, destination):
-        cache = os.path.join(self.workspace, "cache")
-        if not os.path.exists(cache):
-            os.makedirs(cache)
+        cache = self.cache_directory
         filename = os.path.basename(url)
         cache_destination = os.path.join(cache, filename)
         if not os.path.exists(cache_destination):
@@ -0,0 +1,142 @@
+"""Module describing the planemo ``benchmark`` command."""
+import json
+
+import click
+
+from planemo import options
+from planemo.cli import command_function
+from planemo.engine import engine_context
+from planemo.exit_codes import (
+    EXIT_CODE_GENERIC_FAILURE,
+    EXIT_CODE_NO_SUCH_TARGET,
+    EXIT_CODE_OK,
+)
+from planemo.io import info, warn
+from planemo.runnable import (
+    for_paths,
+    RunnableType,
+)
+from planemo.test.benchmark import (
+    BENCHMARK_METRICS,
+    compare_to_baseline,
+    DEFAULT_REPETITIONS,
+    parse_regression_thresholds,
+)
+from planemo.test.metrics import format_metric
+
+
+def _regression_thresholds(ctx, param, value):
+    try:
+        return parse_regression_thresholds(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+@click.command('benchmark')
+@options.optional_tools_arg(multiple=True)
+@click.option(
+    "--repetitions",
+    type=click.IntRange(min=1),
+    default=DEFAULT_REPETITIONS,
+    help="Number of times to run each test case.",
+)
+@click.option(
+    "--benchmark_output",
+    type=click.Path(file_okay=True, dir_okay=False, resolve_path=True),
+    default="benchmark.json",
+    help="Write benchmark results (every run and statistics over them) to this JSON file.",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, resolve_path=True),
+    default=None,
+    help="Benchmark results JSON of a previous run to compare against.",
+)
+@click.option(
+    "--regression_threshold",
+    multiple=True,
+    default=["wall_seconds=0.25"],
+    callback=_regression_thresholds,
+    help=("METRIC=FRACTION - report a regression if the median of METRIC "
+          "(wall_seconds or a job metric such as runtime_seconds, "
+          "cpu_seconds or memory_peak_bytes) grew by more than FRACTION of "
+          "the baseline median. May be specified multiple times."),
+)
+@options.galaxy_target_options()
+@options.galaxy_config_options()
+@options.engine_options()
+@command_function
+def cli(ctx, paths, **kwds):
+    """Run test cases repeatedly and compare timings against a baseline.
+
+    Each test case of the specified tools or workflows (by default those in
+    the current working directory) is run ``--repetitions`` times with a
+    single Galaxy instance (or cwltool). Wall time and Galaxy job metrics of
+    every run are recorded along with their median and percentiles in
+    ``--benchmark_output``.
+
+    If a ``--baseline`` (the benchmark output of a previous run) is supplied,
+    medians are compared against it and planemo exits with a non-zero code
+    if any grew by more than its ``--regression_threshold``.
+
+    \b
+        % planemo benchmark --benchmark_output baseline.json bwa.xml
+        % planemo benchmark --baseline baseline.json bwa.xml
+    """
+    runnables = for_paths(paths)
+    is_cwl = all([r.type in [RunnableType.cwl_tool, RunnableType.cwl_workflow] for r in runnables])
+    if kwds.get("engine", None) is None:
+        kwds["engine"] = "galaxy" if not is_cwl else "cwltool"
+
+    with engine_context(ctx, **kwds) as engine:
+        benchmark = engine.benchmark(runnables, kwds["repetitions"])
+
+    with open(kwds["benchmark_output"], "w") as f:
+        json.dump(benchmark, f)
+
+    tests = benchmark["tests"]
+    if not tests:
+        warn("No test cases found to benchmark.")
+        ctx.exit(EXIT_CODE_NO_SUCH_TARGET)
+
+    exit_code = EXIT_CODE_OK
+    for test in tests:
+        _summarize_benchmark_test(test)
+        if test["num_failures"]:
+            warn("Test [%s] failed in %d of %d run(s)." % (test["id"], test["num_failures"], len(test["runs"])))
+            exit_code = EXIT_CODE_GENERIC_FAILURE
+
+    baseline_path = kwds.get("baseline", None)
+    if baseline_path:
+        with open(baseline_path, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(benchmark, baseline, kwds["regression_threshold"])
+        for regression in regressions:
+            warn("Performance regression for test [%s]: median %s went from %s to %s (+%.0f%%)." % (
+                regression.test_id,
+                regression.metric,
+                format_metric(regression.metric, regression.baseline),
+                format_metric(regression.metric, regression.current),
+                regression.change * 100,
+            ))
+        if regressions:
+            exit_code = EXIT_CODE_GENERIC_FAILURE
+        else:
+            info("No performance regressions against baseline %s." % baseline_path)
+    ctx.exit(exit_code)
+
+
+def _summarize_benchmark_test(test):
+    click.echo("%s:" % test["id"])
+    for key, title in BENCHMARK_METRICS:
+        statistics = test["statistics"].get(key, None)
+        if statistics is None:
+            continue
+        click.echo("| %s: median %s (p90 %s, p95 %s, min %s, max %s)" % (
+            title.lower(),
+            format_metric(key, statistics["median"]),
+            format_metric(key, statistics["p90"]),
+            format_metric(key, statistics["p95"]),
+            format_metric(key, statistics["min"]),
+            format_metric(key, statistics["max"]),
+        ))
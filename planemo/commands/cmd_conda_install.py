@@ -4,7 +4,13 @@ from galaxy.tools.deps import conda_util
 
 from planemo import options
 from planemo.cli import command_function
-from planemo.conda import build_conda_context, collect_conda_targets
+from planemo.conda import (
+    build_conda_context,
+    collect_conda_target_sets,
+    collect_conda_targets,
+    CondaEnvironmentStore,
+    install_conda_target_sets,
+)
 from planemo.io import coalesce_return_codes
 
 
@@ -14,10 +20,25 @@ from planemo.io import coalesce_return_codes
 @options.conda_target_options()
 @options.conda_global_option()
 @options.conda_auto_init_option()
+@click.option(
+    "--batch",
+    is_flag=True,
+    default=False,
+    help=("Group requirements by tool and solve each unique requirement set "
+          "once into an environment named as Galaxy's Conda resolver expects, "
+          "skipping environments that already exist. With --global all "
+          "requirements are installed in a single transaction."),
+)
+@options.jobs_option(help="Number of Conda environments to create concurrently in --batch mode.")
+@options.conda_env_store_option()
 @command_function
 def cli(ctx, paths, **kwds):
     """Install conda packages for tool requirements."""
     conda_context = build_conda_context(ctx, handle_auto_init=True, **kwds)
+    if kwds.get("batch", False):
+        return_codes = _batch_install(ctx, conda_context, paths, **kwds)
+        return coalesce_return_codes(return_codes, assert_at_least_one=True)
+
     return_codes = []
     for conda_target in collect_conda_targets(ctx, paths, recursive=kwds["recursive"]):
         ctx.log("Install conda target %s" % conda_target)
@@ -26,3 +47,21 @@ def cli(ctx, paths, **kwds):
         )
         return_codes.append(return_code)
     return coalesce_return_codes(return_codes, assert_at_least_one=True)
+
+
+def _batch_install(ctx, conda_context, paths, **kwds):
+    conda_target_sets = collect_conda_target_sets(ctx, paths, recursive=kwds["recursive"])
+    if not conda_target_sets:
+        return []
+
+    if kwds.get("global", False):
+        conda_targets = set([])
+        for conda_target_set in conda_target_sets:
+            conda_targets.update(conda_target_set)
+        ctx.log("Install conda targets %s" % ", ".join(map(str, conda_targets)))
+        return [conda_util.install_conda_targets(list(conda_targets), conda_context=conda_context)]
+
+    env_store = None
+    if kwds.get("conda_env_store", False):
+        env_store = CondaEnvironmentStore(ctx, conda_context)
+    return install_conda_target_sets(ctx, conda_target_sets, conda_context, jobs=kwds.get("jobs", 1), env_store=env_store)
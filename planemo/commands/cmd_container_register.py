@@ -14,10 +14,12 @@ from planemo.conda import (
 )
 from planemo.git import add, branch, commit, push
 from planemo.github_util import clone_fork_branch, get_repository_object, pull_request
+from planemo.io import map_concurrently
 from planemo.mulled import conda_to_mulled_targets
 
 REGISTERY_TARGET_NAME = "multi-package-containers"
 REGISTERY_TARGET_PATH = "combinations"
+REGISTERY_TARGET_TAG = "0"
 REGISTERY_REPOSITORY = "BioContainers/multi-package-containers"
 DEFAULT_MESSAGE = "Add container $hash.\n**Hash**: $hash\n\n**Packages**:\n$packages\n\n**For** :\n$tools\n\nGenerated with Planemo."
 
@@ -56,6 +58,7 @@ DEFAULT_MESSAGE = "Add container $hash.\n**Hash**: $hash\n\n**Packages**:\n$pack
     default=False,
     help="Force push branch for pull request in case it already exists.",
 )
+@options.jobs_option(help="Number of best-practice channel and quay.io lookups to run concurrently.")
 @command_function
 def cli(ctx, paths, **kwds):
     """Register multi-requirement containers as needed.
@@ -67,40 +70,58 @@ def cli(ctx, paths, **kwds):
     """
     registry_target = RegistryTarget(ctx, **kwds)
     conda_context = build_conda_context(ctx, **kwds)
+    jobs = kwds.get("jobs", 1)
 
-    combinations_added = 0
+    combinations = []
     conda_targets_list, tool_paths_list = collect_conda_target_lists_and_tool_paths(ctx, paths, recursive=kwds["recursive"])
     for conda_targets, tool_paths in zip(conda_targets_list, tool_paths_list):
         ctx.vlog("Handling conda_targets [%s]" % conda_targets)
         mulled_targets = conda_to_mulled_targets(conda_targets)
-        mulled_targets_str = "- " + "\n- ".join(map(conda_build_target_str, mulled_targets))
         if len(mulled_targets) < 2:
             ctx.vlog("Skipping registeration, fewer than 2 targets discovered.")
             # Skip these for now, we will want to revisit this for conda-forge dependencies and such.
             continue
-
-        best_practice_requirements = True
-        for conda_target in conda_targets:
-            best_hit, exact = best_practice_search(conda_target, conda_context=conda_context)
-            if not best_hit or not exact:
+        combinations.append((conda_targets, tool_paths, mulled_targets))
+
+    # Resolve each unique target once - many tools share requirements.
+    unique_conda_targets = set([])
+    for conda_targets, _, _ in combinations:
+        unique_conda_targets.update(conda_targets)
+    unique_conda_targets = sorted(unique_conda_targets, key=str)
+
+    def best_practice_available(conda_target):
+        best_hit, exact = best_practice_search(conda_target, conda_context=conda_context)
+        return bool(best_hit and exact)
+
+    available = dict(zip(unique_conda_targets, map_concurrently(best_practice_available, unique_conda_targets, jobs=jobs)))
+    registered_names = registry_target.registered_names()
+
+    missing = []
+    for conda_targets, tool_paths, mulled_targets in combinations:
+        unavailable = [t for t in conda_targets if not available[t]]
+        if unavailable:
+            for conda_target in unavailable:
                 ctx.vlog("Target [%s] is not available in best practice channels - skipping" % conda_target)
-                best_practice_requirements = False
-
-        if not best_practice_requirements:
             continue
 
         name = v2_image_name(mulled_targets)
-        tag = "0"
-        name_and_tag = "%s-%s" % (name, tag)
-        target_filename = os.path.join(registry_target.output_directory, "%s.tsv" % name_and_tag)
-        ctx.vlog("Target filename for registeration is [%s]" % target_filename)
-        if os.path.exists(target_filename):
-            ctx.vlog("Target file already exists, skipping")
+        if name in registered_names:
+            ctx.vlog("Target file for [%s] already exists, skipping" % name)
             continue
+        # Multiple tools may share a combination - only register it once.
+        registered_names.add(name)
+        missing.append((name, tool_paths, mulled_targets))
+
+    namespace = kwds["mulled_namespace"]
 
-        namespace = kwds["mulled_namespace"]
-        repo_data = quay_repository(namespace, name)
-        if "tags" in repo_data:
+    def quay_repository_exists(name):
+        return "tags" in quay_repository(namespace, name)
+
+    quay_exists = map_concurrently(quay_repository_exists, [name for name, _, _ in missing], jobs=jobs)
+
+    combinations_added = 0
+    for (name, tool_paths, mulled_targets), exists in zip(missing, quay_exists):
+        if exists:
             ctx.vlog("quay repository already exists, skipping")
             continue
 
@@ -108,7 +129,10 @@ def cli(ctx, paths, **kwds):
             ctx.vlog("Found matching open pull request for [%s], skipping" % name)
             continue
 
+        target_filename = registry_target.target_filename(name)
+        ctx.vlog("Target filename for registeration is [%s]" % target_filename)
         registry_target.write_targets(ctx, target_filename, mulled_targets)
+        mulled_targets_str = "- " + "\n- ".join(map(conda_build_target_str, mulled_targets))
         tools_str = "\n".join(map(lambda p: "- " + os.path.basename(p), tool_paths))
         registry_target.handle_pull_request(ctx, name, target_filename, mulled_targets_str, tools_str, **kwds)
         combinations_added += 1
@@ -138,6 +162,19 @@ class RegistryTarget(object):
         self.output_directory = output_directory
         self.target_repository = target_repository
 
+    def target_filename(self, name):
+        return os.path.join(self.output_directory, "%s-%s.tsv" % (name, REGISTERY_TARGET_TAG))
+
+    def registered_names(self):
+        """Return set of image names with a registration file in the output directory."""
+        suffix = "-%s.tsv" % REGISTERY_TARGET_TAG
+        names = set([])
+        if os.path.isdir(self.output_directory):
+            for filename in os.listdir(self.output_directory):
+                if filename.endswith(suffix):
+                    names.add(filename[:-len(suffix)])
+        return names
+
     def has_pull_request_for(self, name):
         has_pr = False
         if self.do_pull_request:
@@ -41,6 +41,7 @@ from planemo.tool_lint import lint_tools_on_path
     default=False,
     help="Check best practice BioContainer namespaces for a container definition applicable for this tool.",
 )
+@options.biocontainer_tag_options()
 # @click.option(
 # "--verify",
 # is_flag=True,
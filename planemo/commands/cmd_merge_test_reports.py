@@ -0,0 +1,65 @@
+"""Module describing the planemo ``merge_test_reports`` command."""
+import json
+
+import click
+
+from planemo import io
+from planemo import options
+from planemo.cli import command_function
+from planemo.galaxy.test import handle_reports_and_summary
+from planemo.reports.xunit_handler import write_test_xunit
+from planemo.test.results import (
+    DEFAULT_MERGE_POLICY,
+    MERGE_POLICIES,
+    merge_structured_data,
+)
+
+
+@click.command('merge_test_reports')
+@click.argument(
+    'input_paths',
+    metavar="INPUT_PATHS",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, resolve_path=True),
+    nargs=-1,
+    required=True,
+)
+@click.argument(
+    'output_path',
+    metavar="OUTPUT_PATH",
+    type=click.Path(file_okay=True, dir_okay=False, resolve_path=True),
+)
+@click.option(
+    "--merge_policy",
+    type=click.Choice(MERGE_POLICIES),
+    default=DEFAULT_MERGE_POLICY,
+    help=("How to choose between results for a test found in several input "
+          "files - the result from the 'last' file or the first unsuccessful "
+          "result ('first_failure')."),
+)
+@options.test_report_options()
+@click.option(
+    "--test_output_xunit",
+    type=click.Path(file_okay=True, resolve_path=True),
+    help="Output merged test report (xUnit style - for computers).",
+    default=None,
+)
+@options.test_summary_option()
+@command_function
+def cli(ctx, input_paths, output_path, **kwds):
+    """Merge tool_test_output.json files from several test runs.
+
+    Combine the structured test results of test runs split across CI chunks
+    or machines into OUTPUT_PATH, recomputing the summary, and produce
+    reports in various formats (HTML, text, markdown, xUnit) from the
+    combined results.
+    """
+    structured_data = merge_structured_data(input_paths, policy=kwds["merge_policy"])
+    with open(output_path, "w") as f:
+        json.dump(structured_data.structured_data, f)
+    io.info("Merged %d tests from %d files into %s." % (
+        structured_data.num_tests, len(input_paths), output_path
+    ))
+    if kwds.get("test_output_xunit", None):
+        write_test_xunit(structured_data.structured_data, kwds["test_output_xunit"])
+    exit_code = handle_reports_and_summary(ctx, structured_data.structured_data, kwds=kwds)
+    ctx.exit(exit_code)
@@ -1,10 +1,14 @@
 """Module describing the planemo ``mull`` command."""
 import click
-from galaxy.tools.deps.mulled.mulled_build import mull_targets
 
 from planemo import options
 from planemo.cli import command_function
-from planemo.mulled import build_mull_target_kwds, collect_mulled_target_lists
+from planemo.io import coalesce_return_codes
+from planemo.mulled import (
+    build_mull_target_kwds,
+    collect_mulled_target_lists,
+    mull_target_lists,
+)
 
 
 @click.command('mull')
@@ -12,6 +16,14 @@ from planemo.mulled import build_mull_target_kwds, collect_mulled_target_lists
 @options.recursive_option()
 @options.mulled_options()
 @options.conda_ensure_channels_option()
+@click.option(
+    "--skip_existing/--no_skip_existing",
+    is_flag=True,
+    default=True,
+    help=("Skip building images that already exist for the local Docker daemon "
+          "(ignored if --mulled_command pushes images)."),
+)
+@options.jobs_option(help="Number of containers to build concurrently.")
 @command_function
 def cli(ctx, paths, **kwds):
     """Build containers for specified tools.
@@ -26,7 +38,14 @@ def cli(ctx, paths, **kwds):
     This can be verified by running ``planemo lint --conda_requirements`` on the
     target tool(s).
     """
-    for mulled_targets in collect_mulled_target_lists(ctx, paths, recursive=kwds["recursive"]):
-        mull_target_kwds = build_mull_target_kwds(ctx, **kwds)
-        command = kwds["mulled_command"]
-        mull_targets(mulled_targets, command=command, **mull_target_kwds)
+    mulled_target_lists = collect_mulled_target_lists(ctx, paths, recursive=kwds["recursive"])
+    mull_target_kwds = build_mull_target_kwds(ctx, **kwds)
+    return_codes = mull_target_lists(
+        ctx,
+        mulled_target_lists,
+        command=kwds["mulled_command"],
+        jobs=kwds["jobs"],
+        skip_existing=kwds["skip_existing"],
+        **mull_target_kwds
+    )
+    ctx.exit(coalesce_return_codes(return_codes))
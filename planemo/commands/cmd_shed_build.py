@@ -20,7 +20,10 @@ def cli(ctx, path, **kwds):
     (which you could upload to the Tool Shed manually).
     """
     def build(realized_repository):
-        tarpath = shed.build_tarball(realized_repository.path)
+        tarpath = shed.build_tarball(
+            realized_repository.real_path,
+            files=realized_repository.file_sources(),
+        )
         outpath = realized_repository.real_path + ".tar.gz"
         shutil.move(tarpath, outpath)
         print("Created: %s" % (outpath))
@@ -7,6 +7,10 @@ from planemo import options
 from planemo import shed
 from planemo.cli import command_function
 from planemo.io import info
+from planemo.shed.planner import (
+    CREATE,
+    RepositoryPlanner,
+)
 
 
 @click.command("shed_create")
@@ -20,11 +24,17 @@ def cli(ctx, paths, **kwds):
     This will read the settings from the ``.shed.yml`` file.
     """
     shed_context = shed.get_shed_context(ctx, **kwds)
+    planner = RepositoryPlanner(
+        ctx,
+        shed_context,
+        update_metadata=False,
+        upload=not kwds["skip_upload"],
+    )
 
     def create(realized_repository):
-        repo_id = realized_repository.find_repository_id(ctx, shed_context)
-        if repo_id is None:
-            if realized_repository.create(ctx, shed_context):
+        plan = planner.plan_for(realized_repository)
+        if CREATE in plan.actions:
+            if planner.create(realized_repository):
                 info("Repository created")
                 if not kwds["skip_upload"]:
                     return shed.upload_repository(
@@ -37,5 +47,5 @@ def cli(ctx, paths, **kwds):
         else:
             return 1
 
-    exit_code = shed.for_each_repository(ctx, create, paths, **kwds)
+    exit_code = shed.for_each_repository(ctx, create, paths, planner=planner.plan, **kwds)
     sys.exit(exit_code)
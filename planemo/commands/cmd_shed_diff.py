@@ -2,6 +2,7 @@
 import shutil
 import sys
 import tempfile
+import threading
 from xml.sax.saxutils import escape
 
 import click
@@ -11,6 +12,7 @@ from planemo import shed
 from planemo.cli import command_function
 from planemo.io import captured_io_for_xunit
 from planemo.reports.xunit_handler import handle_report_xunit_kwd
+from planemo.shed.diff import DIFF_FORMATS
 
 
 @click.command("shed_diff")
@@ -34,6 +36,14 @@ from planemo.reports.xunit_handler import handle_report_xunit_kwd
     help="Do not attempt smart diff of XML to filter out attributes "
          "populated by the Tool Shed.",
 )
+@click.option(
+    "--diff_format",
+    type=click.Choice(DIFF_FORMATS),
+    default="diff",
+    help="Format of diff output - 'diff' (like diff -r), 'unified' (like "
+         "diff -ru) or 'json' (one JSON object per repository describing "
+         "the paths, sizes and digests of files that differ).",
+)
 @options.report_xunit()
 @command_function
 def cli(ctx, paths, **kwds):
@@ -80,8 +90,11 @@ def cli(ctx, paths, **kwds):
         'suitename': 'shed_diff',
         'tests': [],
     }
+    # Repositories may be diffed concurrently (--jobs).
+    collected_data_lock = threading.Lock()
 
     def diff(realized_repository):
+        diff_kwds = kwds.copy()
 
         # We create a temporary redirection from kwds's
         # output to our tempfile. This lets us capture the
@@ -90,11 +103,11 @@ def cli(ctx, paths, **kwds):
         diff_output = tempfile.NamedTemporaryFile(mode='r')
         user_requested_output = kwds.get('output', None)
         # Replace their output handle with ours
-        kwds['output'] = diff_output.name
+        diff_kwds['output'] = diff_output.name
 
         captured_io = {}
         with captured_io_for_xunit(kwds, captured_io):
-            result = shed.diff_repo(ctx, realized_repository, **kwds)
+            result = shed.diff_repo(ctx, realized_repository, **diff_kwds)
 
         # May be extraneous but just want to ensure entire file is written
         # before a copy is made.
@@ -110,47 +123,48 @@ def cli(ctx, paths, **kwds):
         diff_output_contents = diff_output.read()
         diff_output.close()
 
-        # Collect data about what happened
-        collected_data['results']['total'] += 1
-        xunit_case = {
-            'name': 'shed-diff',
-            'classname': realized_repository.name,
-            'time': captured_io["time"],
-            'stdout': captured_io["stdout"],
-            'stderr': captured_io["stderr"],
-        }
-        if result >= 200:
-            collected_data['results']['errors'] += 1
-            xunit_case.update({
-                'errorType': 'DiffError',
-                'errorMessage': 'Error diffing repositories',
-                'errorContent': escape(diff_output_contents),
+        with collected_data_lock:
+            # Collect data about what happened
+            collected_data['results']['total'] += 1
+            xunit_case = {
+                'name': 'shed-diff',
+                'classname': realized_repository.name,
                 'time': captured_io["time"],
-            })
-        elif result > 2:
-            collected_data['results']['failures'] += 1
-            xunit_case.update({
-                'errorType': 'PlanemoDiffError',
-                'errorMessage': 'Planemo error diffing repositories',
-                'errorContent': escape(diff_output_contents),
-            })
-        elif result == 2:
-            collected_data['results']['failures'] += 1
-            xunit_case.update({
-                'errorType': 'RepoDoesNotExist',
-                'errorMessage': 'Target Repository does not exist',
-                'errorContent': escape(diff_output_contents),
-            })
-        elif result == 1:
-            collected_data['results']['failures'] += 1
-            xunit_case.update({
-                'errorType': 'Different',
-                'errorMessage': 'Repository is different',
-                'errorContent': escape(diff_output_contents),
-            })
-
-        # Append our xunit test case
-        collected_data['tests'].append(xunit_case)
+                'stdout': captured_io["stdout"],
+                'stderr': captured_io["stderr"],
+            }
+            if result >= 200:
+                collected_data['results']['errors'] += 1
+                xunit_case.update({
+                    'errorType': 'DiffError',
+                    'errorMessage': 'Error diffing repositories',
+                    'errorContent': escape(diff_output_contents),
+                    'time': captured_io["time"],
+                })
+            elif result > 2:
+                collected_data['results']['failures'] += 1
+                xunit_case.update({
+                    'errorType': 'PlanemoDiffError',
+                    'errorMessage': 'Planemo error diffing repositories',
+                    'errorContent': escape(diff_output_contents),
+                })
+            elif result == 2:
+                collected_data['results']['failures'] += 1
+                xunit_case.update({
+                    'errorType': 'RepoDoesNotExist',
+                    'errorMessage': 'Target Repository does not exist',
+                    'errorContent': escape(diff_output_contents),
+                })
+            elif result == 1:
+                collected_data['results']['failures'] += 1
+                xunit_case.update({
+                    'errorType': 'Different',
+                    'errorMessage': 'Repository is different',
+                    'errorContent': escape(diff_output_contents),
+                })
+
+            # Append our xunit test case
+            collected_data['tests'].append(xunit_case)
 
         return result
 
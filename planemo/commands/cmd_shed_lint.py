@@ -9,6 +9,7 @@ from planemo.cli import command_function
 
 @click.command('shed_lint')
 @options.shed_realization_options()
+@options.shed_jobs_option()
 @options.report_level_option()
 @options.fail_level_option()
 @options.click.option(
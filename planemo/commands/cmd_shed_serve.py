@@ -16,6 +16,7 @@ from planemo.galaxy import shed_serve
 @options.galaxy_config_options()
 @options.pid_file_option()
 @options.daemon_option()
+@options.install_jobs_option()
 @click.option(
     "--skip_dependencies",
     is_flag=True,
@@ -15,6 +15,7 @@ from planemo.galaxy.test import run_in_config
 @options.shed_read_options()
 @options.galaxy_target_options()
 @options.test_options()
+@options.install_jobs_option()
 @click.option(
     "--skip_dependencies",
     is_flag=True,
@@ -1,5 +1,6 @@
 """Module describing the planemo ``shed_update`` command."""
 import sys
+import threading
 
 import click
 
@@ -12,6 +13,11 @@ from planemo.io import (
     info,
 )
 from planemo.reports.xunit_handler import handle_report_xunit_kwd
+from planemo.shed.planner import (
+    CREATE,
+    RepositoryPlanner,
+    UPDATE_METADATA,
+)
 
 
 @click.command("shed_update")
@@ -20,6 +26,7 @@ from planemo.reports.xunit_handler import handle_report_xunit_kwd
 @options.shed_upload_options()
 @options.shed_skip_upload()
 @options.shed_skip_metadata()
+@options.shed_skip_unchanged_metadata()
 @command_function
 def cli(ctx, paths, **kwds):
     """Update Tool Shed repository.
@@ -65,20 +72,44 @@ def cli(ctx, paths, **kwds):
         'tests': [],
     }
 
+    # Repositories may be updated concurrently (--jobs).
+    collected_data_lock = threading.Lock()
+
+    def collect(repo_result, outcome=None):
+        with collected_data_lock:
+            collected_data['results']['total'] += 1
+            if outcome is not None:
+                collected_data['results'][outcome] += 1
+            collected_data['tests'].append(repo_result)
+
     shed_context = shed.get_shed_context(ctx, **kwds)
+    skip_upload = kwds["skip_upload"]
+    skip_metadata = kwds["skip_metadata"]
+    planner = RepositoryPlanner(
+        ctx,
+        shed_context,
+        create=kwds.get("force_repository_creation", False),
+        update_metadata=not skip_metadata,
+        upload=not skip_upload,
+        skip_unchanged_metadata=kwds.get("skip_unchanged_metadata", False),
+    )
 
     def update(realized_repository):
-        collected_data['results']['total'] += 1
-        skip_upload = kwds["skip_upload"]
-        skip_metadata = kwds["skip_metadata"]
         upload_ret_code = 0
         upload_ok = True
 
+        plan = planner.plan_for(realized_repository)
+        if CREATE in plan.actions:
+            planner.create(realized_repository)
+        # Creation (if requested) has been attempted above.
+        upload_kwds = kwds.copy()
+        upload_kwds["force_repository_creation"] = False
+
         captured_io = {}
         if not skip_upload:
             with captured_io_for_xunit(kwds, captured_io):
                 upload_ret_code = shed.upload_repository(
-                    ctx, realized_repository, **kwds
+                    ctx, realized_repository, **upload_kwds
                 )
                 upload_ok = not upload_ret_code
 
@@ -92,13 +123,12 @@ def cli(ctx, paths, **kwds):
 
         # Now that we've uploaded (or skipped appropriately), collect results.
         if upload_ret_code == 2:
-            collected_data['results']['failures'] += 1
             message = "Failed to update repository '%s' as it does not exist on the %s." % (realized_repository.name, shed_context.label)
             repo_result.update({
                 'errorType': 'FailedUpdate',
                 'errorMessage': message,
             })
-            collected_data['tests'].append(repo_result)
+            collect(repo_result, 'failures')
             error(message)
             return upload_ret_code
 
@@ -106,23 +136,17 @@ def cli(ctx, paths, **kwds):
         metadata_ok = True
         repository_destination_label = "repository '%s' on the %s" % (realized_repository.name, shed_context.label)
         if not skip_metadata:
-            repo_id = shed.handle_force_create(realized_repository, ctx, shed_context, **kwds)
-            # failing to create the repo, give up
-            if repo_id is None:
-                exit = shed.report_non_existent_repository(realized_repository)
-                metadata_ok = False
-                error("Failed to update metadata for %s." % repository_destination_label)
-            else:
-                metadata_ok = realized_repository.update(ctx, shed_context, repo_id)
-                if metadata_ok:
-                    info("Repository metadata updated successfully for %s." % repository_destination_label)
+            exit, metadata_ok = _update_metadata(
+                ctx, shed_context, planner, plan, realized_repository, repository_destination_label
+            )
         else:
             info("Skipping metadata update for %s" % repository_destination_label)
 
+        outcome = None
         if metadata_ok and upload_ok:
             pass
         elif upload_ok:
-            collected_data['results']['skips'] += 1
+            outcome = 'skips'
             repo_result.update({
                 'errorType': 'FailedMetadata',
                 'errorMessage': 'Failed to update repository metadata',
@@ -131,7 +155,7 @@ def cli(ctx, paths, **kwds):
                 error("Repository contents updated but failed to update metadata for %s." % repository_destination_label)
             exit = exit or 1
         else:
-            collected_data['results']['failures'] += 1
+            outcome = 'failures'
             repo_result.update({
                 'errorType': 'FailedUpdate',
                 'errorMessage': 'Failed to update repository',
@@ -141,11 +165,27 @@ def cli(ctx, paths, **kwds):
             else:
                 error("Failed to update repository contents and metadata for %s." % repository_destination_label)
             exit = exit or 1
-        collected_data['tests'].append(repo_result)
+        collect(repo_result, outcome)
         return exit
 
-    exit_code = shed.for_each_repository(ctx, update, paths, **kwds)
+    exit_code = shed.for_each_repository(ctx, update, paths, planner=planner.plan, **kwds)
 
     handle_report_xunit_kwd(kwds, collected_data)
 
     sys.exit(exit_code)
+
+
+def _update_metadata(ctx, shed_context, planner, plan, realized_repository, label):
+    repo_id = realized_repository.find_repository_id(ctx, shed_context)
+    # failing to create the repo, give up
+    if repo_id is None:
+        exit = shed.report_non_existent_repository(realized_repository)
+        error("Failed to update metadata for %s." % label)
+        return exit, False
+    if UPDATE_METADATA not in plan.actions:
+        info("Repository metadata already up to date for %s." % label)
+        return 0, True
+    metadata_ok = planner.update_metadata(realized_repository, repo_id)
+    if metadata_ok:
+        info("Repository metadata updated successfully for %s." % label)
+    return 0, metadata_ok
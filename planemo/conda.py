@@ -6,13 +6,15 @@ The extend Galaxy/galaxy-lib's features with planemo specific idioms.
 from __future__ import absolute_import
 
 import collections
+import hashlib
 import os
 import threading
+import time
 
 from galaxy.tools.deps import conda_util
 
 from planemo.exit_codes import EXIT_CODE_FAILED_DEPENDENCIES, ExitCodeException
-from planemo.io import error, shell
+from planemo.io import error, info, map_concurrently, shell, warn
 from planemo.tools import yield_tool_sources_on_paths
 
 MESSAGE_ERROR_FAILED_INSTALL = "Attempted to install conda and failed."
@@ -131,6 +133,208 @@ def collect_conda_target_lists_and_tool_paths(ctx, paths, recursive=False, found
     return conda_target_lists, conda_target_tool_paths
 
 
+def collect_conda_target_sets(ctx, paths, recursive=False):
+    """Load the unique non-empty lists of CondaTargets required by supplied sources.
+
+    Each tool contributes the list of its requirements and package strings
+    (e.g. ``samtools=1.3,bwa``) one list each. Lists are tuples kept in
+    declaration order - the order Galaxy's Conda resolver hashes to name the
+    environment (see :func:`conda_environment_name`).
+    """
+    conda_target_sets = []
+    seen = set()
+
+    def add(conda_targets):
+        conda_targets = tuple(conda_targets)
+        if conda_targets and conda_targets not in seen:
+            seen.add(conda_targets)
+            conda_target_sets.append(conda_targets)
+
+    real_paths = []
+    for path in paths:
+        if not os.path.exists(path):
+            add(target_str_to_targets(path))
+        else:
+            real_paths.append(path)
+
+    for (tool_path, tool_source) in yield_tool_sources_on_paths(ctx, real_paths, recursive=recursive, yield_load_errors=False):
+        add(tool_source_conda_targets(tool_source))
+    return sorted(conda_target_sets, key=conda_environment_name)
+
+
+def conda_environment_name(conda_targets):
+    """Return the name Galaxy's Conda resolver uses for an environment of these targets.
+
+    ``conda_targets`` must be ordered as the tool declares its requirements,
+    Galaxy hashes them in that order.
+    """
+    conda_targets = list(conda_targets)
+    if len(conda_targets) > 1:
+        return "mulled-v1-%s" % conda_util.hash_conda_packages(conda_targets)
+    else:
+        assert len(conda_targets) == 1
+        return conda_targets[0].install_environment
+
+
+class CondaEnvironmentStore(object):
+    """Workspace-level store of reusable Conda environments.
+
+    For each unique requirement set an explicit-spec lockfile (``conda list
+    --explicit``) is recorded once its environment has been solved, keyed by
+    the environment name Galaxy's Conda resolver uses (see
+    :func:`conda_environment_name`) so that lockfiles recorded by one planemo
+    process are found by later ones. Missing environments are recreated from
+    these lockfiles without running the Conda solver.
+
+    The store also provides a directory for Galaxy's cached dependency manager
+    (``tool_dependency_cache_dir``) so per-tool job environments built by one
+    test Galaxy are reused by the next instead of being rebuilt inside each new
+    config directory. Everything is kept per ``conda_prefix`` since
+    environments link against that prefix's package cache.
+    """
+
+    def __init__(self, ctx, conda_context):
+        self.conda_context = conda_context
+        prefix_hash = hashlib.sha1(os.path.abspath(conda_context.conda_prefix).encode("utf-8")).hexdigest()[:8]
+        self.directory = os.path.join(ctx.workspace, "conda_env_store", prefix_hash)
+
+    @property
+    def lockfile_directory(self):
+        return self._ensure_directory("locks")
+
+    @property
+    def cache_directory(self):
+        return self._ensure_directory("cache")
+
+    def lockfile_path(self, env_name):
+        return os.path.join(self.lockfile_directory, "%s.txt" % env_name)
+
+    def has_lockfile(self, env_name):
+        return os.path.exists(self.lockfile_path(env_name))
+
+    def restore(self, env_name):
+        """Create environment from its lockfile, return process exit code.
+
+        If that fails (e.g. a channel no longer serves a pinned package) the
+        partially created environment and the stale lockfile are removed.
+        """
+        lockfile_path = self.lockfile_path(env_name)
+        exit_code = self.conda_context.exec_create([
+            "--name", env_name,
+            "--file", lockfile_path,
+        ])
+        if exit_code != 0:
+            warn("Failed to restore conda environment %s from lockfile %s." % (env_name, lockfile_path))
+            conda_util.cleanup_failed_install_of_environment(env_name, conda_context=self.conda_context)
+            if os.path.exists(lockfile_path):
+                os.remove(lockfile_path)
+        return exit_code
+
+    def install(self, env_name, conda_targets):
+        """Create environment from its lockfile or else by solving ``conda_targets``.
+
+        A lockfile is recorded for newly solved environments. Return process
+        exit code.
+        """
+        if self.has_lockfile(env_name) and self.restore(env_name) == 0:
+            return 0
+        exit_code = conda_util.install_conda_targets(
+            list(conda_targets), conda_context=self.conda_context, env_name=env_name
+        )
+        if exit_code == 0:
+            self.record(env_name)
+        return exit_code
+
+    def record(self, env_name):
+        """Write lockfile for an existing environment, return process exit code."""
+        lockfile_path = self.lockfile_path(env_name)
+        temp_path = "%s.%d.tmp" % (lockfile_path, os.getpid())
+        exit_code = self.conda_context.exec_command(
+            "list", ["--name", env_name, "--explicit"], stdout_path=temp_path
+        )
+        if exit_code == 0:
+            os.rename(temp_path, lockfile_path)
+        elif os.path.exists(temp_path):
+            os.remove(temp_path)
+        return exit_code
+
+    def restore_all(self, ctx, conda_target_sets):
+        """Recreate missing environments that have lockfiles.
+
+        Environments that fail to restore are left for Galaxy to resolve, with
+        their lockfiles removed so :meth:`record_all` records them again.
+        """
+        return_codes = []
+        for conda_targets in conda_target_sets:
+            env_name = conda_environment_name(conda_targets)
+            if self.conda_context.has_env(env_name) or not self.has_lockfile(env_name):
+                continue
+            ctx.vlog("Restoring conda environment %s from lockfile" % env_name)
+            return_codes.append(self.restore(env_name))
+        return return_codes
+
+    def record_all(self, ctx, conda_target_sets):
+        """Record lockfiles for existing environments lacking one."""
+        for conda_targets in conda_target_sets:
+            env_name = conda_environment_name(conda_targets)
+            if not self.conda_context.has_env(env_name) or self.has_lockfile(env_name):
+                continue
+            ctx.vlog("Recording lockfile for conda environment %s" % env_name)
+            self.record(env_name)
+
+    def _ensure_directory(self, name):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        return path
+
+
+def install_conda_target_sets(ctx, conda_target_sets, conda_context, jobs=1, env_store=None):
+    """Solve and create one environment per unique set of CondaTargets.
+
+    Environments are named as Galaxy's Conda resolver would name them, ones that
+    already exist are skipped, and up to ``jobs`` environments are created
+    concurrently (all sharing the package cache of ``conda_context``). If a
+    :class:`CondaEnvironmentStore` is supplied, environments with a lockfile are
+    recreated from it without solving (falling back to solving if that fails)
+    and lockfiles are recorded for newly solved environments. Per environment install times are reported once all
+    installs are finished.
+
+    Return a list of process exit codes (i.e. 0 in case of success).
+    """
+    pending = []
+    for conda_targets in conda_target_sets:
+        env_name = conda_environment_name(conda_targets)
+        if conda_context.has_env(env_name):
+            ctx.vlog("Conda environment %s for [%s] already exists, skipping" % (env_name, _targets_str(conda_targets)))
+            continue
+        pending.append((env_name, conda_targets))
+
+    def install(env_and_targets):
+        env_name, conda_targets = env_and_targets
+        ctx.log("Install conda environment %s for [%s]" % (env_name, _targets_str(conda_targets)))
+        start = time.time()
+        if env_store is not None:
+            return_code = env_store.install(env_name, conda_targets)
+        else:
+            return_code = conda_util.install_conda_targets(
+                list(conda_targets), conda_context=conda_context, env_name=env_name
+            )
+        if return_code != 0:
+            conda_util.cleanup_failed_install_of_environment(env_name, conda_context=conda_context)
+        return return_code, time.time() - start
+
+    results = map_concurrently(install, pending, jobs=jobs)
+    for (env_name, conda_targets), (return_code, duration) in zip(pending, results):
+        status = "ok" if return_code == 0 else "failed (exit code %d)" % return_code
+        info("%s [%s] %.1fs %s" % (env_name, _targets_str(conda_targets), duration, status))
+    return [return_code for (return_code, _) in results]
+
+
+def _targets_str(conda_targets):
+    return ",".join(sorted(t.package_specifier for t in conda_targets))
+
+
 def tool_source_conda_targets(tool_source):
     """Load CondaTarget object from supplied abstract tool source."""
     requirements, _ = tool_source.parse_requirements_and_containers()
@@ -162,5 +366,9 @@ __all__ = (
     "collect_conda_targets",
     "collect_conda_target_lists",
     "collect_conda_target_lists_and_tool_paths",
+    "collect_conda_target_sets",
+    "conda_environment_name",
+    "CondaEnvironmentStore",
+    "install_conda_target_sets",
     "tool_source_conda_targets",
 )
@@ -28,10 +28,12 @@ class GalaxyEngine(BaseEngine):
         RunnableType.galaxy_tool
     ]
 
+    _served_config = None
+
     def _run(self, runnable, job_path):
         """Run CWL job in Galaxy."""
         self._ctx.vlog("Serving artifact [%s] with Galaxy." % (runnable,))
-        with self.ensure_runnables_served([runnable]) as config:
+        with self._runnables_served([runnable]) as config:
             self._ctx.vlog("Running job path [%s]" % job_path)
             run_response = execute(self._ctx, config, runnable, job_path, **self._kwds)
 
@@ -41,12 +43,30 @@ class GalaxyEngine(BaseEngine):
     def ensure_runnables_served(self, runnables):
         """Use a context manager and describe Galaxy instance with runnables being served."""
 
+    @contextlib.contextmanager
+    def serving(self, runnables):
+        """Serve ``runnables`` with one Galaxy for all runs within the ``with`` block."""
+        with self.ensure_runnables_served(runnables) as config:
+            self._served_config = config
+            try:
+                yield config
+            finally:
+                self._served_config = None
+
+    @contextlib.contextmanager
+    def _runnables_served(self, runnables):
+        if self._served_config is not None:
+            yield self._served_config
+        else:
+            with self.ensure_runnables_served(runnables) as config:
+                yield config
+
     def _run_test_case(self, test_case):
         if hasattr(test_case, "job_path"):
             # Simple file-based job path.
             return super(GalaxyEngine, self)._run_test_case(test_case)
         else:
-            with self.ensure_runnables_served([test_case.runnable]) as config:
+            with self._runnables_served([test_case.runnable]) as config:
                 galaxy_interactor_kwds = {
                     "galaxy_url": config.galaxy_url,
                     "master_api_key": config.master_api_key,
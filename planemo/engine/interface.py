@@ -1,9 +1,11 @@
 """Module contianing the :class:`Engine` abstraction."""
 
 import abc
+import contextlib
 import json
 import os
 import tempfile
+import time
 
 from planemo.exit_codes import EXIT_CODE_UNSUPPORTED_FILE_TYPE
 from planemo.io import error
@@ -11,6 +13,15 @@ from planemo.runnable import (
     cases,
     for_path,
 )
+from planemo.test.benchmark import (
+    benchmark_data,
+    run_data,
+)
+from planemo.test.logs import (
+    DEFAULT_INLINE_LIMIT,
+    log_store,
+)
+from planemo.test.metrics import add_job_metrics
 from planemo.test.results import StructuredData
 
 
@@ -76,10 +87,17 @@ class BaseEngine(Engine):
         """Test runnable artifacts (workflow or tool)."""
         self._check_can_run_all(runnables)
         test_cases = [t for tl in map(cases, runnables) for t in tl]
-        test_results = self._collect_test_results(test_cases)
+        store = log_store(
+            self._kwds.get("test_output_json", None),
+            self._kwds.get("test_output_log_limit", DEFAULT_INLINE_LIMIT),
+        )
         tests = []
-        for (test_case, run_response) in test_results:
-            test_case_data = test_case.structured_test_data(run_response)
+        # Reduce each response to its structured data as soon as it is
+        # available so complete logs are not all held at once.
+        for (test_case, run_response) in self._iter_test_results(test_cases):
+            test_case_data = add_job_metrics(test_case.structured_test_data(run_response))
+            if store is not None:
+                store.externalize_test(test_case_data)
             tests.append(test_case_data)
         test_data = {
             'version': '0.1',
@@ -89,8 +107,40 @@ class BaseEngine(Engine):
         structured_results.calculate_summary_data()
         return structured_results
 
-    def _collect_test_results(self, test_cases):
-        test_results = []
+    def benchmark(self, runnables, repetitions):
+        """Run test cases of runnable artifacts ``repetitions`` times.
+
+        Return benchmark data (see :mod:`planemo.test.benchmark`) with the
+        wall time and job metrics of each run.
+        """
+        self._check_can_run_all(runnables)
+        test_cases = [t for tl in map(cases, runnables) for t in tl]
+        test_ids = [None] * len(test_cases)
+        test_runs = [[] for _ in test_cases]
+        with self.serving(runnables):
+            for repetition in range(repetitions):
+                for index, test_case in enumerate(test_cases):
+                    self._ctx.vlog(
+                        "Benchmarking %s (run %d of %d)" % (test_case, repetition + 1, repetitions)
+                    )
+                    start = time.time()
+                    run_response = self._run_test_case(test_case)
+                    wall_seconds = time.time() - start
+                    test_case_data = add_job_metrics(test_case.structured_test_data(run_response))
+                    test_ids[index] = test_case_data["id"]
+                    test_runs[index].append(run_data(test_case_data, wall_seconds))
+        return benchmark_data(zip(test_ids, test_runs), repetitions)
+
+    @contextlib.contextmanager
+    def serving(self, runnables):
+        """Keep whatever serves ``runnables`` up for runs within the ``with`` block.
+
+        Engines that start a server for each run override this to start it
+        once, by default this does nothing.
+        """
+        yield
+
+    def _iter_test_results(self, test_cases):
         for test_case in test_cases:
             self._ctx.vlog(
                 "Running tests %s" % test_case
@@ -101,8 +151,7 @@ class BaseEngine(Engine):
                 test_case,
                 run_response,
             )
-            test_results.append((test_case, run_response))
-        return test_results
+            yield (test_case, run_response)
 
     def _run_test_case(self, test_case):
         runnable = test_case.runnable
@@ -0,0 +1,174 @@
+"""Content fingerprints of files and directories for keying caches.
+
+Fingerprints are git blob hashes. For files tracked and unmodified in a git
+work tree they are read from the index - a single ``git ls-files`` call per
+repository - so large test data is never read. Other files are hashed and
+the hash is reused for as long as their modification time and size stay the
+same (across invocations if a ``cache_path`` is supplied and
+:meth:`Fingerprinter.save` is called).
+
+Directory fingerprints combine the relative paths and fingerprints of the
+files below them.
+"""
+import hashlib
+import json
+import os
+import threading
+import weakref
+
+from planemo import git
+from planemo.io import write_json_file
+from planemo.walker import DirectoryWalker
+
+FINGERPRINTS_VERSION = 1
+READ_CHUNK_SIZE = 64 * 1024
+# Symbolic links and submodules are hashed as git stores them, not by content.
+_GIT_FILE_MODES = ["100644", "100755"]
+
+_fingerprinters = weakref.WeakKeyDictionary()
+_fingerprinters_lock = threading.Lock()
+
+
+class Fingerprinter(object):
+    """Compute and memoize file and directory fingerprints."""
+
+    def __init__(self, ctx=None, cache_path=None, walker=None):
+        self.ctx = ctx
+        self.cache_path = cache_path
+        self.walker = walker or DirectoryWalker()
+        self._lock = threading.Lock()
+        self._git_roots = {}
+        self._tracked = {}
+        self._directories = {}
+        self._hashes = self._load()
+
+    def path_fingerprint(self, path):
+        """Return fingerprint of the file at ``path``."""
+        path = os.path.realpath(path)
+        tracked = self._tracked_hash(path)
+        if tracked is not None:
+            return tracked
+        return self._content_hash(path)
+
+    def directory_fingerprint(self, path):
+        """Return fingerprint of the files below directory ``path``."""
+        path = os.path.realpath(path)
+        with self._lock:
+            fingerprint = self._directories.get(path, None)
+        if fingerprint is not None:
+            return fingerprint
+        digest = hashlib.sha1()
+        for file_path in self.walker.files(path):
+            relative_path = os.path.relpath(file_path, path)
+            digest.update(("%s\0%s\n" % (relative_path, self.path_fingerprint(file_path))).encode("utf-8"))
+        fingerprint = digest.hexdigest()
+        with self._lock:
+            self._directories[path] = fingerprint
+        return fingerprint
+
+    def save(self):
+        """Persist hashes of files read from disk to ``cache_path`` (if set)."""
+        if self.cache_path is None:
+            return
+        with self._lock:
+            hashes = dict(self._hashes)
+        write_json_file(self.cache_path, {"version": FINGERPRINTS_VERSION, "hashes": hashes})
+
+    def _tracked_hash(self, path):
+        root = self._git_root(os.path.dirname(path))
+        if root is None:
+            return None
+        with self._lock:
+            tracked = self._tracked.get(root, None)
+        if tracked is None:
+            tracked = _read_index(self.ctx, root)
+            with self._lock:
+                self._tracked[root] = tracked
+        return tracked.get(os.path.relpath(path, root), None)
+
+    def _git_root(self, directory):
+        with self._lock:
+            if directory in self._git_roots:
+                return self._git_roots[directory]
+        if os.path.exists(os.path.join(directory, ".git")):
+            root = directory
+        elif os.path.dirname(directory) == directory:
+            root = None
+        else:
+            root = self._git_root(os.path.dirname(directory))
+        with self._lock:
+            self._git_roots[directory] = root
+        return root
+
+    def _content_hash(self, path):
+        stat = os.stat(path)
+        key = [stat.st_mtime, stat.st_size]
+        with self._lock:
+            cached = self._hashes.get(path, None)
+        if cached is not None and cached[:2] == key:
+            return cached[2]
+        fingerprint = blob_hash(path, stat.st_size)
+        with self._lock:
+            self._hashes[path] = key + [fingerprint]
+        return fingerprint
+
+    def _load(self):
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                fingerprints = json.load(f)
+        except (OSError, IOError, ValueError):
+            return {}
+        if fingerprints.get("version") != FINGERPRINTS_VERSION:
+            return {}
+        return fingerprints.get("hashes", {})
+
+
+def fingerprinter(ctx):
+    """Return the :class:`Fingerprinter` shared by this command invocation.
+
+    Content hashes saved to ``ctx``'s cache directory by earlier invocations
+    are reused, callers must :meth:`Fingerprinter.save` it for hashes it
+    computes to be reused in turn.
+    """
+    with _fingerprinters_lock:
+        if ctx not in _fingerprinters:
+            cache_path = os.path.join(ctx.cache_directory, "fingerprints.json")
+            _fingerprinters[ctx] = Fingerprinter(ctx, cache_path=cache_path)
+        return _fingerprinters[ctx]
+
+
+def blob_hash(path, size=None):
+    """Return git blob hash of the file at ``path``."""
+    if size is None:
+        size = os.path.getsize(path)
+    digest = hashlib.sha1(("blob %d\0" % size).encode("ascii"))
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_index(ctx, root):
+    try:
+        files = git.ls_files(ctx, root)
+        modified = git.modified_files(ctx, root)
+    except RuntimeError:
+        # Not a usable git repository (or git is unavailable), hash contents.
+        return {}
+    tracked = {}
+    for path, (mode, object_hash) in files.items():
+        if mode in _GIT_FILE_MODES and path not in modified:
+            tracked[os.path.normpath(path)] = object_hash
+    return tracked
+
+
+__all__ = (
+    "blob_hash",
+    "Fingerprinter",
+    "fingerprinter",
+)
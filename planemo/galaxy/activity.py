@@ -62,16 +62,42 @@ def _inputs_representation(runnable):
     return inputs_representation
 
 
-def log_contents_str(config):
-    if hasattr(config, "log_contents"):
+def log_contents_str(config, offset=None, job_ids=None):
+    """Return text Galaxy logged since ``offset`` (see :func:`log_offset`).
+
+    If ``job_ids`` are supplied only records about those jobs are returned.
+    """
+    if hasattr(config, "log_contents_since"):
+        return config.log_contents_since(offset, job_ids=job_ids)
+    elif hasattr(config, "log_contents"):
         return config.log_contents
     else:
         return "No log for this engine type."
 
 
+def log_offset(config):
+    """Return marker of the current end of Galaxy's log (or None)."""
+    if hasattr(config, "log_offset"):
+        return config.log_offset()
+    return None
+
+
+def _job_log_ids(ctx, admin_gi, job_id):
+    # Galaxy logs jobs by their decoded id, which only an admin can look up.
+    try:
+        decode_url = admin_gi.config._make_url(module_id="decode/%s" % job_id)
+        decoded = Client._get(admin_gi.config, url=decode_url)["decoded_id"]
+    except Exception as e:
+        ctx.vlog("Failed to decode job id [%s], not filtering log: %s" % (job_id, e))
+        return None
+    return [job_id, decoded]
+
+
 def _execute(ctx, config, runnable, job_path, **kwds):
     user_gi = config.user_gi
     admin_gi = config.gi
+    start_log_offset = log_offset(config)
+    job_ids = None
 
     history_id = _history_id(user_gi, **kwds)
 
@@ -101,11 +127,12 @@ def _execute(ctx, config, runnable, job_path, **kwds):
             msg = "Failed to run CWL tool job final job state is [%s]." % final_state
             summarize_history(ctx, user_gi, history_id)
             with open("errored_galaxy.log", "w") as f:
-                f.write(log_contents_str(config))
+                f.write(log_contents_str(config, start_log_offset))
             raise Exception(msg)
 
         ctx.vlog("Final job state was ok, fetching details for job [%s]" % job_id)
-        job_info = admin_gi.jobs.show_job(job_id)
+        job_info = admin_gi.jobs.show_job(job_id, full_details=True)
+        job_ids = _job_log_ids(ctx, admin_gi, job_id)
         response_kwds = {
             'job_info': job_info,
             'api_run_response': tool_run_response,
@@ -148,7 +175,7 @@ def _execute(ctx, config, runnable, job_path, **kwds):
             msg = "Failed to run workflow final history state is [%s]." % final_state
             summarize_history(ctx, user_gi, history_id)
             with open("errored_galaxy.log", "w") as f:
-                f.write(log_contents_str(config))
+                f.write(log_contents_str(config, start_log_offset))
             raise Exception(msg)
         ctx.vlog("Final history state is 'ok'")
         response_kwds = {
@@ -164,7 +191,7 @@ def _execute(ctx, config, runnable, job_path, **kwds):
         user_gi=user_gi,
         history_id=history_id,
         galaxy_paths=galaxy_paths,
-        log=log_contents_str(config),
+        log=log_contents_str(config, start_log_offset, job_ids=job_ids),
         **response_kwds
     )
     output_directory = kwds.get("output_directory", None)
@@ -176,6 +203,7 @@ def _execute(ctx, config, runnable, job_path, **kwds):
 
 def stage_in(ctx, runnable, config, user_gi, history_id, job_path, **kwds):
     files_attached = [False]
+    start_log_offset = log_offset(config)
 
     def upload_func(upload_target):
 
@@ -278,7 +306,7 @@ def stage_in(ctx, runnable, config, user_gi, history_id, job_path, **kwds):
         msg = "Failed to run job final job state is [%s]." % final_state
         summarize_history(ctx, user_gi, history_id)
         with open("errored_galaxy.log", "w") as f:
-            f.write(log_contents_str(config))
+            f.write(log_contents_str(config, start_log_offset))
         raise Exception(msg)
 
     galaxy_paths = []
@@ -421,6 +449,8 @@ class GalaxyBaseRunResponse(SuccessfulRunResponse):
                 stdout=self._job_info["stdout"],
                 stderr=self._job_info["stderr"],
                 command_line=self._job_info["command_line"],
+                create_time=self._job_info.get("create_time", None),
+                job_metrics=self._job_info.get("job_metrics", None),
             )
         return None
 
@@ -20,6 +20,11 @@ from six import (
 from six.moves import shlex_quote
 
 from planemo import git
+from planemo.conda import (
+    build_conda_context,
+    collect_conda_target_sets,
+    CondaEnvironmentStore,
+)
 from planemo.config import OptionSource
 from planemo.deps import ensure_dependency_resolvers_conf_configured
 from planemo.docker import docker_host_args
@@ -42,6 +47,11 @@ from .api import (
 from .distro_tools import (
     DISTRO_TOOLS_ID_TO_PATH
 )
+from .installs import RepositoryInstallTracker
+from .logs import (
+    filter_job_lines,
+    GalaxyLogTail,
+)
 from .run import (
     DOWNLOAD_GALAXY,
     setup_common_startup_args,
@@ -86,8 +96,12 @@ SHED_DATA_MANAGER_CONF_TEMPLATE = """<?xml version="1.0"?>
 </data_managers>
 """
 
-EMPTY_JOB_METRICS_TEMPLATE = """<?xml version="1.0"?>
+# Runtime, cores and start time of every job, CPU time and peak memory where
+# cgroups are available - summarized in test results by planemo.test.metrics.
+JOB_METRICS_TEMPLATE = """<?xml version="1.0"?>
 <job_metrics>
+  <core />
+  <cgroup />
 </job_metrics>
 """
 
@@ -370,6 +384,7 @@ def local_galaxy_config(ctx, runnables, for_tests=False, **kwds):
 
         tool_dependency_dir = kwds.get("tool_dependency_dir") or config_join("deps")
         _ensure_directory(tool_dependency_dir)
+        conda_env_store, conda_target_sets = _setup_conda_env_store(ctx, tool_paths, kwds)
 
         shed_tool_conf = kwds.get("shed_tool_conf") or config_join("shed_tools_conf.xml")
         all_tool_paths = _all_tool_paths(runnables, **kwds)
@@ -448,6 +463,8 @@ def local_galaxy_config(ctx, runnables, for_tests=False, **kwds):
             test_data_dir=test_data_dir,  # TODO: make gx respect this
             shed_data_manager_config_file=shed_data_manager_config_file,
         ))
+        if conda_env_store is not None:
+            properties["tool_dependency_cache_dir"] = conda_env_store.cache_directory
         _handle_container_resolution(ctx, kwds, properties)
         write_file(config_join("logging.ini"), _sub(LOGGING_TEMPLATE, template_args))
         if not for_tests:
@@ -494,18 +511,39 @@ def local_galaxy_config(ctx, runnables, for_tests=False, **kwds):
 
         write_file(shed_data_manager_config_file, SHED_DATA_MANAGER_CONF_TEMPLATE)
 
-        yield LocalGalaxyConfig(
-            ctx,
-            config_directory,
-            env,
-            test_data_dir,
-            port,
-            server_name,
-            master_api_key,
-            runnables,
-            galaxy_root,
-            kwds,
-        )
+        try:
+            yield LocalGalaxyConfig(
+                ctx,
+                config_directory,
+                env,
+                test_data_dir,
+                port,
+                server_name,
+                master_api_key,
+                runnables,
+                galaxy_root,
+                kwds,
+            )
+        finally:
+            if conda_env_store is not None:
+                conda_env_store.record_all(ctx, conda_target_sets)
+
+
+def _setup_conda_env_store(ctx, tool_paths, kwds):
+    """Restore Conda environments for these tools from planemo's environment store.
+
+    Returns the store (or None if ``--conda_env_store`` is not enabled) and the
+    requirement sets to record lockfiles for once Galaxy is done.
+    """
+    if not kwds.get("conda_env_store", False):
+        return None, []
+    conda_context = build_conda_context(ctx, **kwds)
+    conda_env_store = CondaEnvironmentStore(ctx, conda_context)
+    tool_paths = [p for p in tool_paths if os.path.exists(p)]
+    conda_target_sets = collect_conda_target_sets(ctx, tool_paths)
+    if conda_context.is_installed():
+        conda_env_store.restore_all(ctx, conda_target_sets)
+    return conda_env_store, conda_target_sets
 
 
 def _all_tool_paths(runnables, **kwds):
@@ -623,8 +661,12 @@ class GalaxyInterface(object):
         """Return a admin bioblend tool shed client."""
 
     @abc.abstractmethod
-    def wait_for_all_installed(self):
-        """Wait for all queued up repositories installs to complete."""
+    def wait_for_all_installed(self, tracker=None):
+        """Wait for all queued up repositories installs to complete.
+
+        If supplied, ``tracker`` (a :class:`RepositoryInstallTracker`) is
+        updated with each status poll.
+        """
 
     @abc.abstractmethod
     def install_workflows(self):
@@ -660,6 +702,14 @@ class GalaxyConfig(GalaxyInterface):
     def log_contents(self):
         """Retrieve text of log for running Galaxy instance."""
 
+    @abc.abstractmethod
+    def log_offset(self):
+        """Return a marker of the current end of the log for :meth:`log_contents_since`."""
+
+    @abc.abstractmethod
+    def log_contents_since(self, offset, job_ids=None):
+        """Retrieve text logged since ``offset`` (only records about ``job_ids`` if set)."""
+
     @abc.abstractmethod
     def cleanup(self):
         """Cleanup allocated resources to run this instance."""
@@ -721,19 +771,13 @@ class BaseGalaxyConfig(GalaxyInterface):
     def tool_shed_client(self):
         return self.gi.toolShed
 
-    def wait_for_all_installed(self):
-        def status_ready(repo):
-            status = repo["status"]
-            if status in ["Installing", "New"]:
-                return None
-            if status == "Installed":
-                return True
-            raise Exception("Error installing repo status is %s" % status)
+    def wait_for_all_installed(self, tracker=None):
+        if tracker is None:
+            tracker = RepositoryInstallTracker()
 
         def ready():
             repos = self.tool_shed_client.get_repositories()
-            ready = all(map(status_ready, repos))
-            return ready or None
+            return tracker.update(repos)
 
         wait_on(ready, "galaxy tool installation", timeout=60 * 60 * 1)
 
@@ -799,6 +843,16 @@ class BaseManagedGalaxyConfig(BaseGalaxyConfig):
         self.port = port
         self.server_name = server_name
 
+    def log_offset(self):
+        # Logs are only available as a whole by default.
+        return None
+
+    def log_contents_since(self, offset, job_ids=None):
+        contents = self.log_contents
+        if job_ids:
+            contents = filter_job_lines(contents, job_ids)
+        return contents
+
 
 class DockerGalaxyConfig(BaseManagedGalaxyConfig):
     """A :class:`GalaxyConfig` description of a Dockerized Galaxy instance."""
@@ -966,6 +1020,12 @@ class LocalGalaxyConfig(BaseManagedGalaxyConfig):
         with open(self.log_file, "r") as f:
             return f.read()
 
+    def log_offset(self):
+        return GalaxyLogTail(self.log_file).offset()
+
+    def log_contents_since(self, offset, job_ids=None):
+        return GalaxyLogTail(self.log_file).read_since(offset, job_ids=job_ids)
+
     def cleanup(self):
         shutil.rmtree(self.config_directory, CLEANUP_IGNORE_ERRORS)
 
@@ -1345,7 +1405,7 @@ def _handle_container_resolution(ctx, kwds, galaxy_properties):
 
 def _handle_job_metrics(config_directory, kwds):
     metrics_conf = os.path.join(config_directory, "job_metrics_conf.xml")
-    open(metrics_conf, "w").write(EMPTY_JOB_METRICS_TEMPLATE)
+    open(metrics_conf, "w").write(JOB_METRICS_TEMPLATE)
     kwds["job_metrics_config_file"] = metrics_conf
 
 
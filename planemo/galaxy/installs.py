@@ -0,0 +1,86 @@
+"""Track Tool Shed repository installs into a Galaxy instance.
+
+Installs are submitted (possibly concurrently) through :meth:`submit` and the
+status of every repository - including repository dependencies Galaxy
+installs along the way - is then polled with a single API request per
+iteration via :meth:`update`.
+"""
+import threading
+import time
+
+from planemo.io import info
+
+PENDING_STATUSES = ["Installing", "New", "Cloning", "Setting tool versions",
+                    "Installing repository dependencies", "Installing tool dependencies",
+                    "Loading proprietary datatypes"]
+INSTALLED_STATUS = "Installed"
+
+
+class RepositoryInstallTracker(object):
+    """Record submission and completion times of repository installs."""
+
+    def __init__(self):
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+        self._submitted = {}
+        self._submit_durations = {}
+        self._installed = {}
+
+    def submit(self, owner, name, install):
+        """Call ``install()`` and record when the install was requested."""
+        key = (owner, name)
+        start = time.time()
+        with self._lock:
+            self._submitted.setdefault(key, start)
+        install()
+        with self._lock:
+            self._submit_durations[key] = time.time() - start
+
+    def update(self, repositories):
+        """Update from a Galaxy repository listing, return True once all are installed.
+
+        Return None while installs are pending and raise an exception if any
+        repository failed to install.
+        """
+        now = time.time()
+        all_installed = True
+        for repository in repositories:
+            status = repository["status"]
+            if status == INSTALLED_STATUS:
+                key = (repository["owner"], repository["name"])
+                with self._lock:
+                    if key not in self._installed:
+                        start = self._submitted.get(key, self.start_time)
+                        self._installed[key] = now - start
+            elif status in PENDING_STATUSES:
+                all_installed = False
+            else:
+                raise Exception("Error installing repo status is %s" % status)
+        return True if all_installed else None
+
+    def durations(self):
+        """Return list of ``(owner, name, seconds)`` for installed repositories."""
+        with self._lock:
+            return sorted((owner, name, duration) for (owner, name), duration in self._installed.items())
+
+    def report(self):
+        """Log time taken to install each repository."""
+        durations = self.durations()
+        with self._lock:
+            submit_durations = dict(self._submit_durations)
+        for owner, name, duration in durations:
+            submitted = submit_durations.get((owner, name), None)
+            if submitted is None:
+                info("Repository %s/%s installed in %.1f seconds (as a dependency)." % (owner, name, duration))
+            else:
+                info("Repository %s/%s installed in %.1f seconds (request took %.1f seconds)." % (
+                    owner, name, duration, submitted
+                ))
+        info("Installed %d repositories in %.1f seconds." % (
+            len(durations), time.time() - self.start_time
+        ))
+
+
+__all__ = (
+    "RepositoryInstallTracker",
+)
@@ -0,0 +1,81 @@
+"""Read segments of a growing Galaxy server log.
+
+Rather than reading the whole log each time one is needed (it grows for the
+life of a served Galaxy instance), callers record the log's current byte
+offset before a run with :meth:`GalaxyLogTail.offset` and later read just
+what was appended since with :meth:`GalaxyLogTail.read_since`.
+"""
+import io
+import os
+import re
+
+# Galaxy log records start with the logger name and level, anything else is
+# a continuation (e.g. traceback) of the previous record.
+RECORD_START = re.compile(r"^[\w.]+ (DEBUG|INFO|WARNING|ERROR|CRITICAL) ")
+
+
+class GalaxyLogTail(object):
+    """Read a Galaxy log file by byte offset."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def offset(self):
+        """Return current size of the log (where the next write goes)."""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def read_since(self, offset, job_ids=None):
+        """Return text appended to the log after ``offset``.
+
+        If the log has been truncated or replaced since ``offset`` was
+        recorded, it is read from the start. If ``job_ids`` are supplied only
+        records mentioning one of them are returned (see
+        :func:`filter_job_lines`).
+        """
+        if not os.path.exists(self.path):
+            return ""
+        with io.open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < (offset or 0):
+                offset = 0
+            f.seek(offset or 0)
+            text = f.read().decode("utf-8", "replace")
+        if job_ids:
+            text = filter_job_lines(text, job_ids)
+        return text
+
+
+def filter_job_lines(text, job_ids):
+    """Return log records of ``text`` mentioning any of ``job_ids``.
+
+    Galaxy logs jobs as ``(<id>)`` or ``(<id>/<external id>)`` and API
+    requests with encoded ids, so both decoded and encoded ids can be
+    supplied. Continuation lines are kept with their record.
+    """
+    patterns = []
+    for job_id in job_ids:
+        job_id = str(job_id)
+        if job_id.isdigit():
+            patterns.append(r"\(%s[)/]" % job_id)
+        else:
+            patterns.append(r"\b%s\b" % re.escape(job_id))
+    job_pattern = re.compile("|".join(patterns))
+    lines = []
+    keep = False
+    for line in text.splitlines(True):
+        if keep and not RECORD_START.match(line):
+            lines.append(line)
+            continue
+        keep = job_pattern.search(line) is not None
+        if keep:
+            lines.append(line)
+    return "".join(lines)
+
+
+__all__ = (
+    "filter_job_lines",
+    "GalaxyLogTail",
+)
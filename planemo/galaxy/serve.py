@@ -8,6 +8,7 @@ from planemo import io
 from planemo import network_util
 from .config import galaxy_config
 from .ephemeris_sleep import sleep
+from .installs import RepositoryInstallTracker
 from .run import (
     run_galaxy_command,
 )
@@ -72,14 +73,21 @@ def shed_serve(ctx, install_args_list, **kwds):
     with serve_daemon(ctx, **kwds) as config:
         install_deps = not kwds.get("skip_dependencies", False)
         io.info("Installing repositories - this may take some time...")
-        for install_args in install_args_list:
+        tracker = RepositoryInstallTracker()
+
+        def install(install_args):
             install_args["install_tool_dependencies"] = install_deps
             install_args["install_repository_dependencies"] = True
             install_args["new_tool_panel_section_label"] = "Shed Installs"
-            config.install_repo(
-                **install_args
+            tracker.submit(
+                install_args["owner"],
+                install_args["name"],
+                lambda: config.install_repo(**install_args),
             )
-        config.wait_for_all_installed()
+
+        io.map_concurrently(install, install_args_list, kwds.get("install_jobs", 1))
+        config.wait_for_all_installed(tracker=tracker)
+        tracker.report()
         yield config
 
 
@@ -17,6 +17,16 @@ from planemo.galaxy.run import (
 )
 from planemo.io import error, info, shell_join, warn
 from planemo.reports import build_report
+from planemo.test.logs import (
+    DEFAULT_INLINE_LIMIT,
+    log_store,
+)
+from planemo.test.metrics import (
+    DEFAULT_SLOWEST_COUNT,
+    format_metric,
+    METRICS,
+    slowest_tests,
+)
 from planemo.test.results import get_dict_value
 from . import structures as test_structures
 
@@ -98,11 +108,16 @@ def run_in_config(ctx, config, run=run_galaxy_command, **kwds):
         shell('cp -r "%s"/* "%s"' % update_cp_args)
 
     _check_test_outputs(xunit_report_file_tracker, structured_report_file_tracker)
+    store = log_store(
+        structured_report_file,
+        kwds.get("test_output_log_limit", DEFAULT_INLINE_LIMIT),
+    )
     test_results = test_structures.GalaxyTestResults(
         structured_report_file,
         xunit_report_file,
         html_report_file,
         return_code,
+        log_store=store,
     )
 
     structured_data = test_results.structured_data
@@ -163,10 +178,16 @@ def _handle_test_output_file(ctx, report_type, test_data, kwds):
         ctx.vlog(message)
         return
 
+    html_mode = kwds.get("test_output_html_mode", None) or build_report.DEFAULT_HTML_REPORT_MODE
+    slowest_count = kwds.get("summary_slowest", None)
+    if slowest_count is None:
+        slowest_count = DEFAULT_SLOWEST_COUNT
     try:
-        contents = build_report.build_report(
-            test_data, report_type=report_type
-        )
+        # Reports are streamed to the file as they are rendered.
+        if report_type == "html" and html_mode == "sharded":
+            build_report.write_sharded_html_report(test_data, path, slowest_count=slowest_count)
+        else:
+            build_report.write_report(test_data, path, report_type=report_type, slowest_count=slowest_count)
     except Exception:
         message = "Problem producing report file %s for %s" % (
             path, kwd_name
@@ -174,16 +195,6 @@ def _handle_test_output_file(ctx, report_type, test_data, kwds):
         ctx.vlog(message, exception=True)
         raise
 
-    try:
-        with open(path, 'w') as handle:
-            handle.write(contents)
-    except Exception:
-        message = "Problem writing output file %s for %s" % (
-            kwd_name, path
-        )
-        ctx.vlog(message, exception=True)
-        raise
-
 
 def _handle_summary(
     structured_data,
@@ -217,6 +228,10 @@ def _handle_summary(
             structured_data,
             **kwds
         )
+        _summarize_slowest_tests(
+            structured_data,
+            **kwds
+        )
 
     return summary_exit_code
 
@@ -230,6 +245,22 @@ def _summarize_tests_full(
         _summarize_test_case(test_case_data, **kwds)
 
 
+def _summarize_slowest_tests(structured_data, **kwds):
+    count = kwds.get("summary_slowest", None)
+    if count is None:
+        count = DEFAULT_SLOWEST_COUNT
+    tests = slowest_tests(structured_data, count)
+    if not tests:
+        return
+    click.echo("Slowest %d test(s):" % len(tests))
+    for test in tests:
+        test_id = test_structures.case_id(raw_id=test["id"])
+        metrics = test["data"]["job_metrics"]
+        described = ["%s %s" % (title.lower(), format_metric(key, metrics[key]))
+                     for key, title in METRICS if metrics.get(key, None) is not None]
+        click.echo("| %s: %s" % (test_id.label, ", ".join(described)))
+
+
 def passed(xunit_testcase_el):
     did_pass = True
     for child_el in list(xunit_testcase_el):
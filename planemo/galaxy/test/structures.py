@@ -9,6 +9,7 @@ from xml.etree import ElementTree as ET
 from six.moves import shlex_quote
 
 from planemo.io import error
+from planemo.test.metrics import add_tests_job_metrics
 from planemo.test.results import StructuredData as BaseStructuredData
 
 
@@ -64,8 +65,20 @@ class StructuredData(BaseStructuredData):
         super(StructuredData, self).__init__(json_path)
 
     def merge_xunit(self, xunit_root):
+        self._merge_xunit_summary(xunit_root.attrib)
+        for testcase_el in xunit_t_elements_from_root(xunit_root):
+            self._merge_xunit_testcase(testcase_el)
+
+    def merge_xunit_file(self, xunit_report_path):
+        """Like :meth:`merge_xunit` but stream test cases from the report file."""
+        for suite_attrib, testcase_el in iterparse_xunit_report(xunit_report_path):
+            if testcase_el is None:
+                self._merge_xunit_summary(suite_attrib)
+            else:
+                self._merge_xunit_testcase(testcase_el)
+
+    def _merge_xunit_summary(self, xunit_attrib):
         self.has_details = True
-        xunit_attrib = xunit_root.attrib
         num_tests = int(xunit_attrib.get("tests", 0))
         num_failures = int(xunit_attrib.get("failures", 0))
         num_errors = int(xunit_attrib.get("errors", 0))
@@ -79,29 +92,33 @@ class StructuredData(BaseStructuredData):
 
         self.structured_data["summary"] = summary
 
-        for testcase_el in xunit_t_elements_from_root(xunit_root):
-            test = case_id(testcase_el)
-            test_data = self.structured_data_by_id.get(test.id)
-            if not test_data:
-                continue
-            problem_el = None
-            for problem_type in ["skip", "failure", "error"]:
-                problem_el = testcase_el.find(problem_type)
-                if problem_el is not None:
-                    break
+    def _merge_xunit_testcase(self, testcase_el):
+        test = case_id(testcase_el)
+        test_data = self.structured_data_by_id.get(test.id)
+        if not test_data:
+            return
+        problem_el = None
+        for problem_type in ["skip", "failure", "error"]:
+            problem_el = testcase_el.find(problem_type)
             if problem_el is not None:
-                status = problem_el.tag
-                test_data["problem_type"] = problem_el.attrib["type"]
-                test_data["problem_log"] = problem_el.text
-            else:
-                status = "success"
-            test_data["status"] = status
+                break
+        if problem_el is not None:
+            status = problem_el.tag
+            test_data["problem_type"] = problem_el.attrib["type"]
+            test_data["problem_log"] = problem_el.text
+        else:
+            status = "success"
+        test_data["status"] = status
 
 
 class GalaxyTestResults(object):
     """ Class that combine the test-centric xunit output
     with the Galaxy centric structured data output - and
     abstracts away the difference (someday).
+
+    Job metrics Galaxy recorded are summarized for each test and, if a
+    :class:`planemo.test.logs.LogStore` is supplied, large logs are moved
+    out of the structured data before it is written back.
     """
 
     def __init__(
@@ -110,6 +127,7 @@ class GalaxyTestResults(object):
         output_xml_path,
         output_html_path,
         exit_code,
+        log_store=None,
     ):
         self.output_html_path = output_html_path
         sd = StructuredData(output_json_path)
@@ -118,11 +136,14 @@ class GalaxyTestResults(object):
         self.structured_data_tests = sd.structured_data_tests
         self.structured_data_by_id = sd.structured_data_by_id
 
-        self.xunit_tree = parse_xunit_report(output_xml_path)
-        sd.merge_xunit(self._xunit_root)
+        self.output_xml_path = output_xml_path
+        sd.merge_xunit_file(output_xml_path)
 
         self.sd.set_exit_code(exit_code)
         self.sd.read_summary()
+        add_tests_job_metrics(self.structured_data)
+        if log_store is not None:
+            log_store.externalize_tests(self.structured_data)
         self.sd.update()
 
     @property
@@ -141,6 +162,10 @@ class GalaxyTestResults(object):
     def num_problems(self):
         return self.sd.num_problems
 
+    @property
+    def xunit_tree(self):
+        return parse_xunit_report(self.output_xml_path)
+
     @property
     def _xunit_root(self):
         return self.xunit_tree.getroot()
@@ -163,6 +188,30 @@ def parse_xunit_report(xunit_report_path):
     return ET.parse(xunit_report_path)
 
 
+def iterparse_xunit_report(xunit_report_path):
+    """Stream ``(suite attributes, testcase element)`` pairs from an xunit report.
+
+    The first pair has a ``None`` element, each following pair a top-level
+    ``testcase`` element. Elements are discarded once the next one is read so
+    memory use does not grow with the number of test cases.
+    """
+    root = None
+    suite_attrib = None
+    depth = 0
+    for event, element in ET.iterparse(xunit_report_path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+                suite_attrib = dict(root.attrib)
+                yield suite_attrib, None
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1 and element.tag == "testcase":
+            yield suite_attrib, element
+            root.clear()
+
+
 def find_cases(xunit_root):
     return xunit_root.findall("testcase")
 
@@ -86,6 +86,36 @@ def diff(ctx, directory, range):
     return [l.strip() for l in unicodify(stdout).splitlines() if l]
 
 
+def ls_files(ctx, directory):
+    """Map paths of files tracked in the index to ``(mode, blob hash)`` pairs.
+
+    Paths are relative to ``directory`` and only tracked files below it are
+    listed.
+    """
+    cmd = "cd '%s' && git ls-files --stage -z" % directory
+    stdout, _ = io.communicate(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    files = {}
+    for entry in unicodify(stdout).split("\0"):
+        if not entry:
+            continue
+        # <mode> SP <object> SP <stage> TAB <file>
+        info, path = entry.split("\t", 1)
+        mode, object_hash, _ = info.split(" ")
+        files[path] = (mode, object_hash)
+    return files
+
+
+def modified_files(ctx, directory):
+    """Set of tracked paths (relative to ``directory``) changed in the work tree."""
+    cmd = "cd '%s' && git ls-files --modified --deleted -z" % directory
+    stdout, _ = io.communicate(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    return set(p for p in unicodify(stdout).split("\0") if p)
+
+
 def clone(*args, **kwds):
     """Clone a git repository.
 
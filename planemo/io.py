@@ -4,11 +4,15 @@ from __future__ import print_function
 import contextlib
 import errno
 import fnmatch
+import io
+import json
 import os
 import shutil
 import sys
 import tempfile
+import threading
 import time
+from multiprocessing.pool import ThreadPool
 from sys import platform as _platform
 from xml.sax.saxutils import escape
 
@@ -16,6 +20,7 @@ import click
 from galaxy.tools.deps import commands
 from galaxy.tools.deps.commands import download_command
 from six import (
+    PY3,
     string_types,
     StringIO
 )
@@ -24,10 +29,16 @@ from .exit_codes import (
     EXIT_CODE_NO_SUCH_TARGET,
     EXIT_CODE_OK,
 )
+from .walker import DirectoryWalker
 
 
 IS_OS_X = _platform == "darwin"
 
+# Per-thread destination for output written via sys.std{out,err} while
+# thread_routed_io is active (see buffered_output and Capturing).
+_THREAD_OUTPUT = threading.local()
+_OUTPUT_LOCK = threading.Lock()
+
 
 def args_to_str(args):
     if args is None or isinstance(args, string_types):
@@ -96,6 +107,46 @@ def write_file(path, content, force=True):
         f.write(content)
 
 
+@contextlib.contextmanager
+def atomic_write(path, encoding=None):
+    """Open ``path`` for writing text and replace the file atomically on success.
+
+    Content is written to a temporary file next to ``path`` (unique to the
+    process and thread) which is only renamed over ``path`` once the block
+    completes, so readers never see a partially written file and a failure
+    leaves any previous file untouched. Missing parent directories are
+    created. If ``encoding`` is set the yielded file expects unicode text.
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+    temp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.current_thread().ident)
+    try:
+        if encoding is None:
+            f = open(temp_path, "w")
+        else:
+            f = io.open(temp_path, "w", encoding=encoding)
+        with f:
+            yield f
+        os.rename(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def write_json_file(path, data, **kwds):
+    """Write ``data`` to ``path`` as JSON, replacing the file atomically.
+
+    See :func:`atomic_write`, ``kwds`` are passed to ``json.dump``.
+    """
+    with atomic_write(path) as f:
+        json.dump(data, f, **kwds)
+
+
 def untar_to(url, path=None, tar_args=None):
     download_cmd = " ".join(download_command(url, quote_url=True))
     if tar_args:
@@ -109,11 +160,13 @@ def untar_to(url, path=None, tar_args=None):
         shell("%s > '%s'" % (download_cmd, path))
 
 
-def find_matching_directories(path, pattern, recursive):
+def find_matching_directories(path, pattern, recursive, walker=None):
     """Find directories below supplied path with file matching pattern.
 
     Returns an empty list if no matches are found, and if recursive is False
-    only the top directory specified by path will be considered.
+    only the top directory specified by path will be considered. Recursive
+    searches use the supplied :class:`planemo.walker.DirectoryWalker` (by
+    default one pruning VCS and virtualenv directories).
     """
     dirs = []
     if recursive:
@@ -122,8 +175,9 @@ def find_matching_directories(path, pattern, recursive):
             message = template % (path)
             raise Exception(message)
 
-        for base_path, dirnames, filenames in os.walk(path):
-            dirnames.sort()
+        if walker is None:
+            walker = DirectoryWalker()
+        for base_path, dirnames, filenames in walker.walk(path):
             for filename in fnmatch.filter(filenames, pattern):
                 dirs.append(base_path)
     else:
@@ -252,10 +306,24 @@ class Capturing(list):
     # http://stackoverflow.com/a/16571630
 
     def __enter__(self):
-        self._stdout = sys.stdout
-        self._stderr = sys.stderr
-        sys.stdout = self._stringio_stdout = StringIO()
-        sys.stderr = self._stringio_stderr = StringIO()
+        self._stringio_stdout = StringIO()
+        self._stringio_stderr = StringIO()
+        self._routed = isinstance(sys.stdout, _ThreadRoutedStream)
+        if self._routed:
+            # Other threads are writing to sys.std{out,err}, only capture
+            # output from this one.
+            streams = {
+                "stdout": self._stringio_stdout,
+                "stderr": self._stringio_stderr,
+            }
+            self._previous_sink = _set_thread_sink(
+                lambda name, data: streams[name].write(data)
+            )
+        else:
+            self._stdout = sys.stdout
+            self._stderr = sys.stderr
+            sys.stdout = self._stringio_stdout
+            sys.stderr = self._stringio_stderr
         return self
 
     def __exit__(self, *args):
@@ -264,8 +332,87 @@ class Capturing(list):
         self.extend([{'logger': 'stderr', 'data': x} for x in
                      self._stringio_stderr.getvalue().splitlines()])
 
-        sys.stdout = self._stdout
-        sys.stderr = self._stderr
+        if self._routed:
+            _set_thread_sink(self._previous_sink)
+        else:
+            sys.stdout = self._stdout
+            sys.stderr = self._stderr
+
+
+class _ThreadRoutedStream(object):
+    """Stand-in for sys.std{out,err} that sends writes to the current
+    thread's sink if it has one and to the wrapped stream otherwise.
+    """
+
+    def __init__(self, stream, name):
+        self._stream = stream
+        self._name = name
+
+    def write(self, data):
+        if PY3 and isinstance(data, bytes):
+            # click probes for binary streams by writing b''.
+            raise TypeError("write() argument must be str, not bytes")
+        sink = getattr(_THREAD_OUTPUT, "sink", None)
+        if sink is None:
+            self._stream.write(data)
+        else:
+            sink(self._name, data)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _set_thread_sink(sink):
+    previous = getattr(_THREAD_OUTPUT, "sink", None)
+    _THREAD_OUTPUT.sink = sink
+    return previous
+
+
+@contextlib.contextmanager
+def thread_routed_io():
+    """Allow threads to redirect their own output with :func:`buffered_output`.
+
+    Messages written by threads without a buffer are passed through as usual.
+    """
+    if isinstance(sys.stdout, _ThreadRoutedStream):
+        yield
+        return
+
+    original_stdout = sys.stdout
+    original_stderr = sys.stderr
+    sys.stdout = _ThreadRoutedStream(original_stdout, "stdout")
+    sys.stderr = _ThreadRoutedStream(original_stderr, "stderr")
+    try:
+        yield
+    finally:
+        sys.stdout = original_stdout
+        sys.stderr = original_stderr
+
+
+@contextlib.contextmanager
+def buffered_output():
+    """Hold output written by this thread and emit it as one block on exit.
+
+    This only has an effect inside :func:`thread_routed_io`, it lets
+    concurrently processed targets report without interleaving messages.
+    """
+    if not isinstance(sys.stdout, _ThreadRoutedStream):
+        yield
+        return
+
+    messages = []
+    previous_sink = _set_thread_sink(
+        lambda name, data: messages.append((name, data))
+    )
+    try:
+        yield
+    finally:
+        _set_thread_sink(previous_sink)
+        with _OUTPUT_LOCK:
+            for name, data in messages:
+                getattr(sys, name).write(data)
+            sys.stdout.flush()
+            sys.stderr.flush()
 
 
 def tee_captured_output(output):
@@ -341,6 +488,24 @@ def filter_paths(paths, cwd=None, **kwds):
     return [p for p in paths if not any(f(p) for f in filters_as_funcs)]
 
 
+def map_concurrently(func, items, jobs=1):
+    """Apply ``func`` to each of ``items`` using up to ``jobs`` threads.
+
+    Results are returned in the order of ``items``. With ``jobs`` of 1 (or
+    fewer than two items) ``func`` is simply applied serially in this thread.
+    """
+    items = list(items)
+    if not jobs or jobs <= 1 or len(items) < 2:
+        return [func(item) for item in items]
+
+    pool = ThreadPool(min(jobs, len(items)))
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
 def coalesce_return_codes(ret_codes, assert_at_least_one=False):
     # Return 0 if everything is fine, otherwise pick the least
     # specific non-0 return code - preferring to report errors
@@ -13,6 +13,7 @@ import planemo.linters.doi
 import planemo.linters.urls
 import planemo.linters.xsd
 from planemo.io import error
+from planemo.mulled import build_mulled_tag_index, set_mulled_tag_index
 from planemo.shed import find_urls_for_xml
 from planemo.xml import validation
 
@@ -28,6 +29,8 @@ def build_lint_args(ctx, **kwds):
             skip = ",".join(skip)
 
     skip_types = [s.strip() for s in skip.split(",")]
+    if kwds.get("biocontainer", False):
+        set_mulled_tag_index(build_mulled_tag_index(ctx, **kwds))
     lint_args = dict(
         level=report_level,
         fail_level=fail_level,
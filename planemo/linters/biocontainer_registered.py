@@ -1,13 +1,9 @@
 """Ensure best-practice biocontainer registered for this tool."""
 
-from galaxy.tools.deps.mulled.util import (
-    build_target,
-    image_name,
-    mulled_tags_for,
-    split_tag,
-)
+from galaxy.tools.deps.mulled.util import build_target
 
 from planemo.conda import tool_source_conda_targets
+from planemo.mulled import mulled_tag_index
 
 MESSAGE_WARN_NO_REQUIREMENTS = "No valid package requirement tags found to infer BioContainer from."
 MESSAGE_WARN_NO_CONTAINER = "Failed to find a BioContainer registered for these requirements."
@@ -30,33 +26,6 @@ def lint_biocontainer_registered(tool_source, lint_ctx):
         lint_ctx.warn(MESSAGE_WARN_NO_CONTAINER)
 
 
-# TODO: Refactor following method into mulled util and then refactor same code out of mulled
-# container resolver.
 def mulled_container_name(namespace, targets):
-    name = None
-
-    if len(targets) == 1:
-        target = targets[0]
-        target_version = target.version
-        tags = mulled_tags_for(namespace, target.package_name)
-
-        if not tags:
-            return None
-
-        if target_version:
-            for tag in tags:
-                version, build = split_tag(tag)
-                if version == target_version:
-                    name = "%s:%s--%s" % (target.package_name, version, build)
-                    break
-        else:
-            version, build = split_tag(tags[0])
-            name = "%s:%s--%s" % (target.package_name, version, build)
-    else:
-        base_image_name = image_name(targets)
-        tags = mulled_tags_for(namespace, base_image_name)
-        if tags:
-            name = "%s:%s" % (base_image_name, tags[0])
-
-    if name:
-        return "quay.io/%s/%s" % (namespace, name)
+    """Find best-practice container for targets using the shared tag index."""
+    return mulled_tag_index(namespace).container_name(targets)
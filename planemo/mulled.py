@@ -4,17 +4,43 @@ The extend Galaxy/galaxy-lib's features with planemo specific idioms.
 """
 from __future__ import absolute_import
 
+import json
 import os
+import shutil
+import string
+import tempfile
+import time
 
+from galaxy.tools.deps import commands, docker_util
 from galaxy.tools.deps.mulled.mulled_build import (
+    DEFAULT_BINDS,
     DEFAULT_CHANNELS,
+    DEFAULT_REPOSITORY_TEMPLATE,
     ensure_installed,
     InvolucroContext,
+    mull_targets,
+)
+from galaxy.tools.deps.mulled.util import (
+    build_target,
+    image_name,
+    quay_versions,
+    split_tag,
+    v2_image_name,
+    version_sorted,
 )
-from galaxy.tools.deps.mulled.util import build_target
 
 from planemo.conda import collect_conda_target_lists
-from planemo.io import IS_OS_X, shell
+from planemo.io import (
+    error,
+    info,
+    IS_OS_X,
+    map_concurrently,
+    shell,
+    write_json_file,
+)
+
+DEFAULT_MULLED_NAMESPACE = "biocontainers"
+DEFAULT_TAG_CACHE_TTL = 60 * 60 * 24
 
 
 def conda_to_mulled_targets(conda_targets):
@@ -25,13 +51,33 @@ def collect_mulled_target_lists(ctx, paths, recursive=False):
     return list(map(conda_to_mulled_targets, collect_conda_target_lists(ctx, paths, recursive=recursive)))
 
 
+class WorkingDirectoryInvolucroContext(InvolucroContext):
+    """InvolucroContext that runs involucro from a private working directory.
+
+    galaxy-lib's context builds in ``./build`` relative to the process working
+    directory, so concurrent builds would clobber each other's ``build/dist``.
+    """
+
+    def __init__(self, working_directory, **kwds):
+        super(WorkingDirectoryInvolucroContext, self).__init__(**kwds)
+        self.working_directory = working_directory
+
+    def exec_command(self, involucro_args):
+        cmd = self.build_command(involucro_args)
+        build_directory = os.path.join(self.working_directory, "build")
+        if not os.path.exists(build_directory):
+            os.makedirs(build_directory)
+        return self.shell_exec(" ".join(cmd), cwd=self.working_directory)
+
+
 def build_involucro_context(ctx, **kwds):
     """Build a galaxy-lib CondaContext tailored to planemo use.
 
     Using planemo's common command-line/global config options.
     """
     involucro_path_default = os.path.join(ctx.workspace, "involucro")
-    involucro_path = kwds.get("involucro_path", involucro_path_default)
+    # Resolved now, mulled builds run involucro from other directories.
+    involucro_path = os.path.abspath(kwds.get("involucro_path", involucro_path_default))
     use_planemo_shell = kwds.get("use_planemo_shell_exec", True)
     shell_exec = shell if use_planemo_shell else None
     involucro_context = InvolucroContext(involucro_bin=involucro_path,
@@ -64,9 +110,236 @@ def build_mull_target_kwds(ctx, **kwds):
     return target_kwds
 
 
+def mulled_image_name(targets):
+    """Return the name :func:`mull_targets` will assign an image built for ``targets``."""
+    targets = list(targets)
+    image_build = "0" if len(targets) > 1 else None
+    return v2_image_name(targets, image_build=image_build)
+
+
+def unique_mulled_target_lists(mulled_target_lists):
+    """Filter out empty and duplicate (same ``v2_image_name``) target lists."""
+    unique_target_lists = []
+    image_names = set()
+    for mulled_targets in mulled_target_lists:
+        if not mulled_targets:
+            continue
+        name = mulled_image_name(mulled_targets)
+        if name in image_names:
+            continue
+        image_names.add(name)
+        unique_target_lists.append(mulled_targets)
+    return unique_target_lists
+
+
+def docker_image_exists(image):
+    """Check if the supplied image is available to the local Docker daemon."""
+    inspect_cmd = docker_util.command_list("inspect", ["--type=image", image])
+    with open(os.devnull, "w") as devnull:
+        return commands.shell(inspect_cmd, stdout=devnull, stderr=devnull) == 0
+
+
+def mull_target_lists(ctx, mulled_target_lists, command, jobs=1, skip_existing=True, **mull_target_kwds):
+    """Build one container for each unique list of mulled targets.
+
+    Images already present locally are skipped (unless ``skip_existing`` is
+    False or ``command`` pushes images) and up to ``jobs`` images are built
+    concurrently. A summary with the time spent on each image is printed at
+    the end.
+
+    Return a list of exit codes (i.e. 0 in case of success).
+    """
+    namespace = mull_target_kwds.get("namespace", "biocontainers")
+    involucro_context = mull_target_kwds.pop("involucro_context")
+    mulled_target_lists = unique_mulled_target_lists(mulled_target_lists)
+    skip_existing = skip_existing and "push" not in command
+
+    def mull(mulled_targets):
+        repo = string.Template(DEFAULT_REPOSITORY_TEMPLATE).safe_substitute(
+            namespace=namespace,
+            image=mulled_image_name(mulled_targets),
+        )
+        if skip_existing and docker_image_exists(repo):
+            ctx.vlog("Image %s already exists locally, skipping" % repo)
+            return repo, None, 0.0
+        start = time.time()
+        working_directory = tempfile.mkdtemp(prefix="planemo_mull_")
+        try:
+            context = WorkingDirectoryInvolucroContext(
+                working_directory,
+                involucro_bin=os.path.abspath(involucro_context.involucro_bin),
+                shell_exec=involucro_context.shell_exec,
+            )
+            return_code = mull_targets(
+                mulled_targets,
+                involucro_context=context,
+                command=command,
+                binds=list(DEFAULT_BINDS),
+                **mull_target_kwds
+            )
+        finally:
+            shutil.rmtree(working_directory, ignore_errors=True)
+        return repo, return_code, time.time() - start
+
+    results = map_concurrently(mull, mulled_target_lists, jobs=jobs)
+    return_codes = []
+    for repo, return_code, duration in results:
+        if return_code is None:
+            info("%s exists locally, skipped" % repo)
+            continue
+        return_codes.append(return_code)
+        if return_code == 0:
+            info("%s built in %.1fs" % (repo, duration))
+        else:
+            error("%s failed after %.1fs (exit code %d)" % (repo, duration, return_code))
+    return return_codes
+
+
+class MulledTagIndex(object):
+    """In-memory index of image tags published for a mulled container namespace.
+
+    Each image is looked up on quay.io at most once per index (i.e. once per
+    planemo invocation). If ``cache_directory`` is set, fetched tags are also
+    persisted there and reused by later invocations until they are older than
+    ``ttl`` seconds. If ``listing_path`` is set the index is offline - tags are
+    read from an exported listing file (one ``image:tag`` per line, optionally
+    prefixed with ``quay.io/<namespace>/``) and quay.io is never contacted.
+    """
+
+    def __init__(self, namespace=DEFAULT_MULLED_NAMESPACE, cache_directory=None, ttl=DEFAULT_TAG_CACHE_TTL, listing_path=None):
+        self.namespace = namespace
+        self.cache_directory = cache_directory
+        self.ttl = ttl
+        self.offline = listing_path is not None
+        self._tags = {}
+        if listing_path is not None:
+            self._load_listing(listing_path)
+
+    def tags_for(self, image):
+        """Return tags for supplied image name sorted so newest tags are first."""
+        if image not in self._tags:
+            tags = self._read_cache(image)
+            if tags is None:
+                tags = [] if self.offline else self._fetch(image)
+            self._tags[image] = version_sorted(tags)
+        return self._tags[image]
+
+    def container_name(self, targets):
+        """Find best-practice container name for supplied mulled targets or None."""
+        name = None
+        if len(targets) == 1:
+            target = targets[0]
+            tags = self.tags_for(target.package_name)
+            if not tags:
+                return None
+
+            if target.version:
+                for tag in tags:
+                    version, build = split_tag(tag)
+                    if version == target.version:
+                        name = "%s:%s--%s" % (target.package_name, version, build)
+                        break
+            else:
+                version, build = split_tag(tags[0])
+                name = "%s:%s--%s" % (target.package_name, version, build)
+        else:
+            base_image_name = image_name(targets)
+            tags = self.tags_for(base_image_name)
+            if tags:
+                name = "%s:%s" % (base_image_name, tags[0])
+
+        if name:
+            return "quay.io/%s/%s" % (self.namespace, name)
+
+    def _fetch(self, image):
+        tags = quay_versions(self.namespace, image)
+        # No tags may just mean the image is not published yet, so check
+        # again next time rather than trusting that for the whole TTL.
+        if tags:
+            self._write_cache(image, tags)
+        return tags
+
+    def _load_listing(self, listing_path):
+        prefix = "quay.io/%s/" % self.namespace
+        with open(listing_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith(prefix):
+                    line = line[len(prefix):]
+                if ":" not in line:
+                    continue
+                image, tag = line.split(":", 1)
+                if tag != "latest":
+                    self._tags.setdefault(image, []).append(tag)
+
+    def _cache_path(self, image):
+        return os.path.join(self.cache_directory, self.namespace, "%s.json" % image)
+
+    def _read_cache(self, image):
+        if self.offline or self.cache_directory is None:
+            return None
+        path = self._cache_path(image)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r") as f:
+                return json.load(f) or None
+        except (OSError, IOError, ValueError):
+            return None
+
+    def _write_cache(self, image, tags):
+        if self.cache_directory is None:
+            return
+        write_json_file(self._cache_path(image), tags)
+
+
+_mulled_tag_index = None
+
+
+def build_mulled_tag_index(ctx, **kwds):
+    """Build a :class:`MulledTagIndex` using planemo's workspace and options."""
+    namespace = kwds.get("mulled_namespace") or DEFAULT_MULLED_NAMESPACE
+    ttl = kwds.get("biocontainer_tag_ttl")
+    if ttl is None:
+        ttl = DEFAULT_TAG_CACHE_TTL
+    cache_directory = None
+    if ttl > 0:
+        cache_directory = os.path.join(ctx.cache_directory, "mulled_tags")
+    return MulledTagIndex(
+        namespace=namespace,
+        cache_directory=cache_directory,
+        ttl=ttl,
+        listing_path=kwds.get("biocontainer_tag_listing"),
+    )
+
+
+def set_mulled_tag_index(index):
+    """Set the index used by :func:`mulled_tag_index` for this process."""
+    global _mulled_tag_index
+    _mulled_tag_index = index
+
+
+def mulled_tag_index(namespace=DEFAULT_MULLED_NAMESPACE):
+    """Return configured tag index for namespace, creating a memory-only one if needed."""
+    global _mulled_tag_index
+    if _mulled_tag_index is None or _mulled_tag_index.namespace != namespace:
+        _mulled_tag_index = MulledTagIndex(namespace=namespace)
+    return _mulled_tag_index
+
+
 __all__ = (
     "build_involucro_context",
     "build_mull_target_kwds",
+    "build_mulled_tag_index",
     "collect_mulled_target_lists",
     "conda_to_mulled_targets",
+    "docker_image_exists",
+    "mull_target_lists",
+    "mulled_image_name",
+    "mulled_tag_index",
+    "MulledTagIndex",
+    "set_mulled_tag_index",
+    "unique_mulled_target_lists",
 )
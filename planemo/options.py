@@ -544,6 +544,19 @@ def conda_copy_dependencies_option():
     )
 
 
+def conda_env_store_option():
+    return planemo_option(
+        "--conda_env_store/--no_conda_env_store",
+        is_flag=True,
+        default=False,
+        use_global_config=True,
+        help=("Reuse Conda environments across Galaxy instances and runs - record "
+              "explicit lockfiles for solved requirement sets in planemo's workspace, "
+              "recreate missing environments from them without solving, and share "
+              "Galaxy's cached job dependency environments between config directories.")
+    )
+
+
 def conda_auto_install_option():
     return planemo_option(
         "--conda_auto_install/--no_conda_auto_install",
@@ -564,6 +577,16 @@ def conda_auto_init_option():
     )
 
 
+def jobs_option(help="Number of targets to process concurrently."):
+    return planemo_option(
+        "--jobs",
+        type=int,
+        default=1,
+        use_global_config=True,
+        help=help,
+    )
+
+
 def conda_global_option():
     return planemo_option(
         "--global",
@@ -877,6 +900,29 @@ def shed_target_option():
     )
 
 
+def shed_index_ttl_option():
+    return planemo_option(
+        "--shed_index_ttl",
+        type=int,
+        default=0,
+        use_global_config=True,
+        help=("Seconds to reuse Tool Shed repository listings cached in "
+              "planemo's workspace, by default listings are fetched once "
+              "per invocation and not cached on disk.")
+    )
+
+
+def shed_tarball_cache_size_option():
+    return planemo_option(
+        "--shed_tarball_cache_size",
+        type=int,
+        default=1024,
+        use_global_config=True,
+        help=("Size in MB of the workspace cache of repository tarballs "
+              "downloaded from Tool Sheds, set to 0 to disable the cache.")
+    )
+
+
 def shed_key_option():
     return planemo_option(
         "--shed_key",
@@ -927,6 +973,17 @@ def shed_skip_metadata():
     )
 
 
+def shed_skip_unchanged_metadata():
+    return planemo_option(
+        "--skip_unchanged_metadata",
+        is_flag=True,
+        help=("Skip metadata updates of repositories whose metadata (including "
+              "metadata the Tool Shed does not list such as long descriptions "
+              "and categories) is unchanged since planemo last sent it. Edits "
+              "made directly on the Tool Shed to such metadata are then kept.")
+    )
+
+
 def shed_message_option():
     return planemo_option(
         "-m",
@@ -964,6 +1021,43 @@ def shed_upload_options():
     )
 
 
+def shed_jobs_option():
+    return jobs_option(
+        help=("Number of repositories to process concurrently. Output for "
+              "each repository is written out once it has been processed.")
+    )
+
+
+def install_jobs_option():
+    return planemo_option(
+        "--install_jobs",
+        type=int,
+        default=1,
+        use_global_config=True,
+        help=("Number of repository installs to request from Galaxy "
+              "concurrently (defaults to 1). Concurrent installs may fail with "
+              "\"database is locked\" errors if Galaxy uses a sqlite database.")
+    )
+
+
+def shed_request_limit_option():
+    return planemo_option(
+        "--shed_request_limit",
+        type=int,
+        default=4,
+        use_global_config=True,
+        help=("Maximum number of API requests and downloads in flight to "
+              "any one Tool Shed when processing repositories concurrently.")
+    )
+
+
+def shed_concurrency_options():
+    return _compose(
+        shed_jobs_option(),
+        shed_request_limit_option(),
+    )
+
+
 def shed_realization_options():
     return _compose(
         shed_project_arg(multiple=True),
@@ -987,6 +1081,7 @@ def shed_publish_options():
         shed_realization_options(),
         shed_repo_options(),
         shed_target_options(),
+        shed_concurrency_options(),
     )
 
 
@@ -998,6 +1093,7 @@ def shed_read_options():
         shed_realization_options(),
         shed_repo_options(),
         shed_target_options(),
+        shed_concurrency_options(),
     )
 
 
@@ -1011,6 +1107,8 @@ def shed_target_options():
         shed_key_from_env_option(),
         shed_password_option(),
         shed_target_option(),
+        shed_index_ttl_option(),
+        shed_tarball_cache_size_option(),
     )
 
 
@@ -1045,6 +1143,7 @@ def galaxy_config_options():
         conda_copy_dependencies_option(),
         conda_auto_install_option(),
         conda_auto_init_option(),
+        conda_env_store_option(),
         # Profile options...
         profile_option(),
         profile_database_options(),
@@ -1232,6 +1331,16 @@ def test_report_options():
             help=("Output test report (HTML - for humans) defaults to "
                   "tool_test_output.html."),
         ),
+        planemo_option(
+            "--test_output_html_mode",
+            type=click.Choice(["inline", "sharded"]),
+            use_global_config=True,
+            default="inline",
+            help=("Embed all test details in the HTML report ('inline', the "
+                  "default) or only a summary with details written to a "
+                  "<report>_files directory and loaded when a test is "
+                  "expanded ('sharded' - for large test suites)."),
+        ),
         planemo_option(
             "--test_output_text",
             type=click.Path(file_okay=True, resolve_path=True),
@@ -1358,12 +1467,29 @@ def test_options():
                   "tool_test_output.json."),
             default="tool_test_output.json",
         ),
+        planemo_option(
+            "--test_output_log_limit",
+            type=int,
+            use_global_config=True,
+            default=64 * 1024,
+            help=("Logs (job standard output and error, command lines and "
+                  "problem logs) longer than this many characters are "
+                  "written to a <test_output_json>_logs.txt file and only "
+                  "their head and tail kept in the test results. Set to 0 "
+                  "to keep complete logs in the results."),
+        ),
         planemo_option(
             "--job_output_files",
             type=click.Path(file_okay=False, resolve_path=True),
             help="Write job outputs to specified directory.",
             default=None,
         ),
+        test_summary_option(),
+    )
+
+
+def test_summary_option():
+    return _compose(
         planemo_option(
             "--summary",
             type=click.Choice(["none", "minimal", "compact"]),
@@ -1371,7 +1497,16 @@ def test_options():
             help=("Summary style printed to planemo's standard output (see "
                   "output reports for more complete summary). Set to 'none' "
                   "to disable completely.")
-        )
+        ),
+        planemo_option(
+            "--summary_slowest",
+            type=int,
+            use_global_config=True,
+            default=10,
+            help=("Number of tests with the longest job runtime (according "
+                  "to Galaxy job metrics) to list in the summary and in "
+                  "reports. Set to 0 to disable."),
+        ),
     )
 
 
@@ -1731,6 +1866,27 @@ def mulled_action_option():
     )
 
 
+def biocontainer_tag_options():
+    return _compose(
+        planemo_option(
+            "--biocontainer_tag_ttl",
+            type=int,
+            default=60 * 60 * 24,
+            use_global_config=True,
+            help=("Seconds to reuse BioContainer tags cached in planemo's workspace before "
+                  "querying quay.io again (set to 0 to disable the on-disk cache)."),
+        ),
+        planemo_option(
+            "--biocontainer_tag_listing",
+            type=click.Path(exists=True, file_okay=True, dir_okay=False, resolve_path=True),
+            default=None,
+            use_global_config=True,
+            help=("Check BioContainers offline against an exported tag listing (one "
+                  "'image:tag' per line) instead of querying quay.io."),
+        ),
+    )
+
+
 def mulled_options():
     return _compose(
         mulled_conda_option(),
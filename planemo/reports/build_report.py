@@ -1,17 +1,46 @@
 import json
+import os
 
 from jinja2 import Environment, PackageLoader
 from pkg_resources import resource_string
 
+from planemo.io import atomic_write
+from planemo.test.metrics import (
+    DEFAULT_SLOWEST_COUNT,
+    format_metric,
+    METRICS,
+    slowest_tests,
+)
+
 env = Environment(loader=PackageLoader('planemo', 'reports'))
+HTML_REPORT_MODES = ["inline", "sharded"]
+DEFAULT_HTML_REPORT_MODE = "inline"
+# Number of tests whose details are written to each file of a sharded report.
+DEFAULT_SHARD_SIZE = 50
+SHARD_TEMPLATE = "details_%04d.js"
 
 
-def build_report(structured_data, report_type="html", **kwds):
+def build_report(structured_data, report_type="html", slowest_count=DEFAULT_SLOWEST_COUNT, **kwds):
     """ Use report_{report_type}.tpl to build page for report.
     """
+    environment = _report_environment(structured_data, report_type, slowest_count)
+    return template_data(environment, 'report_%s.tpl' % report_type)
+
+
+def write_report(structured_data, path, report_type="html", slowest_count=DEFAULT_SLOWEST_COUNT):
+    """Like :func:`build_report` but stream the page to ``path``."""
+    environment = _report_environment(structured_data, report_type, slowest_count)
+    write_template_data(environment, path, 'report_%s.tpl' % report_type)
+
+
+def _report_environment(structured_data, report_type, slowest_count=DEFAULT_SLOWEST_COUNT):
     environment = dict(
         title="Tool Test Results (powered by Planemo)",
         raw_data=structured_data,
+        metrics=METRICS,
+        format_metric=format_metric,
+        slowest_count=slowest_count,
+        slowest_tests=slowest_tests(structured_data, slowest_count),
     )
 
     if report_type == 'html':
@@ -24,9 +53,44 @@ def build_report(structured_data, report_type="html", **kwds):
             'jquery_script': __script("jquery.min"),
             'bootstrap_script': __script("bootstrap.min"),
             'json': json,
+            'script_json': _script_json,
         })
+    return environment
 
-    return template_data(environment, 'report_%s.tpl' % report_type)
+
+def write_sharded_html_report(structured_data, path, shard_size=DEFAULT_SHARD_SIZE, slowest_count=DEFAULT_SLOWEST_COUNT):
+    """Write an HTML report to ``path`` loading per-test details on demand.
+
+    The page embeds only the summary and status of each test, complete test
+    details (job standard output and error, problems, logs...) are written
+    ``shard_size`` tests at a time to scripts in a ``<name>_files`` directory
+    next to the page and loaded when a test is expanded.
+    """
+    details_name = "%s_files" % os.path.splitext(os.path.basename(path))[0]
+    details_directory = os.path.join(os.path.dirname(os.path.abspath(path)), details_name)
+    if not os.path.exists(details_directory):
+        os.makedirs(details_directory)
+
+    tests = structured_data.get("tests", [])
+    test_summaries = []
+    shard_urls = []
+    for shard, start in enumerate(range(0, len(tests), shard_size)):
+        shard_tests = tests[start:start + shard_size]
+        shard_name = SHARD_TEMPLATE % shard
+        with open(os.path.join(details_directory, shard_name), "w") as f:
+            f.write("planemoReportShard(%d, " % shard)
+            json.dump(shard_tests, f)
+            f.write(");\n")
+        shard_urls.append("%s/%s" % (details_name, shard_name))
+        for offset, test in enumerate(shard_tests):
+            test_summaries.append(_test_summary(test, shard, offset))
+
+    summary_data = dict(
+        summary=structured_data.get("summary"),
+        tests=test_summaries,
+        shards=shard_urls,
+    )
+    write_report(summary_data, path, report_type="html", slowest_count=slowest_count)
 
 
 def template_data(environment, template_name="report_html.tpl", **kwds):
@@ -36,6 +100,37 @@ def template_data(environment, template_name="report_html.tpl", **kwds):
     return template.render(**environment)
 
 
+def write_template_data(environment, path, template_name="report_html.tpl"):
+    """Render a templated page to ``path`` as it is generated.
+
+    Unlike :func:`template_data` the page is never held in memory as a
+    whole - template loops over tests are written out test by test.
+    """
+    template = env.get_template(template_name)
+    # Don't leave a truncated report behind if rendering fails part way.
+    with atomic_write(path, encoding="utf-8") as f:
+        for chunk in template.generate(**environment):
+            f.write(chunk)
+
+
+def _test_summary(test, shard, offset):
+    data = test.get("data") or {}
+    return dict(
+        id=test.get("id"),
+        shard=[shard, offset],
+        data=dict(
+            status=data.get("status"),
+            test_index=data.get("test_index"),
+            job_metrics=data.get("job_metrics"),
+        ),
+    )
+
+
+def _script_json(data):
+    # Keep "</script>" in test output from closing the embedding script tag.
+    return json.dumps(data).replace("</", "<\\/")
+
+
 def __style(filename):
     resource = __load_resource(filename)
     return "<style>%s</style>" % resource
@@ -1,5 +1,15 @@
 
-var renderTestResults = function(testData) {
+var PAGE_SIZE = 100;
+var DEFAULT_SLOWEST_COUNT = 10;
+var METRICS = [
+	["runtime_seconds", "Runtime"],
+	["cpu_seconds", "CPU Time"],
+	["memory_peak_bytes", "Peak Memory"],
+	["cores", "Cores"],
+	["queue_seconds", "Queue Wait"]
+];
+
+var renderTestResults = function(testData, slowestCount) {
 	var summary = testData["summary"];
 	var numTests = summary["num_tests"];
 	var numProblems = summary["num_errors"] + summary["num_failures"] + summary["num_skips"];
@@ -19,89 +29,184 @@ var renderTestResults = function(testData) {
 		$progress.append($('<div class="progress-bar progress-bar-success" role="progressbar" style="width: 100%" />'));
 	}
 
-	var $sidebar = $("#nav-sidebar-tests");
+	var testResults = [];
+	var statusCounts = {};
 	for(var index in testData["tests"]) {
-		var test = testData["tests"][index];
-		var testResult = new TestResult(index, test);
-		var rawId = testResult.rawId;
-
-		var panelType = testResult.passed ? "panel-success panel-success-custom" : "panel-danger panel-danger-custom";
-		var $panel = $('<div class="panel">');
-		$panel.addClass(panelType);
-
-		var $panelHeading = $('<div class="panel-heading">');
-		var $panelTitle = $('<div class="panel-title">');
-		var $a = $('<a class="collapsed" data-toggle="collapse">');
-		$a.attr("id", rawId);
-		$a.attr("data-target", "#collapse"  + index);
-		var testName = testResult.toolName + " (Test #" + (testResult.testIndex + 1) + (testResult.passed ? "" : ", Failed") + ")";
-		$a.text(testName);
-		var $navLink = $('<a>').attr('href', '#' + rawId).text(testName)
-		if(!testResult.passed) {
-			$navLink.addClass("text-danger text-danger-custom");
-		} else {
-			$navLink.addClass("text-success text-success-custom");
+		var testResult = new TestResult(parseInt(index), testData["tests"][index]);
+		testResults.push(testResult);
+		statusCounts[testResult.status] = (statusCounts[testResult.status] || 0) + 1;
+	}
+	// Sharded reports only embed a summary of each test, details are loaded on demand.
+	var detailsLoader = testData["shards"] ? new ShardLoader(testData["shards"]) : null;
+	var state = {"status": null, "page": 0};
+
+	var render = function() {
+		var filtered = $.grep(testResults, function(testResult) {
+			return state.status === null || testResult.status == state.status;
+		});
+		var numPages = Math.max(1, Math.ceil(filtered.length / PAGE_SIZE));
+		state.page = Math.min(state.page, numPages - 1);
+		var $sidebar = $("#nav-sidebar-tests").empty();
+		var $panels = $("#test-panels").empty();
+		var pageResults = filtered.slice(state.page * PAGE_SIZE, (state.page + 1) * PAGE_SIZE);
+		for(var i = 0; i < pageResults.length; i++) {
+			var testResult = pageResults[i];
+			$sidebar.append($('<li>').append(testResult.navLink()));
+			$panels.append(testResult.panel(detailsLoader));
 		}
-		$sidebar.append($('<li>').append( $navLink ) );
-		$panelTitle.append($a)
-		$panelHeading.append($panelTitle);
-
-		var $panelBody = $('<div class="panel-body panel-collapse collapse" >');
-		$panelBody.attr("id", "collapse" + index);
-
-		var $status = $('<div>').text("status: " + testResult.status);
-		$panelBody.append($status);
-		if(testResult.problems.length > 0) {
-			var $problemsLabel = $('<div>').text("problems: ");
-			var $problemsDiv = $('<div style="margin-left:10px;">');
-			var $problemsUl = $('<ul>');
-			for(var problemIndex in testResult.problems) {
-				$problemsUl.append($('<li>').append($('<pre>').text(testResult.problems[problemIndex])));
-			}
-			$problemsDiv.append($problemsUl);
-			$panelBody.append($problemsLabel).append($problemsDiv);
+		renderPagination(numPages);
+	};
+
+	// Switch to the filter and page listing a test so links to it (e.g. from
+	// the slowest tests table) always have a panel to scroll to.
+	var showTest = function(testResult) {
+		if(state.status !== null && testResult.status != state.status) {
+			state.status = null;
+			$filters.find("button").removeClass("active").first().addClass("active");
 		}
-		var $commandLabel = $('<div>command:</div>');
-		var $stdoutLabel = $('<div>job standard output:</div>');
-		var $stderrLabel = $('<div>job standard error:</div>');
-		var $command;
-		if(testResult.command !== null) {
-			$command = $('<pre class="pre-scrollable" style="margin-left:10px;">').text(testResult.command);
-		} else {
-			$command = $('<div class="alert alert-warning" style="margin-left:10px;">').text("No command recorded.");
+		var filtered = $.grep(testResults, function(other) {
+			return state.status === null || other.status == state.status;
+		});
+		state.page = Math.floor($.inArray(testResult, filtered) / PAGE_SIZE);
+		render();
+		var target = document.getElementById(testResult.rawId);
+		if(target) {
+			target.scrollIntoView();
 		}
-		var $stdout;
-		if(testResult.stdout !== null) {
-			$stdout = $('<pre class="pre-scrollable" style="margin-left:10px;">').text(testResult.stdout);
-		} else {
-			$stdout = $('<div class="alert alert-warning" style="margin-left:10px;">').text("No standard output recorded.");
+	};
+
+	var renderPagination = function(numPages) {
+		var $pagination = $("#test-pagination").empty();
+		if(numPages < 2) {
+			return;
 		}
-		var $stderr;
-		if(testResult.stderr !== null) {
-			$stderr = $('<pre class="pre-scrollable" style="margin-left:10px;">').text(testResult.stderr);
-		} else {
-			$stderr = $('<div class="alert alert-warning" style="margin-left:10px;">').text("No standard error recorded.");
+		for(var page = 0; page < numPages; page++) {
+			var $item = $('<li>').append($('<a href="#tests">').text(page + 1).data("page", page));
+			if(page == state.page) {
+				$item.addClass("active");
+			}
+			$pagination.append($item);
 		}
-		$panelBody
-			.append($commandLabel)
-			.append($command)
-			.append($stdoutLabel)
-			.append($stdout)
-			.append($stderrLabel)
-			.append($stderr);
-		if(!testResult.passed) {
-			var $logLabel = $('<div>log:</div>');
-			var $log = $('<pre class="pre-scrollable" style="margin-left: 10px;">').text(testResult.problemLog);
-			$panelBody.append($logLabel).append($log);
+		$pagination.find("a").click(function() {
+			state.page = $(this).data("page");
+			render();
+		});
+	};
+
+	var $filters = $("#test-filters").empty();
+	var filterButton = function(label, status) {
+		var $button = $('<button type="button" class="btn btn-default">').text(label);
+		if(state.status === status) {
+			$button.addClass("active");
+		}
+		$button.click(function() {
+			state.status = status;
+			state.page = 0;
+			$filters.find("button").removeClass("active");
+			$button.addClass("active");
+			render();
+		});
+		$filters.append($button);
+	};
+	filterButton("all (" + testResults.length + ")", null);
+	for(var status in statusCounts) {
+		filterButton(status + " (" + statusCounts[status] + ")", status);
+	}
+	renderSlowestTests(testResults, slowestCount === undefined ? DEFAULT_SLOWEST_COUNT : slowestCount, showTest);
+	render();
+}
+
+var renderSlowestTests = function(testResults, slowestCount, showTest) {
+	var timed = $.grep(testResults, function(testResult) {
+		return testResult.jobMetrics && testResult.jobMetrics["runtime_seconds"] !== undefined;
+	});
+	timed.sort(function(a, b) {
+		return b.jobMetrics["runtime_seconds"] - a.jobMetrics["runtime_seconds"];
+	});
+	timed = timed.slice(0, slowestCount);
+	var $slowest = $("#slowest-tests").empty();
+	if(timed.length == 0) {
+		return;
+	}
+	var $table = metricsTable(["Test"]);
+	for(var i = 0; i < timed.length; i++) {
+		var $link = $('<a>').attr('href', '#' + timed[i].rawId).text(timed[i].name).data("testResult", timed[i]);
+		$link.click(function(event) {
+			event.preventDefault();
+			showTest($(this).data("testResult"));
+		});
+		var $name = $('<td>').append($link);
+		$table.append(metricsRow(timed[i].jobMetrics).prepend($name));
+	}
+	$slowest.append($('<h3>').text("Slowest Tests")).append($table);
+}
+
+var metricsTable = function(extraColumns) {
+	var $header = $('<tr>');
+	var columns = extraColumns.concat($.map(METRICS, function(metric) { return metric[1]; }));
+	for(var i = 0; i < columns.length; i++) {
+		$header.append($('<th>').text(columns[i]));
+	}
+	return $('<table class="table table-condensed">').append($header);
+}
+
+var metricsRow = function(jobMetrics) {
+	var $row = $('<tr>');
+	for(var i = 0; i < METRICS.length; i++) {
+		$row.append($('<td>').text(formatMetric(METRICS[i][0], jobMetrics[METRICS[i][0]])));
+	}
+	return $row;
+}
+
+var formatMetric = function(key, value) {
+	if(value === undefined || value === null) {
+		return "";
+	} else if(key == "memory_peak_bytes") {
+		return (value / (1024 * 1024)).toFixed(1) + " MB";
+	} else if(key == "cores") {
+		return "" + value;
+	}
+	return value.toFixed(1) + " s";
+}
+
+// Load test details from script files calling planemoReportShard (script
+// tags, unlike XHR, work for reports opened from the local file system).
+var ShardLoader = function(shardUrls) {
+	this.shardUrls = shardUrls;
+	this.shards = {};
+	this.callbacks = {};
+	var loader = this;
+	window.planemoReportShard = function(shard, tests) {
+		loader.shards[shard] = tests;
+		var callbacks = loader.callbacks[shard] || [];
+		delete loader.callbacks[shard];
+		for(var i = 0; i < callbacks.length; i++) {
+			callbacks[i](tests);
 		}
+	};
+}
 
-		$panel.append($panelHeading).append($panelBody);
-		$(".main").append($panel);
+ShardLoader.prototype.load = function(location, callback) {
+	var shard = location[0];
+	var offset = location[1];
+	if(this.shards[shard] !== undefined) {
+		callback(this.shards[shard][offset]);
+		return;
+	}
+	if(this.callbacks[shard] === undefined) {
+		this.callbacks[shard] = [];
+		var script = document.createElement("script");
+		script.src = this.shardUrls[shard];
+		script.onerror = function() { alert("Failed to load test details."); };
+		document.body.appendChild(script);
 	}
+	this.callbacks[shard].push(function(tests) { callback(tests[offset]); });
 }
 
 var TestResult = function(index, data) {
+	this.index = index;
 	this.rawId = data["id"];
+	this.shard = data["shard"];
 
 	var idParts = this.rawId.split("TestForTool_");
 	var testMethod = idParts[idParts.length-1];
@@ -113,7 +218,7 @@ var TestResult = function(index, data) {
 	}
 	var toolName = splitParts[0];
 	var testIndex;
-	if(data["data"]["test_index"] !== null) {
+	if(data["data"]["test_index"] !== null && data["data"]["test_index"] !== undefined) {
 		testIndex = data["data"]["test_index"];
 	} else {
 		testIndex = splitParts[1];
@@ -121,6 +226,15 @@ var TestResult = function(index, data) {
 	this.toolName = toolName;
 	this.testIndex = parseInt(testIndex === undefined ? index : testIndex);
 	this.status = data["data"]["status"];
+	this.jobMetrics = data["data"]["job_metrics"] || null;
+	this.passed = (this.status == "success");
+	this.name = this.toolName + " (Test #" + (this.testIndex + 1) + (this.passed ? "" : ", Failed") + ")";
+	if(this.shard === undefined) {
+		this.setDetails(data);
+	}
+}
+
+TestResult.prototype.setDetails = function(data) {
 	var job = data["data"]["job"];
 	if(job) {
 		this.stdout = data["data"]["job"]["stdout"];
@@ -139,7 +253,104 @@ var TestResult = function(index, data) {
 		this.problems.push(executionProblem);
 	}
 	this.problemLog = data["data"]["problem_log"];
-	this.passed = (this.status == "success");
+	this.hasDetails = true;
+}
+
+TestResult.prototype.navLink = function() {
+	var $navLink = $('<a>').attr('href', '#' + this.rawId).text(this.name);
+	if(!this.passed) {
+		$navLink.addClass("text-danger text-danger-custom");
+	} else {
+		$navLink.addClass("text-success text-success-custom");
+	}
+	return $navLink;
+}
+
+TestResult.prototype.panel = function(detailsLoader) {
+	var testResult = this;
+	var panelType = this.passed ? "panel-success panel-success-custom" : "panel-danger panel-danger-custom";
+	var $panel = $('<div class="panel">');
+	$panel.addClass(panelType);
+
+	var $panelHeading = $('<div class="panel-heading">');
+	var $panelTitle = $('<div class="panel-title">');
+	var $a = $('<a class="collapsed" data-toggle="collapse">');
+	$a.attr("id", this.rawId);
+	$a.attr("data-target", "#collapse"  + this.index);
+	$a.text(this.name);
+	$panelTitle.append($a)
+	$panelHeading.append($panelTitle);
+
+	var $panelBody = $('<div class="panel-body panel-collapse collapse" >');
+	$panelBody.attr("id", "collapse" + this.index);
+	// Only build (and if needed load) the details once the panel is expanded.
+	$panelBody.one("show.bs.collapse", function() {
+		if(testResult.hasDetails) {
+			testResult.renderDetails($panelBody);
+		} else {
+			$panelBody.text("Loading...");
+			detailsLoader.load(testResult.shard, function(data) {
+				testResult.setDetails(data);
+				$panelBody.empty();
+				testResult.renderDetails($panelBody);
+			});
+		}
+	});
+	$panel.append($panelHeading).append($panelBody);
+	return $panel;
+}
+
+TestResult.prototype.renderDetails = function($panelBody) {
+	var $status = $('<div>').text("status: " + this.status);
+	$panelBody.append($status);
+	if(this.jobMetrics) {
+		$panelBody.append($('<div>job metrics:</div>'));
+		var $metrics = $('<div style="margin-left:10px;">').append(metricsTable([]).append(metricsRow(this.jobMetrics)));
+		$panelBody.append($metrics);
+	}
+	if(this.problems.length > 0) {
+		var $problemsLabel = $('<div>').text("problems: ");
+		var $problemsDiv = $('<div style="margin-left:10px;">');
+		var $problemsUl = $('<ul>');
+		for(var problemIndex in this.problems) {
+			$problemsUl.append($('<li>').append($('<pre>').text(this.problems[problemIndex])));
+		}
+		$problemsDiv.append($problemsUl);
+		$panelBody.append($problemsLabel).append($problemsDiv);
+	}
+	var $commandLabel = $('<div>command:</div>');
+	var $stdoutLabel = $('<div>job standard output:</div>');
+	var $stderrLabel = $('<div>job standard error:</div>');
+	var $command;
+	if(this.command !== null) {
+		$command = $('<pre class="pre-scrollable" style="margin-left:10px;">').text(this.command);
+	} else {
+		$command = $('<div class="alert alert-warning" style="margin-left:10px;">').text("No command recorded.");
+	}
+	var $stdout;
+	if(this.stdout !== null) {
+		$stdout = $('<pre class="pre-scrollable" style="margin-left:10px;">').text(this.stdout);
+	} else {
+		$stdout = $('<div class="alert alert-warning" style="margin-left:10px;">').text("No standard output recorded.");
+	}
+	var $stderr;
+	if(this.stderr !== null) {
+		$stderr = $('<pre class="pre-scrollable" style="margin-left:10px;">').text(this.stderr);
+	} else {
+		$stderr = $('<div class="alert alert-warning" style="margin-left:10px;">').text("No standard error recorded.");
+	}
+	$panelBody
+		.append($commandLabel)
+		.append($command)
+		.append($stdoutLabel)
+		.append($stdout)
+		.append($stderrLabel)
+		.append($stderr);
+	if(!this.passed) {
+		var $logLabel = $('<div>log:</div>');
+		var $log = $('<pre class="pre-scrollable" style="margin-left: 10px;">').text(this.problemLog);
+		$panelBody.append($logLabel).append($log);
+	}
 }
 
 // http://stackoverflow.com/questions/5202085/javascript-equivalent-of-pythons-rsplit
@@ -58,8 +58,12 @@
           <div id="overview-content"></div>
           <div class="progress">
           </div>
+          <div id="slowest-tests"></div>
           <h2 id="tests">Tests</h2>
           <p>The remainder of this contains a description for each test executed to run these jobs.</p>
+          <div class="btn-group" role="group" id="test-filters"></div>
+          <div id="test-panels"></div>
+          <nav><ul class="pagination" id="test-pagination"></ul></nav>
         </div>
       </div>
     </div>
@@ -78,8 +82,8 @@
         .success(function(content) { renderTestResults( $.parseJSON(content) ); })
         .failure(function() { alert("Failed to load test data.")} );
       } else {
-        var test_data = {{ json.dumps(raw_data) }};
-        renderTestResults(test_data);
+        var test_data = {{ script_json(raw_data) }};
+        renderTestResults(test_data, {{ slowest_count }});
       }
     </script>
   </body>
@@ -10,14 +10,30 @@
 | Failure    | {{ raw_data.summary.num_failure | default(0) }} |
 | Skipped    | {{ raw_data.summary.num_skipped | default(0) }} |
 
+{% if slowest_tests %}
+## Slowest Tests
+
+| Test | {% for key, title in metrics %}{{ title }} | {% endfor %}
+| ---- | {% for key, title in metrics %}{{ '-' * title|length }} | {% endfor %}
+{% for test in slowest_tests -%}
+| {{ test.id }} | {% for key, title in metrics %}{{ format_metric(key, test.data.job_metrics.get(key)) }} | {% endfor %}
+{% endfor %}
+{% endif %}
 
 ## Detailed Results
 {% for test in raw_data.tests %}
 ### {{ test.id }}
+{% if test.data.job_metrics %}
+| {% for key, title in metrics %}{{ title }} | {% endfor %}
+| {% for key, title in metrics %}{{ '-' * title|length }} | {% endfor %}
+| {% for key, title in metrics %}{{ format_metric(key, test.data.job_metrics.get(key)) }} | {% endfor %}
+
+{% endif %}
 {% if test.data.status == 'success' %}
 Job Passed
 {% else %}
 Job Error! (State: {{ test.data.status }})
+{% if test.data.job %}
 
 Command Line:
 
@@ -26,6 +42,7 @@ Command Line:
 ```
 
 exited with code {{ test.data.job.exit_code }}.
+{% endif %}
 
 #### Problems
 
@@ -35,7 +52,7 @@ exited with code {{ test.data.job.exit_code }}.
 ```
 {% endfor %}
 
-{% if test.data.job.stdout %}
+{% if test.data.job and test.data.job.stderr %}
 #### `stderr`
 
 ```console
@@ -43,7 +60,7 @@ exited with code {{ test.data.job.exit_code }}.
 ```
 
 {% endif %}
-{% if test.data.job.stdout %}
+{% if test.data.job and test.data.job.stdout %}
 #### `stdout`
 
 ```console
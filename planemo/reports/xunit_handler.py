@@ -1,8 +1,48 @@
-from .build_report import template_data
+from xml.sax.saxutils import escape, quoteattr
+
+from planemo.io import atomic_write
+from .build_report import write_template_data
+
+# Status of structured test data mapped to xunit problem element.
+PROBLEM_ELEMENTS = {"failure": "failure", "error": "error", "skip": "skipped"}
 
 
 def handle_report_xunit_kwd(kwds, collected_data):
     if kwds.get('report_xunit', False):
-        with open(kwds['report_xunit'], 'w') as handle:
-            handle.write(template_data(
-                collected_data, template_name='xunit.tpl'))
+        write_template_data(
+            collected_data, kwds['report_xunit'], template_name='xunit.tpl')
+
+
+def write_test_xunit(structured_data, path, suitename="planemo"):
+    """Write xunit report for structured test data, streaming test by test."""
+    summary = structured_data["summary"]
+    with atomic_write(path, encoding="utf-8") as f:
+        f.write(u'<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(u'<testsuite name=%s tests="%d" errors="%d" failures="%d" skips="%d">\n' % (
+            quoteattr(suitename), summary["num_tests"], summary["num_errors"],
+            summary["num_failures"], summary["num_skips"],
+        ))
+        for test in structured_data["tests"]:
+            f.write(_testcase_xml(test))
+        f.write(u'</testsuite>\n')
+
+
+def _testcase_xml(test):
+    data = test.get("data") or {}
+    classname, _, name = test["id"].rpartition(".")
+    parts = [u'  <testcase classname=%s name=%s>\n' % (quoteattr(classname), quoteattr(name))]
+    problem_element = PROBLEM_ELEMENTS.get(data.get("status", None), None)
+    if problem_element is not None:
+        parts.append(u'    <%s type=%s>%s</%s>\n' % (
+            problem_element,
+            quoteattr(data.get("problem_type", None) or data["status"]),
+            escape(data.get("problem_log", None) or ""),
+            problem_element,
+        ))
+    job = data.get("job", None) or {}
+    if job.get("stdout", None):
+        parts.append(u'    <system-out>%s</system-out>\n' % escape(job["stdout"]))
+    if job.get("stderr", None):
+        parts.append(u'    <system-err>%s</system-err>\n' % escape(job["stderr"]))
+    parts.append(u'  </testcase>\n')
+    return u"".join(parts)
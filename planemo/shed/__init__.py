@@ -9,9 +9,12 @@ import re
 import shutil
 import sys
 import tarfile
+import threading
+import weakref
 from collections import namedtuple
 from tempfile import (
     mkstemp,
+    SpooledTemporaryFile,
 )
 
 import bioblend
@@ -23,27 +26,51 @@ from planemo import git
 from planemo import glob
 from planemo import templates
 from planemo.io import (
+    buffered_output,
     can_write_to_path,
     coalesce_return_codes,
     error,
     find_matching_directories,
     info,
-    shell,
+    map_concurrently,
     temp_directory,
+    thread_routed_io,
     warn,
 )
 from planemo.shed2tap.base import BasePackage
 from planemo.tools import yield_tool_sources
-from .diff import diff_and_remove
+from planemo.walker import directory_walker
+from .cache import (
+    DEFAULT_MAX_SIZE_MB,
+    TarballCache,
+)
+from .diff import (
+    compare_manifests,
+    DEFAULT_DIFF_FORMAT,
+    RepositoryManifest,
+    write_manifest_diff,
+)
 from .interface import (
     api_exception_to_message,
-    download_tar,
+    download_tar_file,
     find_category_ids,
     find_repository,
     latest_installable_revision,
+    RepositoryIndex,
+    set_shed_request_limit,
+    tip_changeset_revision,
     tool_shed_instance,
+    update_repository_contents,
     username,
 )
+from .ledger import (
+    LEDGER_NAME,
+    UploadLedger,
+)
+from .tarball import (
+    RepositoryTarball,
+    SPOOL_MAX_SIZE,
+)
 
 SHED_CONFIG_NAME = '.shed.yml'
 REPO_DEPENDENCIES_CONFIG_NAME = "repository_dependencies.xml"
@@ -281,13 +308,14 @@ def report_non_existent_repository(realized_repository):
 
 def upload_repository(ctx, realized_repository, **kwds):
     """Upload a tool directory as a tarball to a tool shed."""
-    path = realized_repository.path
     tar_path = kwds.get("tar", None)
-    if not tar_path:
-        tar_path = build_tarball(path, **kwds)
     if kwds.get("tar_only", False):
         name = realized_repository.pattern_to_file_name("shed_upload.tar.gz")
-        shutil.copy(tar_path, name)
+        if tar_path:
+            shutil.copy(tar_path, name)
+        else:
+            tarball = realized_repository.tarball().write_to_path(name)
+            _log_tarball(ctx, realized_repository, tarball)
         return 0
     shed_context = get_shed_context(ctx, **kwds)
     update_kwds = {}
@@ -298,31 +326,122 @@ def upload_repository(ctx, realized_repository, **kwds):
     if repo_id is None:
         return report_non_existent_repository(realized_repository)
 
+    tarball = None
+    tarball_file = None
+    if not tar_path:
+        tarball = realized_repository.tarball()
+        tarball_file = tarball.spooled()
+        _log_tarball(ctx, realized_repository, tarball)
+    try:
+        return _upload_tarball(
+            ctx, shed_context, realized_repository, repo_id,
+            tar_path, tarball, tarball_file, update_kwds, **kwds
+        )
+    finally:
+        if tarball_file is not None:
+            tarball_file.close()
+
+
+def _upload_tarball(ctx, shed_context, realized_repository, repo_id,
+                    tar_path, tarball, tarball_file, update_kwds, **kwds):
+    name = realized_repository.name
+    ledger = None
     if kwds.get("check_diff", False):
+        ledger = upload_ledger(ctx)
+        digest = tarball.digest if tarball else None
+        owner = repository_owner(ctx, shed_context, realized_repository)
+        if ledger.is_unchanged(
+            shed_context.tsi.base_url,
+            owner,
+            name,
+            digest,
+            _tip_changeset_revision(shed_context, realized_repository, owner),
+        ):
+            ctx.vlog("Contents of repository [%s] match the last upload recorded in the ledger." % name)
+            info("Repository [%s] not different, skipping upload." % name)
+            return 0
+
         is_diff = diff_repo(ctx, realized_repository, **kwds) != 0
         if not is_diff:
-            name = realized_repository.name
             info("Repository [%s] not different, skipping upload." % name)
+            _record_upload(ctx, ledger, shed_context, realized_repository, tarball)
             return 0
 
     # TODO: support updating repo information if it changes in the config file
     try:
-        shed_context.tsi.repositories.update_repository(
-            str(repo_id), tar_path, **update_kwds
-        )
+        if tarball_file is not None:
+            update_repository_contents(
+                shed_context.tsi, str(repo_id), tarball_file, **update_kwds
+            )
+        else:
+            shed_context.tsi.repositories.update_repository(
+                str(repo_id), tar_path, **update_kwds
+            )
     except Exception as e:
         if isinstance(e, bioblend.ConnectionError) and e.status_code == 400 and \
                 '"No changes to repository."' in e.body:
-            warn("Repository %s was not updated because there were no changes" % realized_repository.name)
+            warn("Repository %s was not updated because there were no changes" % name)
+            _record_upload(ctx, ledger, shed_context, realized_repository, tarball)
             return 0
         message = api_exception_to_message(e)
-        error("Could not update %s" % realized_repository.name)
+        error("Could not update %s" % name)
         error(message)
         return -1
-    info("Repository %s updated successfully." % realized_repository.name)
+    info("Repository %s updated successfully." % name)
+    _record_upload(ctx, ledger, shed_context, realized_repository, tarball)
     return 0
 
 
+def _record_upload(ctx, ledger, shed_context, realized_repository, tarball):
+    if ledger is None or tarball is None:
+        return
+    owner = repository_owner(ctx, shed_context, realized_repository)
+    changeset_revision = _tip_changeset_revision(shed_context, realized_repository, owner)
+    if changeset_revision is None:
+        return
+    ledger.record(
+        shed_context.tsi.base_url,
+        owner,
+        realized_repository.name,
+        tarball.digest,
+        changeset_revision,
+    )
+
+
+def repository_owner(ctx, shed_context, realized_repository):
+    """Return the realized repository's owner on the shed (or None).
+
+    Falls back to the authenticated user as when finding the repository.
+    """
+    try:
+        return _owner(ctx, realized_repository.config, shed_context)
+    except Exception:
+        return None
+
+
+def _tip_changeset_revision(shed_context, realized_repository, owner):
+    if owner is None:
+        return None
+    try:
+        return tip_changeset_revision(shed_context.tsi, owner, realized_repository.name)
+    except Exception:
+        return None
+
+
+def upload_ledger(ctx):
+    """Return the :class:`UploadLedger` stored in planemo's workspace."""
+    with _shed_state_lock:
+        if ctx not in _upload_ledgers:
+            _upload_ledgers[ctx] = UploadLedger(os.path.join(ctx.workspace, LEDGER_NAME))
+        return _upload_ledgers[ctx]
+
+
+def _log_tarball(ctx, realized_repository, tarball):
+    ctx.vlog("Built tarball for repository [%s] (%d bytes) in %.2f seconds." % (
+        realized_repository.name, tarball.size, tarball.build_time
+    ))
+
+
 def _update_commit_message(ctx, realized_repository, update_kwds, **kwds):
     message = kwds.get("message", None)
     git_rev = realized_repository.git_rev(ctx)
@@ -342,12 +461,6 @@ def diff_repo(ctx, realized_repository, **kwds):
     Returns 0 if and only the repositories are effectively the same
     given supplied kwds for comparison description.
     """
-    with temp_directory("tool_shed_diff_") as working:
-        return _diff_in(ctx, working, realized_repository, **kwds)
-
-
-def _diff_in(ctx, working, realized_repository, **kwds):
-    path = realized_repository.path
     shed_target_source = kwds.get("shed_target_source", None)
 
     label_a = "_%s_" % (shed_target_source if shed_target_source else "workingdir")
@@ -356,9 +469,6 @@ def _diff_in(ctx, working, realized_repository, **kwds):
         shed_target = "custom_shed"
     label_b = "_%s_" % shed_target
 
-    mine = os.path.join(working, label_a)
-    other = os.path.join(working, label_b)
-
     shed_context = get_shed_context(ctx, read_only=True, **kwds)
     # In order to download the tarball, require repository ID...
     repo_id = realized_repository.find_repository_id(ctx, shed_context)
@@ -369,49 +479,34 @@ def _diff_in(ctx, working, realized_repository, **kwds):
         # 2
         return 2
     info("Diffing repository [%s]" % realized_repository.name)
-    download_tarball(
-        ctx,
-        shed_context,
-        realized_repository,
-        destination=other,
-        clean=True,
-        destination_is_pattern=False,
-        **kwds
-    )
-    if shed_target_source:
-        new_kwds = kwds.copy()
-        new_kwds["shed_target"] = shed_target_source
-        shed_context = get_shed_context(ctx, read_only=True, **new_kwds)
-        download_tarball(
-            ctx,
-            shed_context,
-            realized_repository,
-            destination=mine,
-            clean=True,
-            destination_is_pattern=False,
-            **new_kwds
-        )
-    else:
-        tar_path = build_tarball(path)
-        os.mkdir(mine)
-        shell(['tar', '-xzf', tar_path, '-C', mine])
-        shutil.rmtree(tar_path, ignore_errors=True)
+    with _download_tarball_file(ctx, shed_context, realized_repository, **kwds) as other_file:
+        other = RepositoryManifest.from_tarball(label_b, other_file)
+        if shed_target_source:
+            new_kwds = kwds.copy()
+            new_kwds["shed_target"] = shed_target_source
+            source_context = get_shed_context(ctx, read_only=True, **new_kwds)
+            with _download_tarball_file(ctx, source_context, realized_repository, **new_kwds) as mine_file:
+                mine = RepositoryManifest.from_tarball(label_a, mine_file)
+                return _diff_manifests(ctx, mine, other, **kwds)
+        else:
+            sources = realized_repository.file_sources()
+            mine = RepositoryManifest.from_files(label_a, sources)
+            return _diff_manifests(ctx, mine, other, **kwds)
 
+
+def _diff_manifests(ctx, mine, other, **kwds):
     output = kwds.get("output", None)
     raw = kwds.get("raw", False)
-    xml_diff = 0
-    if not raw:
-        if output:
-            with open(output, "w") as f:
-                xml_diff = diff_and_remove(working, label_a, label_b, f)
-        else:
-            xml_diff = diff_and_remove(working, label_a, label_b, sys.stdout)
-
-    cmd = 'cd "%s"; diff -r %s %s' % (working, label_a, label_b)
+    diff_format = kwds.get("diff_format", None) or DEFAULT_DIFF_FORMAT
+    manifest_diff = compare_manifests(mine, other, raw=raw)
     if output:
-        cmd += " >> '%s'" % output
-    raw_diff = shell(cmd)
-    exit = raw_diff or xml_diff
+        with open(output, "w") as f:
+            write_manifest_diff(manifest_diff, mine, other, f, diff_format)
+    else:
+        write_manifest_diff(manifest_diff, mine, other, sys.stdout, diff_format)
+
+    xml_diff = bool(manifest_diff.xml_changes)
+    raw_diff = bool(manifest_diff.changes)
     if not raw:
         if xml_diff:
             ctx.vlog("One or more shed XML file(s) different!")
@@ -419,7 +514,55 @@ def _diff_in(ctx, working, realized_repository, **kwds):
             ctx.vlog("One or more non-shed XML file(s) different.")
         if not xml_diff and not raw_diff:
             ctx.vlog("No differences.")
-    return exit
+    return 1 if (xml_diff or raw_diff) else 0
+
+
+def _download_tarball_file(ctx, shed_context, realized_repository, **kwds):
+    """Return open file containing repository's tarball.
+
+    Archives of the repository's tip are cached in the workspace tarball
+    cache by changeset revision (downloading them into it if needed). If the
+    tip cannot be determined the archive is downloaded into a spooled
+    temporary file.
+    """
+    repo_id = realized_repository.find_repository_id(ctx, shed_context)
+    if repo_id is None:
+        message = "Unable to find repository id, cannot download."
+        error(message)
+        raise Exception(message)
+    tsi = shed_context.tsi
+    cache = tarball_cache(ctx, **kwds)
+    changeset_revision = None
+    if cache is not None:
+        # Key by tip - what is downloaded by default - since the latest
+        # installable revision doesn't change with every upload.
+        owner = repository_owner(ctx, shed_context, realized_repository)
+        changeset_revision = _tip_changeset_revision(shed_context, realized_repository, owner)
+    if changeset_revision is None:
+        tarball_file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        download_tar_file(tsi, repo_id, tarball_file)
+        return tarball_file
+
+    tarball_file = cache.open(tsi.base_url, repo_id, changeset_revision)
+    if tarball_file is not None:
+        ctx.vlog("Using cached tarball for repository [%s] revision [%s]." % (
+            realized_repository.name, changeset_revision
+        ))
+        return tarball_file
+
+    def download(f):
+        download_tar_file(tsi, repo_id, f, changeset_revision=changeset_revision)
+
+    return cache.store(tsi.base_url, repo_id, changeset_revision, download)
+
+
+def tarball_cache(ctx, **kwds):
+    """Return the workspace :class:`TarballCache` (or None if disabled)."""
+    size = kwds.get("shed_tarball_cache_size", DEFAULT_MAX_SIZE_MB)
+    if ctx is None or not size:
+        return None
+    directory = os.path.join(ctx.cache_directory, "shed_tarballs")
+    return TarballCache(directory, max_size=size * 1024 * 1024)
 
 
 def shed_repo_config(ctx, path, name=None):
@@ -457,10 +600,34 @@ def get_shed_context(ctx=None, **kwds):
         password = prop("password")
 
     tsi = tool_shed_instance(url, key, email, password)
+    repository_index(ctx, **kwds)
     owner = username
     return ShedContext(tsi, shed_config, owner)
 
 
+_repository_indices = weakref.WeakKeyDictionary()
+_upload_ledgers = weakref.WeakKeyDictionary()
+_shed_state_lock = threading.Lock()
+
+
+def repository_index(ctx, **kwds):
+    """Return the :class:`RepositoryIndex` shared by this planemo invocation.
+
+    The index is created from ``kwds`` the first time it is requested for
+    ``ctx``, a new memory-only index is returned if ``ctx`` is None.
+    """
+    if ctx is None:
+        return RepositoryIndex()
+    with _shed_state_lock:
+        if ctx not in _repository_indices:
+            ttl = kwds.get("shed_index_ttl", None) or 0
+            cache_directory = None
+            if ttl > 0:
+                cache_directory = os.path.join(ctx.cache_directory, "shed_repositories")
+            _repository_indices[ctx] = RepositoryIndex(cache_directory=cache_directory, ttl=ttl)
+        return _repository_indices[ctx]
+
+
 def tool_shed_url(ctx, **kwds):
     shed_config, _ = _shed_config_and_username(ctx, **kwds)
     return _shed_config_to_url(shed_config)
@@ -519,7 +686,9 @@ def find_repository_id(ctx, shed_context, path, **kwds):
 def _find_repository_id(ctx, shed_context, name, repo_config, **kwds):
     # TODO: modify to consume shed_context
     owner = _owner(ctx, repo_config, shed_context, **kwds)
-    matching_repository = find_repository(shed_context.tsi, owner, name)
+    matching_repository = find_repository(
+        shed_context.tsi, owner, name, index=repository_index(ctx)
+    )
     if matching_repository is None:
         if not kwds.get("allow_none", False):
             message = "Failed to find repository for owner/name %s/%s"
@@ -695,22 +864,23 @@ def create_repository_for(ctx, tsi, name, repo_config):
         homepage_url=homepage_url,
         category_ids=category_ids
     )
+    repository_index(ctx).add(tsi, repo)
     return repo
 
 
 def download_tarball(ctx, shed_context, realized_repository, **kwds):
-    repo_id = realized_repository.find_repository_id(ctx, shed_context)
-    if repo_id is None:
-        message = "Unable to find repository id, cannot download."
-        error(message)
-        raise Exception(message)
     destination_pattern = kwds.get('destination', 'shed_download.tar.gz')
     if kwds.get("destination_is_pattern", True):
         destination = realized_repository.pattern_to_file_name(destination_pattern)
     else:
         destination = destination_pattern
     to_directory = not destination.endswith("gz")
-    download_tar(shed_context.tsi, repo_id, destination, to_directory=to_directory)
+    with _download_tarball_file(ctx, shed_context, realized_repository, **kwds) as tarball_file:
+        if to_directory:
+            _extract_tarball(tarball_file, destination)
+        else:
+            with open(destination, "wb") as f:
+                shutil.copyfileobj(tarball_file, f)
     if to_directory:
         clean = kwds.get("clean", False)
         if clean:
@@ -719,27 +889,32 @@ def download_tarball(ctx, shed_context, realized_repository, **kwds):
                 os.remove(archival_file)
 
 
-def build_tarball(realized_path, **kwds):
+def _extract_tarball(fileobj, destination, strip_components=1):
+    tar = tarfile.open(fileobj=fileobj, mode="r:gz")
+    try:
+        members = []
+        for member in tar.getmembers():
+            parts = member.name.split("/")[strip_components:]
+            if not parts or ".." in parts or os.path.isabs(member.name):
+                continue
+            member.name = "/".join(parts)
+            members.append(member)
+        tar.extractall(destination, members=members)
+    finally:
+        tar.close()
+
+
+def build_tarball(realized_path, files=None, **kwds):
     """Build a tool-shed tar ball for the specified path, caller is
     responsible for deleting this file.
-    """
-
-    # Simplest solution to sorting the files is to use a list,
-    files = []
-    for dirpath, dirnames, filenames in os.walk(realized_path):
-        for f in filenames:
-            files.append(os.path.join(dirpath, f))
-    files.sort()
 
+    The tarball is reproducible, see :class:`RepositoryTarball`. If
+    ``files`` maps archive names to source paths, it is built from that
+    instead of walking ``realized_path``.
+    """
     fd, temp_path = mkstemp()
     try:
-        tar = tarfile.open(temp_path, "w:gz", dereference=True)
-        try:
-            for raw in files:
-                name = os.path.relpath(raw, realized_path)
-                tar.add(os.path.join(realized_path, name), arcname=name)
-        finally:
-            tar.close()
+        RepositoryTarball(realized_path, files=files).write_to_path(temp_path)
     finally:
         os.close(fd)
     return temp_path
@@ -753,11 +928,28 @@ def find_raw_repositories(ctx, paths, **kwds):
     return raw_repo_objects
 
 
-def for_each_repository(ctx, function, paths, **kwds):
+def for_each_repository(ctx, function, paths, planner=None, **kwds):
+    """Apply ``function`` to each repository realized from ``paths``.
+
+    If ``jobs`` is greater than 1, the repositories realized from each path
+    are processed concurrently and output for each one is buffered until it
+    completes (``function`` must then be safe to call from multiple threads).
+
+    If ``planner`` is supplied it is called with the list of all repositories
+    realized from each path before any of them are processed.
+    """
+    jobs = kwds.get("jobs", 1) or 1
+    if jobs > 1:
+        set_shed_request_limit(kwds.get("shed_request_limit", None))
     ret_codes = []
     for path in paths:
         with _path_on_disk(ctx, path) as raw_path:
             try:
+                if jobs > 1 or planner is not None:
+                    ret_codes.extend(_for_each_realized_repository(
+                        ctx, function, raw_path, planner, **kwds
+                    ))
+                    continue
                 for realized_repository in _realize_effective_repositories(
                     ctx, raw_path, **kwds
                 ):
@@ -771,6 +963,38 @@ def for_each_repository(ctx, function, paths, **kwds):
     return coalesce_return_codes(ret_codes)
 
 
+def _for_each_realized_repository(ctx, function, path, planner, **kwds):
+    # Realize every repository up front, then plan and process them.
+    def process(realized_repository):
+        with buffered_output():
+            return function(realized_repository)
+
+    jobs = kwds.get("jobs", 1) or 1
+    with temp_directory() as base_dir:
+        realized_repositories = []
+        failed = False
+        try:
+            for realized_repository in _realize_effective_repositories(
+                ctx, path, base_dir=base_dir, **kwds
+            ):
+                realized_repositories.append(realized_repository)
+        except RealizationException:
+            failed = True
+
+        if planner is not None:
+            planner(realized_repositories)
+        if jobs > 1:
+            with thread_routed_io():
+                ret_codes = map_concurrently(
+                    process, realized_repositories, jobs
+                )
+        else:
+            ret_codes = [function(r) for r in realized_repositories]
+    if failed:
+        raise RealizationException()
+    return ret_codes
+
+
 def path_to_repo_name(path):
     return os.path.basename(os.path.abspath(path))
 
@@ -811,7 +1035,7 @@ def _realize_effective_repositories(ctx, path, **kwds):
     """
     raw_repo_objects = _find_raw_repositories(ctx, path, **kwds)
     failed = False
-    with temp_directory() as base_dir:
+    with _realization_directory(kwds.pop("base_dir", None)) as base_dir:
         for raw_repo_object in raw_repo_objects:
             if isinstance(raw_repo_object, Exception):
                 _handle_realization_error(raw_repo_object, **kwds)
@@ -833,6 +1057,15 @@ def _realize_effective_repositories(ctx, path, **kwds):
         raise RealizationException()
 
 
+@contextlib.contextmanager
+def _realization_directory(base_dir):
+    if base_dir is not None:
+        yield base_dir
+    else:
+        with temp_directory() as temp_dir:
+            yield temp_dir
+
+
 def _create_shed_config(ctx, path, **kwds):
     name = kwds.get("name", None) or path_to_repo_name(os.path.dirname(path))
     name_invalid = validate_repo_name(name)
@@ -914,7 +1147,7 @@ def _find_raw_repositories(ctx, path, **kwds):
     recursive = kwds.get("recursive", False)
 
     shed_file_dirs = find_matching_directories(
-        path, SHED_CONFIG_NAME, recursive=recursive
+        path, SHED_CONFIG_NAME, recursive=recursive, walker=directory_walker(ctx)
     )
 
     config_name = None
@@ -1006,8 +1239,6 @@ class RawRepositoryDirectory(object):
         for name in names:
             directory = os.path.join(parent_directory, self._hash(name), name)
             multiple = self.multiple or len(names) > 1
-            if not os.path.exists(directory):
-                os.makedirs(directory)
             r_kwds = kwds.copy()
             if "name" in r_kwds:
                 del r_kwds["name"]
@@ -1029,18 +1260,24 @@ class RawRepositoryDirectory(object):
             msg = "Failed to include files for %s" % missing
             return RuntimeError(msg)
 
+        # Only the mapping of destinations to sources is built here, the
+        # directory itself is materialised if and when a command needs it.
+        manifest = odict.odict()
         for realized_file in realized_files.files:
             relative_dest = realized_file.dest
             implicit_ignore = self._implicit_ignores(relative_dest)
             explicit_ignore = (realized_file.absolute_src in ignore_list)
             if implicit_ignore or explicit_ignore:
                 continue
-            realized_file.realize_to(directory)
+            realized_file.add_to(manifest)
 
         for (name, contents) in six.iteritems(config.get("_files", {})):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
             path = os.path.join(directory, name)
             with open(path, "w") as f:
                 f.write(contents)
+            manifest[name] = path
 
         return RealizedRepositry(
             realized_path=directory,
@@ -1048,8 +1285,18 @@ class RawRepositoryDirectory(object):
             config=config,
             multiple=multiple,
             missing=missing,
+            manifest=manifest,
         )
 
+    def source_files(self):
+        """Return set of absolute paths of files included in any repository."""
+        sources = set()
+        for name in self._repo_names():
+            for realized_file in self._realized_files(name).files:
+                if not self._implicit_ignores(realized_file.dest):
+                    sources.add(realized_file.absolute_src)
+        return sources
+
     def _repo_names(self):
         return self.config.get("repositories").keys()
 
@@ -1132,22 +1379,27 @@ class RealizedFile(object):
         return os.path.abspath(os.path.join(self.src_root, self.src))
 
     def realize_to(self, directory):
+        manifest = odict.odict()
+        self.add_to(manifest)
+        _materialize_manifest(directory, manifest)
+
+    def add_to(self, manifest):
+        """Map destination to source in ``manifest`` (None for directories).
+
+        As when realizing to a directory, the first file for a destination
+        wins.
+        """
+        relative_dest = self.dest
+        assert relative_dest != "."
+        if relative_dest in manifest:
+            return
         source_path = self.absolute_src
         if os.path.islink(source_path):
             source_path = os.path.realpath(source_path)
-        relative_dest = self.dest
-        assert relative_dest != "."
-        target_path = os.path.join(directory, relative_dest)
-        target_exists = os.path.exists(target_path)
-        # info("realize_to %r --> %r" % (source_path, target_path))
-        if not target_exists:
-            target_dir = os.path.dirname(target_path)
-            if not os.path.exists(target_dir):
-                os.makedirs(target_dir)
-            if os.path.isdir(source_path):
-                os.makedirs(target_path)
-            else:
-                os.symlink(source_path, target_path)
+        if os.path.isdir(source_path):
+            manifest[relative_dest] = None
+        else:
+            manifest[relative_dest] = source_path
 
     @staticmethod
     def realized_files_for(path, include_info):
@@ -1196,14 +1448,50 @@ class RealizedFile(object):
 
 
 class RealizedRepositry(object):
+    """A shed repository realized from a raw repository directory.
+
+    Realization is virtual - ``manifest`` maps destination paths to source
+    files (or None for directories) and the symlinked directory at ``path``
+    is only created the first time it is accessed.
+    """
 
-    def __init__(self, realized_path, real_path, config, multiple, missing):
-        self.path = realized_path
+    def __init__(self, realized_path, real_path, config, multiple, missing, manifest=None):
+        self._realized_path = realized_path
         self.real_path = real_path
         self.config = config
         self.name = config["name"]
         self.multiple = multiple
         self.missing = missing
+        self.manifest = manifest
+        self._materialized = manifest is None
+        self._materialize_lock = threading.Lock()
+
+    @property
+    def path(self):
+        if not self._materialized:
+            with self._materialize_lock:
+                if not self._materialized:
+                    _materialize_manifest(self._realized_path, self.manifest)
+                    self._materialized = True
+        return self._realized_path
+
+    def file_sources(self):
+        """Return mapping of relative paths of files to their sources."""
+        if self.manifest is None:
+            files = RepositoryTarball(self.path).files()
+            return dict((f, os.path.join(self.path, f)) for f in files)
+        return dict((dest, source) for dest, source in six.iteritems(self.manifest)
+                    if source is not None)
+
+    def includes(self, relative_path):
+        """Check if the realized repository contains ``relative_path``."""
+        if self.manifest is None:
+            return os.path.exists(os.path.join(self.path, relative_path))
+        return relative_path in self.manifest
+
+    def tarball(self):
+        """Return a :class:`RepositoryTarball` built from the manifest."""
+        return RepositoryTarball(self._realized_path, files=self.file_sources())
 
     @property
     def owner(self):
@@ -1248,6 +1536,18 @@ class RealizedRepositry(object):
             parts = pattern.split(".", 1)
             return parts[0] + suffix + "." + parts[1]
 
+    def find_repository(self, ctx, shed_context):
+        """Return the shed's description of this repository (or None)."""
+        try:
+            owner = _owner(ctx, self.config, shed_context)
+            return find_repository(
+                shed_context.tsi, owner, self.name, index=repository_index(ctx)
+            )
+        except Exception as e:
+            message = api_exception_to_message(e)
+            error("Could not find repository [%s]: %s" % (self.name, message))
+            return None
+
     def find_repository_id(self, ctx, shed_context):
         try:
             repo_id = _find_repository_id(
@@ -1332,6 +1632,23 @@ class RealizedRepositry(object):
         )
 
 
+def _materialize_manifest(directory, manifest):
+    for relative_dest, source_path in six.iteritems(manifest):
+        target_path = os.path.join(directory, relative_dest)
+        # Generated files are written to the directory during realization.
+        if os.path.lexists(target_path):
+            continue
+        target_dir = os.path.dirname(target_path)
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+        if source_path is None:
+            os.makedirs(target_path)
+        else:
+            os.symlink(source_path, target_path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+
 def _glob(path, pattern):
     pattern = os.path.join(path, pattern)
     if os.path.isdir(pattern):
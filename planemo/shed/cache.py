@@ -0,0 +1,105 @@
+"""Workspace cache of repository tarballs downloaded from Tool Sheds.
+
+Archives are keyed by shed URL, repository id and changeset revision - so an
+entry never goes stale - and the least recently used archives are evicted once
+the cache grows beyond its size limit. A lock file serialises updates so
+concurrent planemo processes can share the cache.
+"""
+import contextlib
+import errno
+import fcntl
+import hashlib
+import os
+import threading
+
+LOCK_NAME = ".lock"
+ARCHIVE_SUFFIX = ".tar.gz"
+DEFAULT_MAX_SIZE_MB = 1024
+
+
+class TarballCache(object):
+    """Size bounded LRU cache of repository tarballs below ``directory``."""
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+
+    def open(self, shed_url, repo_id, changeset_revision):
+        """Return an open binary file for cached archive (or None)."""
+        path = self._path(shed_url, repo_id, changeset_revision)
+        with self._lock():
+            if not os.path.exists(path):
+                return None
+            # Opened under the lock so eviction by another process can't
+            # remove it first, touched to record use for LRU eviction.
+            os.utime(path, None)
+            return open(path, "rb")
+
+    def store(self, shed_url, repo_id, changeset_revision, write):
+        """Cache the archive written by ``write(fileobj)`` and return it open.
+
+        The download happens outside the lock, only the final rename and
+        eviction are serialised.
+        """
+        path = self._path(shed_url, repo_id, changeset_revision)
+        _ensure_directory(os.path.dirname(path))
+        temp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.current_thread().ident)
+        try:
+            with open(temp_path, "wb") as f:
+                write(f)
+            with self._lock():
+                os.rename(temp_path, path)
+                self._evict(keep=path)
+                return open(path, "rb")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _path(self, shed_url, repo_id, changeset_revision):
+        shed_hash = hashlib.sha1(shed_url.rstrip("/").encode("utf-8")).hexdigest()[:8]
+        return os.path.join(
+            self.directory, shed_hash, repo_id, "%s%s" % (changeset_revision, ARCHIVE_SUFFIX)
+        )
+
+    def _evict(self, keep):
+        archives = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(ARCHIVE_SUFFIX):
+                    continue
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                archives.append((stat.st_mtime, path, stat.st_size))
+                total += stat.st_size
+        for _, path, size in sorted(archives):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+
+    @contextlib.contextmanager
+    def _lock(self):
+        _ensure_directory(self.directory)
+        with open(os.path.join(self.directory, LOCK_NAME), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _ensure_directory(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+__all__ = (
+    "DEFAULT_MAX_SIZE_MB",
+    "TarballCache",
+)
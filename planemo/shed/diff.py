@@ -2,15 +2,38 @@
 
 Some intelligence is required because the tool shed updates attributes that it
 is beneficial to ignore.
+
+Repositories are compared in process using manifests of (path, size, digest)
+built from a realized directory or read directly from a tarball stream - only
+files whose digests differ are read and content-diffed.
 """
 from __future__ import print_function
 
+import difflib
+import hashlib
+import json
 import os
 import sys
+import tarfile
+from collections import namedtuple
 from xml.etree import ElementTree
 
+from planemo.walker import DirectoryWalker
 from planemo.xml import diff
 
+SHED_XML_FILES = ["tool_dependencies.xml", "repository_dependencies.xml"]
+# Attributes the Tool Shed populates when repositories are uploaded.
+SHED_IGNORED_ATTRIBUTES = {"repository": ["changeset_revision", "toolshed"]}
+# Files the Tool Shed adds to downloaded archives.
+SHED_ARCHIVE_FILES = [".hg_archival.txt"]
+DIFF_FORMATS = ["diff", "unified", "json"]
+DEFAULT_DIFF_FORMAT = "diff"
+READ_CHUNK_SIZE = 64 * 1024
+
+ManifestEntry = namedtuple("ManifestEntry", ["size", "digest"])
+FileChange = namedtuple("FileChange", ["status", "path"])
+ManifestDiff = namedtuple("ManifestDiff", ["changes", "xml_changes", "xml_messages"])
+
 
 def diff_and_remove(working, label_a, label_b, f):
     """Remove tool shed XML files and use a smart XML diff on them.
@@ -19,10 +42,10 @@ def diff_and_remove(working, label_a, label_b, f):
     attirbutes the tool shed updates.
     """
     assert label_a != label_b
-    special = ["tool_dependencies.xml", "repository_dependencies.xml"]
+    special = SHED_XML_FILES
     deps_diff = 0
     # Could walk either A or B; will only compare if in same relative location
-    for dirpath, dirnames, filenames in os.walk(os.path.join(working, label_a)):
+    for dirpath, dirnames, filenames in DirectoryWalker(prune=()).walk(os.path.join(working, label_a)):
         for filename in filenames:
             if filename in special:
                 a = os.path.join(dirpath, filename)
@@ -35,6 +58,259 @@ def diff_and_remove(working, label_a, label_b, f):
     return deps_diff
 
 
+class RepositoryManifest(object):
+    """Size and digest of each file in one side of a diff keyed by relative path."""
+
+    def __init__(self, label, entries, reader):
+        self.label = label
+        self.entries = entries
+        self._reader = reader
+        self._directories = None
+
+    def directories(self):
+        """Return set of relative directory paths containing files."""
+        if self._directories is None:
+            directories = set()
+            for path in self.entries:
+                parts = path.split("/")
+                for i in range(1, len(parts)):
+                    directories.add("/".join(parts[:i]))
+            self._directories = directories
+        return self._directories
+
+    def read(self, path):
+        """Return contents of file at relative path as bytes."""
+        return self._reader(path)
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    @staticmethod
+    def from_directory(label, directory, paths):
+        """Build manifest for relative ``paths`` below ``directory``."""
+        sources = dict((path, os.path.join(directory, path)) for path in paths)
+        return RepositoryManifest.from_files(label, sources)
+
+    @staticmethod
+    def from_files(label, sources):
+        """Build manifest from a mapping of relative paths to source files."""
+        entries = {}
+        for path, source in sources.items():
+            with open(source, "rb") as f:
+                entries[path] = _manifest_entry(f)
+
+        def reader(path):
+            with open(sources[path], "rb") as f:
+                return f.read()
+
+        return RepositoryManifest(label, entries, reader)
+
+    @staticmethod
+    def from_tarball(label, fileobj, strip_components=1):
+        """Build manifest from a seekable gzipped tarball (e.g. a shed download).
+
+        The archive is read in place, ``fileobj`` must stay open while the
+        manifest is used.
+        """
+        tar = tarfile.open(fileobj=fileobj, mode="r:gz")
+        members = {}
+        entries = {}
+        for member in tar:
+            if not member.isfile():
+                continue
+            parts = member.name.split("/")[strip_components:]
+            if not parts:
+                continue
+            path = "/".join(parts)
+            if path in SHED_ARCHIVE_FILES:
+                continue
+            members[path] = member
+            entries[path] = _manifest_entry(tar.extractfile(member))
+
+        def reader(path):
+            return tar.extractfile(members[path]).read()
+
+        return RepositoryManifest(label, entries, reader)
+
+
+def compare_manifests(manifest_a, manifest_b, raw=False):
+    """Compare two manifests and return a :class:`ManifestDiff`.
+
+    Unless ``raw`` is set, shed XML files present on both sides are compared
+    after stripping the attributes the Tool Shed populates.
+    """
+    skip = set()
+    xml_changes = []
+    xml_messages = []
+    if not raw:
+        for path in _sorted_paths(manifest_a.entries):
+            if os.path.basename(path) not in SHED_XML_FILES or path not in manifest_b:
+                continue
+            skip.add(path)
+            if manifest_a.entries[path] == manifest_b.entries[path]:
+                continue
+            if _shed_diff_contents(manifest_a.read(path), manifest_b.read(path), xml_messages.append):
+                xml_changes.append(FileChange("modified", path))
+
+    changes = []
+    reported_a = set()
+    reported_b = set()
+    all_paths = set(manifest_a.entries.keys()) | set(manifest_b.entries.keys())
+    for path in _sorted_paths(all_paths):
+        if path in skip:
+            continue
+        in_a = path in manifest_a
+        in_b = path in manifest_b
+        if in_a and in_b:
+            if manifest_a.entries[path] != manifest_b.entries[path]:
+                changes.append(FileChange("modified", path))
+        elif in_a:
+            _add_only_in(changes, "only_in_a", path, manifest_b, reported_a)
+        else:
+            _add_only_in(changes, "only_in_b", path, manifest_a, reported_b)
+    return ManifestDiff(changes, xml_changes, xml_messages)
+
+
+def write_manifest_diff(manifest_diff, manifest_a, manifest_b, f, diff_format=DEFAULT_DIFF_FORMAT):
+    """Describe a :class:`ManifestDiff` on file-like ``f``.
+
+    ``diff`` output mimics ``diff -r``, ``unified`` mimics ``diff -ru`` and
+    ``json`` writes one JSON object on a single line.
+    """
+    if diff_format == "json":
+        f.write(json.dumps(_manifest_diff_as_dict(manifest_diff, manifest_a, manifest_b), sort_keys=True))
+        f.write("\n")
+        return
+
+    for message in manifest_diff.xml_messages:
+        f.write(message)
+    label_a = manifest_a.label
+    label_b = manifest_b.label
+    for change in manifest_diff.changes:
+        if change.status == "only_in_a":
+            f.write(_only_in(label_a, change.path))
+        elif change.status == "only_in_b":
+            f.write(_only_in(label_b, change.path))
+        else:
+            path_a = "%s/%s" % (label_a, change.path)
+            path_b = "%s/%s" % (label_b, change.path)
+            contents_a = manifest_a.read(change.path)
+            contents_b = manifest_b.read(change.path)
+            if b"\0" in contents_a or b"\0" in contents_b:
+                f.write("Binary files %s and %s differ\n" % (path_a, path_b))
+                continue
+            lines_a = _lines(contents_a)
+            lines_b = _lines(contents_b)
+            if diff_format == "unified":
+                f.write("diff -ru %s %s\n" % (path_a, path_b))
+                hunks = difflib.unified_diff(lines_a, lines_b, fromfile=path_a, tofile=path_b)
+            else:
+                f.write("diff -r %s %s\n" % (path_a, path_b))
+                hunks = _normal_diff(lines_a, lines_b)
+            for line in hunks:
+                f.write(_terminated(line))
+
+
+def _manifest_diff_as_dict(manifest_diff, manifest_a, manifest_b):
+    def describe(change, shed_xml=False):
+        description = {"path": change.path, "status": change.status}
+        for key, manifest in [("a", manifest_a), ("b", manifest_b)]:
+            entry = manifest.entries.get(change.path, None)
+            if entry is not None:
+                description["size_%s" % key] = entry.size
+                description["digest_%s" % key] = entry.digest
+        if shed_xml:
+            description["shed_xml"] = True
+        return description
+
+    files = [describe(c, shed_xml=True) for c in manifest_diff.xml_changes]
+    files.extend(describe(c) for c in manifest_diff.changes)
+    return {
+        "label_a": manifest_a.label,
+        "label_b": manifest_b.label,
+        "different": bool(files),
+        "files": files,
+    }
+
+
+def _manifest_entry(fileobj):
+    digest = hashlib.sha1()
+    size = 0
+    while True:
+        chunk = fileobj.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    return ManifestEntry(size, digest.hexdigest())
+
+
+def _sorted_paths(paths):
+    # Order entries as diff -r walks directories.
+    return sorted(paths, key=lambda p: p.split("/"))
+
+
+def _add_only_in(changes, status, path, other, reported):
+    # Like diff -r only report the top-most directory missing from other.
+    parts = path.split("/")
+    other_directories = other.directories()
+    for i in range(1, len(parts)):
+        prefix = "/".join(parts[:i])
+        if prefix not in other_directories:
+            if prefix not in reported:
+                reported.add(prefix)
+                changes.append(FileChange(status, prefix))
+            return
+    changes.append(FileChange(status, path))
+
+
+def _only_in(label, path):
+    parent, name = os.path.split(path)
+    directory = "%s/%s" % (label, parent) if parent else label
+    return "Only in %s: %s\n" % (directory, name)
+
+
+def _lines(contents):
+    return contents.decode("utf-8", "replace").splitlines(True)
+
+
+def _terminated(line):
+    if line.endswith("\n"):
+        return line
+    return line + "\n\\ No newline at end of file\n"
+
+
+def _normal_diff(lines_a, lines_b):
+    matcher = difflib.SequenceMatcher(None, lines_a, lines_b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag == "replace":
+            yield "%sc%s\n" % (_range(i1, i2), _range(j1, j2))
+        elif tag == "delete":
+            yield "%sd%d\n" % (_range(i1, i2), j1)
+        else:
+            yield "%da%s\n" % (i1, _range(j1, j2))
+        for line in lines_a[i1:i2]:
+            yield "< " + line
+        if tag == "replace":
+            yield "---\n"
+        for line in lines_b[j1:j2]:
+            yield "> " + line
+
+
+def _range(start, stop):
+    if stop - start == 1:
+        return "%d" % (start + 1)
+    return "%d,%d" % (start + 1, stop)
+
+
+def _shed_diff_contents(contents_a, contents_b, reporter):
+    xml_a = ElementTree.fromstring(contents_a)
+    xml_b = ElementTree.fromstring(contents_b)
+    return diff.diff(xml_a, xml_b, reporter=reporter, ignore_attributes=SHED_IGNORED_ATTRIBUTES)
+
+
 def _shed_diff(file_a, file_b, f=sys.stdout):
     """Strip attributes the tool shed writes and do smart XML diff.
 
@@ -43,26 +319,13 @@ def _shed_diff(file_a, file_b, f=sys.stdout):
     """
     xml_a = ElementTree.parse(file_a).getroot()
     xml_b = ElementTree.parse(file_b).getroot()
-    _strip_shed_attributes(xml_a)
-    _strip_shed_attributes(xml_b)
-    return diff.diff(xml_a, xml_b, reporter=f.write)
-
-
-def _strip_shed_attributes(xml_element):
-    if xml_element.tag == "repository":
-        _remove_attribs(xml_element)
-    children = xml_element.getchildren()
-    if len(children) > 0:
-        for child in children:
-            _strip_shed_attributes(child)
-
-
-def _remove_attribs(xml_element):
-    for attrib in ["changeset_revision", "toolshed"]:
-        if attrib in xml_element.attrib:
-            del xml_element.attrib[attrib]
+    return diff.diff(xml_a, xml_b, reporter=f.write, ignore_attributes=SHED_IGNORED_ATTRIBUTES)
 
 
 __all__ = (
+    "compare_manifests",
+    "DIFF_FORMATS",
     "diff_and_remove",
+    "RepositoryManifest",
+    "write_manifest_diff",
 )
@@ -1,17 +1,63 @@
 """Interface over bioblend and direct access to ToolShed API via requests."""
 
+import contextlib
+import hashlib
 import json
+import os
+import shutil
+import threading
+import time
+
+import requests
 
 from planemo.bioblend import (
     ensure_module,
     toolshed,
 )
-from planemo.io import untar_to
+from planemo.io import (
+    untar_to,
+    write_json_file,
+)
 
 REPOSITORY_DOWNLOAD_TEMPLATE = (
     "%srepository/download?repository_id=%s"
-    "&changeset_revision=default&file_type=gz"
+    "&changeset_revision=%s&file_type=gz"
 )
+# Mercurial wire protocol lookup, served by the Tool Shed for every repository.
+REPOSITORY_LOOKUP_TEMPLATE = "%srepos/%s/%s?cmd=lookup&key=%s"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DEFAULT_SHED_REQUEST_LIMIT = 4
+DEFAULT_REPOSITORY_INDEX_TTL = 0
+REQUEST_METHODS = [
+    "make_get_request",
+    "make_post_request",
+    "make_put_request",
+    "make_delete_request",
+]
+
+_request_limit = DEFAULT_SHED_REQUEST_LIMIT
+_request_semaphores = {}
+_request_semaphores_lock = threading.Lock()
+
+
+def set_shed_request_limit(limit):
+    """Set the number of requests that may be in flight to any one shed."""
+    global _request_limit
+    with _request_semaphores_lock:
+        _request_limit = max(1, limit or DEFAULT_SHED_REQUEST_LIMIT)
+        _request_semaphores.clear()
+
+
+@contextlib.contextmanager
+def shed_request_slot(url):
+    """Block until a request to the shed at ``url`` is allowed."""
+    key = url.rstrip("/")
+    with _request_semaphores_lock:
+        if key not in _request_semaphores:
+            _request_semaphores[key] = threading.BoundedSemaphore(_request_limit)
+        semaphore = _request_semaphores[key]
+    with semaphore:
+        yield
 
 
 def tool_shed_instance(url, key, email, password):
@@ -22,23 +68,173 @@ def tool_shed_instance(url, key, email, password):
         email=email,
         password=password
     )
+    _limit_requests(tsi)
     return tsi
 
 
-def find_repository(tsi, owner, name):
+def _limit_requests(tsi):
+    def limited(method):
+        def wrapped(*args, **kwds):
+            with shed_request_slot(tsi.base_url):
+                return method(*args, **kwds)
+        return wrapped
+
+    for method_name in REQUEST_METHODS:
+        method = getattr(tsi, method_name, None)
+        if method is not None:
+            setattr(tsi, method_name, limited(method))
+
+
+def find_repository(tsi, owner, name, index=None):
     """ Find repository information for given owner and repository
     name.
+
+    If supplied, ``index`` (a :class:`RepositoryIndex`) is used to avoid
+    fetching the owner's repositories again.
     """
-    repos = tsi.repositories.get_repositories()
+    if index is None:
+        index = RepositoryIndex()
+    return index.find(tsi, owner, name)
 
-    def matches(r):
-        return r["owner"] == owner and r["name"] == name
 
-    matching_repos = list(filter(matches, repos))
-    if not matching_repos:
-        return None
-    else:
-        return matching_repos[0]
+class RepositoryIndex(object):
+    """Index of Tool Shed repositories keyed by shed, owner and name.
+
+    Repositories are fetched in bulk, one request per shed and owner, the first
+    time they are needed and kept for the life of the index (i.e. one planemo
+    invocation). If ``cache_directory`` is set, fetched listings are also
+    persisted there and reused by later invocations until they are older than
+    ``ttl`` seconds.
+    """
+
+    def __init__(self, cache_directory=None, ttl=DEFAULT_REPOSITORY_INDEX_TTL):
+        self.cache_directory = cache_directory
+        self.ttl = ttl
+        self._repositories = {}
+        self._lock = threading.Lock()
+
+    def find(self, tsi, owner, name):
+        """Return repository dictionary for owner and name or None."""
+        return self.repositories_for(tsi, owner).get(name, None)
+
+    def repositories_for(self, tsi, owner):
+        """Return dictionary of owner's repositories on tsi keyed by name."""
+        key = (_shed_key(tsi), owner)
+        with self._lock:
+            if key not in self._repositories:
+                repos = self._read_cache(key)
+                if repos is None:
+                    repos = self._fetch(tsi, owner)
+                    self._write_cache(key, repos)
+                by_name = {}
+                for repo in repos:
+                    by_name.setdefault(repo["name"], repo)
+                self._repositories[key] = by_name
+            return self._repositories[key]
+
+    def add(self, tsi, repo):
+        """Record a newly created repository without refetching listings."""
+        if "owner" not in repo or "name" not in repo:
+            self.invalidate(tsi)
+            return
+        key = (_shed_key(tsi), repo["owner"])
+        with self._lock:
+            if key in self._repositories:
+                self._repositories[key][repo["name"]] = repo
+            if self.cache_directory is not None:
+                cache_path = self._cache_path(key)
+                if os.path.exists(cache_path):
+                    os.remove(cache_path)
+
+    def invalidate(self, tsi, owner=None):
+        """Forget what is known about the repositories of tsi (or of one owner)."""
+        shed_key = _shed_key(tsi)
+        with self._lock:
+            if owner is not None:
+                self._repositories.pop((shed_key, owner), None)
+                if self.cache_directory is not None:
+                    cache_path = self._cache_path((shed_key, owner))
+                    if os.path.exists(cache_path):
+                        os.remove(cache_path)
+                return
+            for key in list(self._repositories.keys()):
+                if key[0] == shed_key:
+                    del self._repositories[key]
+            if self.cache_directory is not None:
+                shed_directory = os.path.dirname(self._cache_path((shed_key, "")))
+                if os.path.isdir(shed_directory):
+                    for cache_file in os.listdir(shed_directory):
+                        os.remove(os.path.join(shed_directory, cache_file))
+
+    def _fetch(self, tsi, owner):
+        repos = tsi.repositories._get(params={"owner": owner})
+        # Older Tool Sheds ignore the owner filter.
+        return [r for r in repos if r["owner"] == owner]
+
+    def _cache_path(self, key):
+        shed_key, owner = key
+        shed_hash = hashlib.sha1(shed_key.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.cache_directory, shed_hash, "%s.json" % owner)
+
+    def _read_cache(self, key):
+        if self.cache_directory is None or key[1] is None:
+            return None
+        path = self._cache_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError):
+            return None
+
+    def _write_cache(self, key, repos):
+        if self.cache_directory is None or key[1] is None:
+            return
+        write_json_file(self._cache_path(key), repos)
+
+
+def _shed_key(tsi):
+    return tsi.base_url.rstrip("/")
+
+
+def update_repository_contents(tsi, repository_id, fileobj, commit_message=None):
+    """ Upload new contents for a repository from a file object containing
+    a gzipped tarball positioned at its start.
+
+    Unlike bioblend's ``update_repository`` this doesn't require the tarball
+    to be written to a file.
+    """
+    from bioblend.util import FileStream
+
+    url = "%s/repositories/%s/changeset_revision" % (tsi.url, repository_id)
+    payload = {
+        "file": FileStream("shed_upload.tar.gz", _SizedStream(fileobj)),
+    }
+    if commit_message is not None:
+        payload["commit_message"] = commit_message
+    return tsi.repositories._post(payload=payload, files_attached=True, url=url)
+
+
+class _SizedStream(object):
+    """Expose the remaining length of a file object as ``len``.
+
+    requests-toolbelt would otherwise call ``fileno()`` to size the upload,
+    which forces a :class:`tempfile.SpooledTemporaryFile` onto disk.
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        fileobj.seek(0, os.SEEK_END)
+        self._size = fileobj.tell()
+        fileobj.seek(0)
+
+    @property
+    def len(self):
+        return self._size - self._fileobj.tell()
+
+    def read(self, *args):
+        return self._fileobj.read(*args)
 
 
 def latest_installable_revision(tsi, repository_id):
@@ -58,6 +254,23 @@ def latest_installable_revision(tsi, repository_id):
         return revisions[-1]
 
 
+def tip_changeset_revision(tsi, owner, name):
+    """Return the changeset revision at the tip of a repository.
+
+    Unlike :func:`latest_installable_revision` this changes with every upload,
+    whether or not the upload created a new installable revision. Revisions
+    are abbreviated to the 12 characters the Tool Shed uses to identify them.
+    """
+    lookup_url = REPOSITORY_LOOKUP_TEMPLATE % (_base_url(tsi), owner, name, "tip")
+    with shed_request_slot(tsi.base_url):
+        response = requests.get(lookup_url, verify=getattr(tsi, "verify", True))
+    response.raise_for_status()
+    success, _, node = response.text.strip().partition(" ")
+    if success != "1" or not node:
+        raise Exception("Failed to find tip of repository [%s/%s]: %s" % (owner, name, response.text))
+    return node[:12]
+
+
 def username(tsi):
     """ Fetch current username from shed given API key/auth.
     """
@@ -82,6 +295,20 @@ def api_exception_to_message(e):
     return message
 
 
+def is_transient_api_exception(e):
+    """Check if a failed shed API request may succeed when retried.
+
+    Connection problems, timeouts and server errors (5xx responses) are
+    transient, client errors such as invalid or conflicting requests are not.
+    """
+    if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    status_code = getattr(e, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(e, "response", None), "status_code", None)
+    return status_code is not None and status_code >= 500
+
+
 def find_category_ids(tsi, categories):
     """ Translate human readable category names into their associated IDs.
     """
@@ -98,15 +325,34 @@ def find_category_ids(tsi, categories):
 
 
 def download_tar(tsi, repo_id, destination, to_directory):
-    base_url = tsi.base_url
-    if not base_url.endswith("/"):
-        base_url += "/"
-    download_url = REPOSITORY_DOWNLOAD_TEMPLATE % (base_url, repo_id)
+    download_url = REPOSITORY_DOWNLOAD_TEMPLATE % (_base_url(tsi), repo_id, "default")
     if to_directory:
         untar_args = "-xzf - -C %s --strip-components 1" % destination
     else:
         untar_args = None
-    untar_to(download_url, destination, untar_args)
+    with shed_request_slot(tsi.base_url):
+        untar_to(download_url, destination, untar_args)
+
+
+def download_tar_file(tsi, repo_id, fileobj, changeset_revision="default"):
+    """Write the repository's gzipped tarball to the supplied file object."""
+    download_url = REPOSITORY_DOWNLOAD_TEMPLATE % (_base_url(tsi), repo_id, changeset_revision)
+    with shed_request_slot(tsi.base_url):
+        response = requests.get(download_url, stream=True, verify=getattr(tsi, "verify", True))
+        response.raise_for_status()
+        # Copy the raw bytes - tarballs may be served with a gzip
+        # Content-Encoding that must not be decoded.
+        response.raw.decode_content = False
+        shutil.copyfileobj(response.raw, fileobj, DOWNLOAD_CHUNK_SIZE)
+    fileobj.seek(0)
+    return fileobj
+
+
+def _base_url(tsi):
+    base_url = tsi.base_url
+    if not base_url.endswith("/"):
+        base_url += "/"
+    return base_url
 
 
 def _user(tsi):
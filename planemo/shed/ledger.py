@@ -0,0 +1,115 @@
+"""Local record of repository contents uploaded to Tool Sheds.
+
+Shed tarballs are reproducible (see :mod:`planemo.shed.tarball`) so the digest
+of a realized repository's tarball identifies its contents. If that digest and
+the repository's tip changeset revision on the shed both match what was
+recorded after the last upload, the repository is known to be unchanged
+without downloading anything.
+
+A digest of the repository metadata sent with the last successful create or
+metadata update is recorded as well so unchanged metadata need not be sent
+again.
+
+Updates hold a lock file next to the ledger so concurrent planemo processes
+don't lose each other's entries.
+"""
+import contextlib
+import errno
+import fcntl
+import json
+import os
+import threading
+
+from planemo.io import write_json_file
+
+LEDGER_NAME = "shed_upload_ledger.json"
+LOCK_SUFFIX = ".lock"
+
+
+class UploadLedger(object):
+    """JSON backed ledger of uploads keyed by shed URL and owner/name."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def entry(self, shed_url, owner, name):
+        """Return recorded upload for repository (or None)."""
+        with self._lock:
+            entries = self._load()
+        return entries.get(_shed_key(shed_url), {}).get(_repo_key(owner, name), None)
+
+    def is_unchanged(self, shed_url, owner, name, digest, changeset_revision):
+        """Check ``digest`` and ``changeset_revision`` match the last upload."""
+        if digest is None or changeset_revision is None:
+            return False
+        entry = self.entry(shed_url, owner, name)
+        if entry is None:
+            return False
+        return entry.get("digest") == digest and entry.get("changeset_revision") == changeset_revision
+
+    def metadata_unchanged(self, shed_url, owner, name, metadata_digest):
+        """Check ``metadata_digest`` matches the last metadata sent."""
+        entry = self.entry(shed_url, owner, name)
+        if entry is None:
+            return False
+        return entry.get("metadata_digest") == metadata_digest
+
+    def record(self, shed_url, owner, name, digest, changeset_revision):
+        """Record a successful upload of contents with ``digest``."""
+        self._update(shed_url, owner, name, {
+            "digest": digest,
+            "changeset_revision": changeset_revision,
+        })
+
+    def record_metadata(self, shed_url, owner, name, metadata_digest):
+        """Record a successful create or metadata update."""
+        self._update(shed_url, owner, name, {"metadata_digest": metadata_digest})
+
+    def _update(self, shed_url, owner, name, values):
+        with self._lock, self._file_lock():
+            # Reload so entries recorded by other planemo processes survive.
+            entries = self._load()
+            shed_entries = entries.setdefault(_shed_key(shed_url), {})
+            shed_entries.setdefault(_repo_key(owner, name), {}).update(values)
+            self._write(entries)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            try:
+                os.makedirs(directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        with open(self.path + LOCK_SUFFIX, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        write_json_file(self.path, entries, indent=2, sort_keys=True)
+
+
+def _shed_key(shed_url):
+    return shed_url.rstrip("/")
+
+
+def _repo_key(owner, name):
+    return "%s/%s" % (owner, name)
+
+
+__all__ = (
+    "LEDGER_NAME",
+    "UploadLedger",
+)
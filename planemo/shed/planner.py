@@ -0,0 +1,234 @@
+"""Plan and execute bulk creation and updates of Tool Shed repositories.
+
+The current state of every target repository is read from the shared
+:class:`planemo.shed.interface.RepositoryIndex` (one listing request per shed
+and owner) and compared to the realized repositories to decide which need to
+be created, which need their metadata updated and which need new contents
+uploaded. Metadata the listing does not expose (such as descriptions and
+categories) cannot be compared, so repositories are sent their metadata again
+unless ``skip_unchanged_metadata`` is set. In that case such metadata is
+compared with a digest recorded in the upload ledger after the last successful
+create or metadata update instead - edits made directly on the Tool Shed are
+then not overwritten until the local metadata changes.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+
+from planemo.io import (
+    error,
+    info,
+    warn,
+)
+from planemo.shed import (
+    create_repository_for,
+    repository_index,
+    repository_owner,
+    shed_repo_type,
+    update_repository_for,
+    upload_ledger,
+)
+from planemo.shed.interface import (
+    api_exception_to_message,
+    is_transient_api_exception,
+)
+
+CREATE = "create"
+UPDATE_METADATA = "update_metadata"
+UPLOAD = "upload"
+DEFAULT_RETRIES = 2
+RETRY_DELAY = 1.0
+# Metadata fields included in Tool Shed repository listings.
+LISTED_FIELDS = ["type", "remote_repository_url", "homepage_url"]
+
+RepositoryPlan = namedtuple("RepositoryPlan", ["name", "owner", "repo_id", "actions"])
+
+
+class RepositoryPlanner(object):
+    """Decide and perform the API calls needed to sync repositories to a shed.
+
+    ``plan`` is meant to be passed as the ``planner`` of
+    :func:`planemo.shed.for_each_repository`, the per-repository function
+    then consults ``plan_for`` and performs actions with ``create`` and
+    ``update_metadata`` (which retry failed requests).
+    """
+
+    def __init__(self, ctx, shed_context, create=True, update_metadata=True, upload=True,
+                 retries=DEFAULT_RETRIES, skip_unchanged_metadata=False):
+        self.ctx = ctx
+        self.shed_context = shed_context
+        self.allow_create = create
+        self.allow_update_metadata = update_metadata
+        self.allow_upload = upload
+        self.skip_unchanged_metadata = skip_unchanged_metadata
+        self.retries = retries
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def plan(self, realized_repositories):
+        """Plan actions for each realized repository and print a summary."""
+        plans = [self._plan_repository(r) for r in realized_repositories]
+        with self._lock:
+            for plan in plans:
+                self._plans[(plan.owner, plan.name)] = plan
+        _report_plans(self.shed_context, plans)
+        return plans
+
+    def plan_for(self, realized_repository):
+        """Return the :class:`RepositoryPlan` for a realized repository."""
+        key = (realized_repository.owner, realized_repository.name)
+        with self._lock:
+            plan = self._plans.get(key, None)
+        if plan is None:
+            plan = self._plan_repository(realized_repository)
+        return plan
+
+    def create(self, realized_repository):
+        """Create repository (with retries) and return its id or None."""
+        name = realized_repository.name
+        attempted = []
+
+        def _create():
+            if attempted:
+                # A previous attempt may have succeeded without a response,
+                # the listing the plan was made from cannot tell.
+                owner = repository_owner(self.ctx, self.shed_context, realized_repository)
+                if owner is not None:
+                    repository_index(self.ctx).invalidate(self.shed_context.tsi, owner)
+                repo_id = realized_repository.find_repository_id(self.ctx, self.shed_context)
+                if repo_id is not None:
+                    return repo_id
+            attempted.append(True)
+            repo = create_repository_for(
+                self.ctx, self.shed_context.tsi, name, realized_repository.config
+            )
+            return repo["id"]
+
+        repo_id = self._with_retries("create repository [%s]" % name, _create)
+        if repo_id is not None:
+            self._record_metadata(realized_repository)
+        return repo_id
+
+    def update_metadata(self, realized_repository, repo_id):
+        """Update repository metadata (with retries), return True on success."""
+        name = realized_repository.name
+
+        def _update():
+            return update_repository_for(
+                self.ctx, self.shed_context.tsi, repo_id, realized_repository.config
+            )
+
+        result = self._with_retries("update metadata of repository [%s]" % name, _update)
+        if result is None:
+            return False
+        self._record_metadata(realized_repository)
+        return True
+
+    def _plan_repository(self, realized_repository):
+        owner = realized_repository.owner
+        name = realized_repository.name
+        remote = realized_repository.find_repository(self.ctx, self.shed_context)
+        actions = []
+        repo_id = None
+        if remote is None:
+            if self.allow_create:
+                # Creating a repository sets all of its metadata.
+                actions.append(CREATE)
+        else:
+            repo_id = remote["id"]
+            if self.allow_update_metadata and self._metadata_changed(realized_repository, remote):
+                actions.append(UPDATE_METADATA)
+        if self.allow_upload and (repo_id is not None or CREATE in actions):
+            actions.append(UPLOAD)
+        return RepositoryPlan(name, owner, repo_id, actions)
+
+    def _metadata_changed(self, realized_repository, remote):
+        config = realized_repository.config
+        expected = {"type": shed_repo_type(config, realized_repository.name)}
+        for field in LISTED_FIELDS[1:]:
+            if config.get(field, None) is not None:
+                expected[field] = config[field]
+        for field, value in expected.items():
+            if field in remote and remote[field] != value:
+                return True
+        if not self.skip_unchanged_metadata:
+            return True
+        ledger = self._ledger()
+        if ledger is None:
+            return True
+        return not ledger.metadata_unchanged(
+            self.shed_context.tsi.base_url,
+            realized_repository.owner,
+            realized_repository.name,
+            metadata_digest(config, realized_repository.name),
+        )
+
+    def _record_metadata(self, realized_repository):
+        ledger = self._ledger()
+        if ledger is None:
+            return
+        ledger.record_metadata(
+            self.shed_context.tsi.base_url,
+            realized_repository.owner,
+            realized_repository.name,
+            metadata_digest(realized_repository.config, realized_repository.name),
+        )
+
+    def _ledger(self):
+        if self.ctx is None:
+            return None
+        return upload_ledger(self.ctx)
+
+    def _with_retries(self, description, f):
+        for attempt in range(self.retries + 1):
+            try:
+                return f()
+            except Exception as e:
+                message = api_exception_to_message(e)
+                if attempt == self.retries or not is_transient_api_exception(e):
+                    error("Failed to %s: %s" % (description, message))
+                    return None
+                warn("Failed to %s (%s), retrying." % (description, message))
+                time.sleep(RETRY_DELAY * (attempt + 1))
+
+
+def metadata_digest(repo_config, name):
+    """Return digest of the repository metadata a create or update would send."""
+    metadata = {
+        "name": name,
+        "description": repo_config.get("description", None),
+        "long_description": repo_config.get("long_description", None),
+        "type": shed_repo_type(repo_config, name),
+        "remote_repository_url": repo_config.get("remote_repository_url", None),
+        "homepage_url": repo_config.get("homepage_url", None),
+        "categories": sorted(repo_config.get("categories", None) or []),
+    }
+    return hashlib.sha1(json.dumps(metadata, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _report_plans(shed_context, plans):
+    counts = dict((action, 0) for action in [CREATE, UPDATE_METADATA, UPLOAD])
+    unchanged = 0
+    for plan in plans:
+        for action in plan.actions:
+            counts[action] += 1
+        if not plan.actions:
+            unchanged += 1
+        info("  %-30s %s" % (plan.name, ", ".join(plan.actions) or "no changes"))
+    info("Plan for %d repositories on the %s: %d to create, %d metadata updates, "
+         "%d content uploads (if changed), %d without changes." % (
+             len(plans), shed_context.label, counts[CREATE], counts[UPDATE_METADATA],
+             counts[UPLOAD], unchanged,
+         ))
+
+
+__all__ = (
+    "CREATE",
+    "metadata_digest",
+    "RepositoryPlan",
+    "RepositoryPlanner",
+    "UPDATE_METADATA",
+    "UPLOAD",
+)
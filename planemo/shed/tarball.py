@@ -0,0 +1,131 @@
+"""Build reproducible tarballs of realized shed repositories.
+
+Tarballs are built from sorted file lists with normalised modification times,
+ownership and permissions (and an empty gzip header) so the same repository
+contents always yield a byte-identical archive - and so the same digest.
+"""
+import gzip
+import hashlib
+import os
+import stat
+import tarfile
+import tempfile
+import time
+
+from planemo.walker import DirectoryWalker
+
+# Archives smaller than this are held entirely in memory.
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+TARBALL_MTIME = 0
+FILE_MODE = 0o644
+EXECUTABLE_MODE = 0o755
+
+
+class RepositoryTarball(object):
+    """Gzipped tarball of the files below a realized repository directory.
+
+    After the archive is written ``size`` (in bytes), ``build_time`` (in
+    seconds) and ``digest`` (SHA-256 of the archive) describe it.
+
+    If ``files`` (a mapping of archive names to source paths) is supplied the
+    archive is built from it and ``realized_path`` need not exist.
+    """
+
+    def __init__(self, realized_path, files=None):
+        self.realized_path = realized_path
+        self._files = files
+        self.size = None
+        self.build_time = None
+        self.digest = None
+
+    def files(self):
+        """Return sorted list of archive names for the files to include."""
+        if self._files is not None:
+            return sorted(self._files.keys())
+        names = []
+        for dirpath, dirnames, filenames in DirectoryWalker(prune=()).walk(self.realized_path):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                names.append(os.path.relpath(path, self.realized_path))
+        names.sort()
+        return names
+
+    def write_to(self, fileobj):
+        """Write gzipped archive to the writable binary file object."""
+        start = time.time()
+        output = _HashingWriter(fileobj)
+        gz = gzip.GzipFile(filename="", mode="wb", fileobj=output, mtime=TARBALL_MTIME)
+        try:
+            tar = tarfile.open(fileobj=gz, mode="w", format=tarfile.GNU_FORMAT, dereference=True)
+            try:
+                for name in self.files():
+                    self._add(tar, name)
+            finally:
+                tar.close()
+        finally:
+            gz.close()
+        self.size = output.size
+        self.build_time = time.time() - start
+        self.digest = output.hexdigest()
+        return self
+
+    def spooled(self):
+        """Return archive in a file object rewound to its start.
+
+        Archives smaller than :data:`SPOOL_MAX_SIZE` are never written to disk.
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.write_to(spool)
+        spool.seek(0)
+        return spool
+
+    def write_to_path(self, path):
+        """Write archive to the supplied path."""
+        with open(path, "wb") as f:
+            self.write_to(f)
+        return self
+
+    def _add(self, tar, name):
+        if self._files is not None:
+            path = self._files[name]
+        else:
+            path = os.path.join(self.realized_path, name)
+        tarinfo = tar.gettarinfo(path, arcname=name)
+        tarinfo.mtime = TARBALL_MTIME
+        tarinfo.uid = tarinfo.gid = 0
+        tarinfo.uname = tarinfo.gname = ""
+        if tarinfo.mode & stat.S_IXUSR:
+            tarinfo.mode = EXECUTABLE_MODE
+        else:
+            tarinfo.mode = FILE_MODE
+        with open(path, "rb") as f:
+            tar.addfile(tarinfo, f)
+
+    def __str__(self):
+        return "RepositoryTarball[path=%s,size=%s,build_time=%s]" % (
+            self.realized_path, self.size, self.build_time
+        )
+
+
+class _HashingWriter(object):
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        self._fileobj.write(data)
+
+    def flush(self):
+        self._fileobj.flush()
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+__all__ = (
+    "RepositoryTarball",
+)
@@ -7,6 +7,7 @@ import xml.etree.ElementTree as ET
 import yaml
 from galaxy.tools.lint import lint_tool_source_with
 from galaxy.tools.linters.help import rst_invalid
+from galaxy.tools.loader_directory import looks_like_a_tool
 
 from planemo.io import info
 from planemo.lint import (
@@ -17,9 +18,11 @@ from planemo.lint import (
 )
 from planemo.shed import (
     CURRENT_CATEGORIES,
+    REPO_DEPENDENCIES_CONFIG_NAME,
     REPO_TYPE_SUITE,
     REPO_TYPE_TOOL_DEP,
     REPO_TYPE_UNRESTRICTED,
+    TOOL_DEPENDENCIES_CONFIG_NAME,
     validate_repo_name,
     validate_repo_owner,
 )
@@ -119,6 +122,10 @@ def lint_repository(ctx, realized_repository, **kwds):
 
 
 def lint_repository_tools(ctx, realized_repository, lint_ctx, lint_args):
+    # Tools are loaded from the realized directory (so macros resolve as they
+    # will on the shed) - avoid materialising it if no file could be a tool.
+    if not _may_contain_tools(realized_repository):
+        return
     path = realized_repository.path
     for (tool_path, tool_source) in yield_tool_sources(ctx, path,
                                                        recursive=True):
@@ -133,6 +140,16 @@ def lint_repository_tools(ctx, realized_repository, lint_ctx, lint_args):
         )
 
 
+def _may_contain_tools(realized_repository):
+    for source in realized_repository.file_sources().values():
+        try:
+            if looks_like_a_tool(source, enable_beta_formats=True):
+                return True
+        except IOError:
+            continue
+    return False
+
+
 def lint_expansion(realized_repository, lint_ctx):
     missing = realized_repository.missing
     if missing:
@@ -264,12 +281,12 @@ def lint_tool_dependencies_actions(realized_repository, lint_ctx):
 
 def lint_expected_files(realized_repository, lint_ctx):
     if realized_repository.is_package:
-        if not os.path.exists(realized_repository.tool_dependencies_path):
+        if not realized_repository.includes(TOOL_DEPENDENCIES_CONFIG_NAME):
             lint_ctx.warn("Package repository does not contain a "
                           "tool_dependencies.xml file.")
 
     if realized_repository.is_suite:
-        if not os.path.exists(realized_repository.repo_dependencies_path):
+        if not realized_repository.includes(REPO_DEPENDENCIES_CONFIG_NAME):
             lint_ctx.warn("Suite repository does not contain a "
                           "repository_dependencies.xml file.")
 
@@ -0,0 +1,157 @@
+"""Summarize repeated test runs and compare them against a baseline.
+
+Benchmark data is a JSON document recording every run of each test case
+and statistics over those runs::
+
+    {
+        "version": "0.1",
+        "repetitions": 5,
+        "tests": [
+            {
+                "id": "cat_0",
+                "runs": [{"status": "success", "wall_seconds": 9.1,
+                          "job_metrics": {"runtime_seconds": 4.0}}],
+                "statistics": {"wall_seconds": {"median": 9.1, "p90": 9.1, ...}}
+            }
+        ]
+    }
+
+A previous benchmark JSON serves as the baseline for a later one - the
+median of each metric is compared.
+"""
+from collections import namedtuple
+
+from planemo.test.metrics import METRICS
+
+BENCHMARK_METRICS = [("wall_seconds", "Wall Time")] + METRICS
+BENCHMARK_METRIC_KEYS = [key for key, _ in BENCHMARK_METRICS]
+PERCENTILES = [90, 95]
+DEFAULT_REPETITIONS = 5
+DEFAULT_REGRESSION_THRESHOLDS = {"wall_seconds": 0.25}
+
+Regression = namedtuple("Regression", ["test_id", "metric", "baseline", "current", "change"])
+
+
+def percentile(values, percent):
+    """Return ``percent`` percentile of ``values`` interpolating between ranks."""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * percent / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def run_data(test_data, wall_seconds):
+    """Reduce the structured data of a test run to what a benchmark records."""
+    data = test_data.get("data", None) or {}
+    run = {
+        "status": data.get("status", "error"),
+        "wall_seconds": wall_seconds,
+    }
+    if data.get("job_metrics", None):
+        run["job_metrics"] = data["job_metrics"]
+    return run
+
+
+def run_statistics(runs):
+    """Return median, percentiles and range of each metric over ``runs``."""
+    statistics = {}
+    for key in BENCHMARK_METRIC_KEYS:
+        values = [v for v in (_run_metric(run, key) for run in runs) if v is not None]
+        if not values:
+            continue
+        key_statistics = {
+            "median": percentile(values, 50),
+            "min": min(values),
+            "max": max(values),
+        }
+        for percent in PERCENTILES:
+            key_statistics["p%d" % percent] = percentile(values, percent)
+        statistics[key] = key_statistics
+    return statistics
+
+
+def benchmark_data(tests_runs, repetitions):
+    """Build benchmark data from ``(test id, runs)`` pairs."""
+    tests = []
+    for test_id, runs in tests_runs:
+        tests.append({
+            "id": test_id,
+            "runs": runs,
+            "num_failures": len([r for r in runs if r["status"] != "success"]),
+            "statistics": run_statistics(runs),
+        })
+    return {
+        "version": "0.1",
+        "repetitions": repetitions,
+        "tests": tests,
+    }
+
+
+def parse_regression_thresholds(values):
+    """Parse ``metric=fraction`` strings into a thresholds dict.
+
+    Raise ``ValueError`` for malformed values or unknown metrics.
+    """
+    thresholds = {}
+    for value in values:
+        key, sep, fraction = value.partition("=")
+        if not sep or key not in BENCHMARK_METRIC_KEYS:
+            raise ValueError(
+                "Invalid regression threshold [%s], expected METRIC=FRACTION with "
+                "METRIC one of %s." % (value, ", ".join(BENCHMARK_METRIC_KEYS))
+            )
+        thresholds[key] = float(fraction)
+    return thresholds
+
+
+def compare_to_baseline(benchmark, baseline, thresholds=DEFAULT_REGRESSION_THRESHOLDS):
+    """Return :class:`Regression` list for medians exceeding the baseline's.
+
+    A metric regressed if its median grew by more than its threshold (a
+    fraction of the baseline median). Tests and metrics missing from
+    either benchmark are not compared.
+    """
+    baseline_tests = dict((t["id"], t) for t in baseline.get("tests", []))
+    regressions = []
+    for test in benchmark.get("tests", []):
+        baseline_test = baseline_tests.get(test["id"], None)
+        if baseline_test is None:
+            continue
+        for key in BENCHMARK_METRIC_KEYS:
+            if key not in thresholds:
+                continue
+            baseline_median = _median(baseline_test, key)
+            current_median = _median(test, key)
+            if not baseline_median or current_median is None:
+                continue
+            change = (current_median - baseline_median) / float(baseline_median)
+            if change > thresholds[key]:
+                regressions.append(Regression(test["id"], key, baseline_median, current_median, change))
+    return regressions
+
+
+def _median(test, key):
+    return ((test.get("statistics", None) or {}).get(key, None) or {}).get("median", None)
+
+
+def _run_metric(run, key):
+    if key == "wall_seconds":
+        return run.get("wall_seconds", None)
+    return (run.get("job_metrics", None) or {}).get(key, None)
+
+
+__all__ = (
+    "BENCHMARK_METRICS",
+    "benchmark_data",
+    "compare_to_baseline",
+    "DEFAULT_REGRESSION_THRESHOLDS",
+    "DEFAULT_REPETITIONS",
+    "parse_regression_thresholds",
+    "percentile",
+    "Regression",
+    "run_data",
+    "run_statistics",
+)
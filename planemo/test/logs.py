@@ -0,0 +1,127 @@
+"""Keep large logs out of structured test data.
+
+Job standard output and error, command lines and problem logs longer than
+an inline limit are appended to a sidecar file next to the structured data
+JSON. Only their head and tail are kept inline, and the test's data records
+where the complete text is stored in ``log_references``::
+
+    "log_references": {
+        "job.stdout": {"path": "tool_test_output_logs.txt", "offset": 0, "length": 123456}
+    }
+
+``path`` is relative to the directory of the structured data JSON and
+``offset`` and ``length`` are in bytes of UTF-8 encoded text.
+"""
+import io
+import os
+import threading
+
+DEFAULT_INLINE_LIMIT = 64 * 1024
+HEAD_SIZE = 8 * 1024
+TAIL_SIZE = 16 * 1024
+LOG_FIELDS = [
+    ("job", "stdout"),
+    ("job", "stderr"),
+    ("job", "command_line"),
+    (None, "problem_log"),
+]
+LOG_REFERENCES_KEY = "log_references"
+TRUNCATED_MESSAGE = u"\n[... %d characters omitted, complete log in %s at byte offset %d ...]\n"
+
+
+class LogStore(object):
+    """Append-only sidecar file holding the complete text of large logs."""
+
+    def __init__(self, path, inline_limit=DEFAULT_INLINE_LIMIT, head_size=HEAD_SIZE, tail_size=TAIL_SIZE):
+        self.path = path
+        self.inline_limit = inline_limit
+        self.head_size = min(head_size, inline_limit // 2)
+        self.tail_size = min(tail_size, inline_limit - self.head_size)
+        self._lock = threading.Lock()
+
+    def externalize(self, text):
+        """Return ``(inline text, reference)`` for ``text``.
+
+        Text within the inline limit is returned as is with a ``None``
+        reference.
+        """
+        if not text or len(text) <= self.inline_limit:
+            return text, None
+        if isinstance(text, bytes):
+            text = text.decode("utf-8", "replace")
+        data = text.encode("utf-8")
+        with self._lock:
+            with io.open(self.path, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(data)
+        name = os.path.basename(self.path)
+        reference = {"path": name, "offset": offset, "length": len(data)}
+        omitted = len(text) - self.head_size - self.tail_size
+        inline = text[:self.head_size] + TRUNCATED_MESSAGE % (omitted, name, offset)
+        if self.tail_size:
+            inline += text[-self.tail_size:]
+        return inline, reference
+
+    def externalize_test(self, test):
+        """Externalize the large logs of a structured data test entry in place."""
+        data = test.get("data", None)
+        if not data:
+            return test
+        for container_key, key in LOG_FIELDS:
+            container = data if container_key is None else data.get(container_key, None)
+            if not isinstance(container, dict):
+                continue
+            inline, reference = self.externalize(container.get(key, None))
+            if reference is None:
+                continue
+            container[key] = inline
+            field = key if container_key is None else "%s.%s" % (container_key, key)
+            data.setdefault(LOG_REFERENCES_KEY, {})[field] = reference
+        return test
+
+    def externalize_tests(self, structured_data):
+        """Externalize the large logs of every test in structured data."""
+        for test in structured_data.get("tests", []):
+            self.externalize_test(test)
+        return structured_data
+
+
+def log_store(structured_data_path, inline_limit=DEFAULT_INLINE_LIMIT):
+    """Return :class:`LogStore` for structured data written to supplied path.
+
+    Return None if there is no structured data path or ``inline_limit`` is 0
+    (so logs are kept inline whatever their size). Logs stored by a previous
+    run are discarded.
+    """
+    if not structured_data_path or not inline_limit:
+        return None
+    base, _ = os.path.splitext(structured_data_path)
+    path = "%s_logs.txt" % base
+    if os.path.exists(path):
+        os.remove(path)
+    return LogStore(path, inline_limit=inline_limit)
+
+
+def read_log_reference(reference, base_directory):
+    """Return complete text of a log stored by :class:`LogStore`."""
+    with io.open(os.path.join(base_directory, reference["path"]), "rb") as f:
+        f.seek(reference["offset"])
+        return f.read(reference["length"]).decode("utf-8")
+
+
+def rebase_log_references(test, base_directory):
+    """Make the log references of a test entry relative to its JSON absolute."""
+    data = test.get("data", None) or {}
+    for reference in (data.get(LOG_REFERENCES_KEY, None) or {}).values():
+        reference["path"] = os.path.join(base_directory, reference["path"])
+    return test
+
+
+__all__ = (
+    "DEFAULT_INLINE_LIMIT",
+    "log_store",
+    "LogStore",
+    "read_log_reference",
+    "rebase_log_references",
+)
@@ -0,0 +1,132 @@
+"""Summarize resource usage of test jobs from Galaxy job metrics.
+
+Galaxy reports the metrics its job metrics plugins collected (see
+``_handle_job_metrics`` in :mod:`planemo.galaxy.config`) as a list of
+``{"plugin": ..., "name": ..., "raw_value": ...}`` entries of the job API's
+``job_metrics``. These are reduced to a few comparable numbers stored as
+``job_metrics`` in each test's structured data::
+
+    "job_metrics": {"runtime_seconds": 12.0, "cpu_seconds": 10.5,
+                    "memory_peak_bytes": 104857600, "cores": 1,
+                    "queue_seconds": 1.7}
+
+Metrics Galaxy did not record (e.g. CPU time and memory without cgroups)
+are left out.
+"""
+import calendar
+from datetime import datetime
+
+JOB_METRICS_KEY = "job_metrics"
+# Summarized metrics and their titles, in the order they are reported.
+METRICS = [
+    ("runtime_seconds", "Runtime"),
+    ("cpu_seconds", "CPU Time"),
+    ("memory_peak_bytes", "Peak Memory"),
+    ("cores", "Cores"),
+    ("queue_seconds", "Queue Wait"),
+]
+DEFAULT_SLOWEST_COUNT = 10
+
+# (plugin, name) of Galaxy metrics to summarized metric and unit scale.
+GALAXY_METRICS = {
+    ("core", "runtime_seconds"): ("runtime_seconds", 1),
+    ("core", "galaxy_slots"): ("cores", 1),
+    ("cgroup", "cpuacct.usage"): ("cpu_seconds", 1e-9),
+    ("cgroup", "cpu.stat.usage_usec"): ("cpu_seconds", 1e-6),
+    ("cgroup", "memory.max_usage_in_bytes"): ("memory_peak_bytes", 1),
+    ("cgroup", "memory.peak"): ("memory_peak_bytes", 1),
+}
+INTEGER_METRICS = ["memory_peak_bytes", "cores"]
+GALAXY_TIME_FORMATS = ["%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"]
+
+
+def galaxy_job_metrics(job):
+    """Return summarized metrics for a Galaxy job API dictionary (or None)."""
+    metrics = {}
+    start_epoch = None
+    for metric in (job or {}).get("job_metrics", None) or []:
+        plugin, name = metric.get("plugin"), metric.get("name")
+        value = _float(metric.get("raw_value"))
+        if value is None:
+            continue
+        if (plugin, name) == ("core", "start_epoch"):
+            start_epoch = value
+        elif (plugin, name) in GALAXY_METRICS:
+            key, scale = GALAXY_METRICS[(plugin, name)]
+            value = value * scale
+            metrics[key] = int(value) if key in INTEGER_METRICS else value
+    create_epoch = _galaxy_epoch((job or {}).get("create_time", None))
+    if start_epoch is not None and create_epoch is not None:
+        metrics["queue_seconds"] = max(0.0, start_epoch - create_epoch)
+    return metrics or None
+
+
+def add_job_metrics(test):
+    """Summarize the job metrics of a structured data test entry in place."""
+    data = test.get("data", None)
+    if not data or JOB_METRICS_KEY in data:
+        return test
+    metrics = galaxy_job_metrics(data.get("job", None))
+    if metrics:
+        data[JOB_METRICS_KEY] = metrics
+    return test
+
+
+def add_tests_job_metrics(structured_data):
+    """Summarize the job metrics of every test in structured data."""
+    for test in structured_data.get("tests", []):
+        add_job_metrics(test)
+    return structured_data
+
+
+def slowest_tests(structured_data, count=DEFAULT_SLOWEST_COUNT):
+    """Return up to ``count`` tests with the longest job runtime, slowest first."""
+    timed = []
+    for test in structured_data.get("tests", []):
+        metrics = (test.get("data", None) or {}).get(JOB_METRICS_KEY, None) or {}
+        if metrics.get("runtime_seconds", None) is not None:
+            timed.append(test)
+    timed.sort(key=lambda test: test["data"][JOB_METRICS_KEY]["runtime_seconds"], reverse=True)
+    return timed[:count]
+
+
+def format_metric(key, value):
+    """Format a summarized metric value for reports."""
+    if value is None:
+        return ""
+    if key == "memory_peak_bytes":
+        return "%.1f MB" % (value / (1024.0 * 1024.0))
+    if key == "cores":
+        return "%d" % value
+    return "%.1f s" % value
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _galaxy_epoch(value):
+    # Galaxy serializes job times as naive ISO 8601 UTC timestamps.
+    if not value:
+        return None
+    for time_format in GALAXY_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        return calendar.timegm(parsed.timetuple()) + parsed.microsecond / 1e6
+    return None
+
+
+__all__ = (
+    "add_job_metrics",
+    "add_tests_job_metrics",
+    "DEFAULT_SLOWEST_COUNT",
+    "format_metric",
+    "galaxy_job_metrics",
+    "METRICS",
+    "slowest_tests",
+)
@@ -4,8 +4,13 @@ Is a JSON.
 """
 import json
 import os
+from collections import OrderedDict
 
 from planemo.io import error
+from planemo.test.logs import rebase_log_references
+
+MERGE_POLICIES = ["last", "first_failure"]
+DEFAULT_MERGE_POLICY = "last"
 
 
 class StructuredData(object):
@@ -109,6 +114,48 @@ class StructuredData(object):
         return ids
 
 
+def merge_structured_data(json_paths, policy=DEFAULT_MERGE_POLICY):
+    """Merge test results from several structured data JSON files.
+
+    Files are read one at a time. Tests appearing in several files are
+    deduplicated by id: with the ``last`` policy the result from the last
+    file wins, with ``first_failure`` the first unsuccessful result wins over
+    any success (so re-running a chunk cannot hide a failure) and the last
+    result is used otherwise. The summary is recomputed from the merged tests
+    and references to externalized logs are made absolute.
+    """
+    if policy not in MERGE_POLICIES:
+        raise ValueError("Unknown merge policy [%s]" % policy)
+    tests = OrderedDict()
+    version = None
+    for json_path in json_paths:
+        with open(json_path, "r") as f:
+            data = json.load(f)
+        if version is None:
+            version = data.get("version", None)
+        base_directory = os.path.dirname(os.path.abspath(json_path))
+        for test in data.get("tests", []):
+            rebase_log_references(test, base_directory)
+            if test.get("data", None) is None:
+                # Galaxy records no data for tests that errored before running.
+                test["data"] = {"status": "error"}
+            previous = tests.get(test["id"], None)
+            if previous is not None and policy == "first_failure" and _test_failed(previous):
+                continue
+            tests[test["id"]] = test
+
+    merged = {"tests": list(tests.values())}
+    if version is not None:
+        merged["version"] = version
+    structured_data = StructuredData(data=merged)
+    structured_data.calculate_summary_data()
+    return structured_data
+
+
+def _test_failed(test):
+    return test["data"].get("status", None) != "success"
+
+
 def get_dict_value(key, data):
     """Return data[key] with improved KeyError."""
     try:
@@ -120,4 +167,5 @@ def get_dict_value(key, data):
 __all__ = (
     "StructuredData",
     "get_dict_value",
+    "merge_structured_data",
 )
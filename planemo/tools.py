@@ -9,6 +9,7 @@ from galaxy.tools import loader_directory
 from galaxy.tools.fetcher import ToolLocationFetcher
 
 from planemo.io import error, info
+from planemo.walker import directory_walker
 
 is_tool_load_error = loader_directory.is_tool_load_error
 SKIP_XML_MESSAGE = "Skipping XML file - does not appear to be a tool %s."
@@ -43,6 +44,7 @@ def yield_tool_sources(ctx, path, recursive=False, yield_load_errors=True):
         path,
         recursive,
         register_load_errors=True,
+        walker=directory_walker(ctx),
     )
     for (tool_path, tool_source) in tools:
         if is_tool_load_error(tool_source):
@@ -57,8 +59,14 @@ def yield_tool_sources(ctx, path, recursive=False, yield_load_errors=True):
         yield (tool_path, tool_source)
 
 
-def load_tool_sources_from_path(path, recursive, register_load_errors=False):
-    """Generator for tool sources on a path."""
+def load_tool_sources_from_path(path, recursive, register_load_errors=False, walker=None):
+    """Generator for tool sources on a path.
+
+    Directories are searched recursively with the supplied
+    :class:`planemo.walker.DirectoryWalker` if set.
+    """
+    if walker is not None and recursive and os.path.isdir(path):
+        return _load_tool_sources_from_walk(path, walker, register_load_errors)
     return loader_directory.load_tool_sources_from_path(
         path,
         _load_exception_handler,
@@ -67,6 +75,20 @@ def load_tool_sources_from_path(path, recursive, register_load_errors=False):
     )
 
 
+def _load_tool_sources_from_walk(path, walker, register_load_errors):
+    loaded = []
+    for tool_path in walker.files(os.path.abspath(path)):
+        if not os.path.exists(tool_path):
+            # Broken link or removed since the walk, skip.
+            continue
+        loaded.extend(loader_directory.load_tool_sources_from_path(
+            tool_path,
+            _load_exception_handler,
+            register_load_errors=register_load_errors,
+        ))
+    return loaded
+
+
 def _load_exception_handler(path, exc_info):
     error(LOAD_ERROR_MESSAGE % path)
     traceback.print_exception(*exc_info, limit=1, file=sys.stderr)
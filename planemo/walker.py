@@ -0,0 +1,234 @@
+"""Shared directory walker used to discover tools and repositories.
+
+The walker lists directories with ``os.scandir`` (falling back to
+``os.listdir`` on Python 2), prunes directories that never contain artifacts
+(VCS metadata, virtualenvs, ``node_modules``...), optionally honours
+``.gitignore`` files (from the enclosing git repository's root down) and can
+cache listings so several discovery passes over
+the same tree during one command only hit the filesystem once.
+"""
+from __future__ import absolute_import
+
+import fnmatch
+import os
+import threading
+import weakref
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
+
+PRUNED_DIRECTORIES = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".tox",
+    ".venv",
+    "node_modules",
+    "__pycache__",
+)
+GITIGNORE_NAME = ".gitignore"
+GIT_DIRECTORY_NAME = ".git"
+
+_walkers = weakref.WeakKeyDictionary()
+_walkers_lock = threading.Lock()
+
+
+class DirectoryWalker(object):
+    """Walk directory trees like ``os.walk`` with pruning and ignore rules.
+
+    ``prune`` lists directory names never descended into, if ``gitignore``
+    is set paths matched by ``.gitignore`` files of the walked directories and
+    of their parents up to the enclosing git repository root are skipped and
+    if ``cache`` is set directory listings are kept for the
+    life of the walker. As with ``os.walk``, symbolic links to directories
+    are listed but only descended into if ``follow_links`` is set and
+    directories that cannot be listed are skipped.
+    """
+
+    def __init__(self, prune=PRUNED_DIRECTORIES, gitignore=False, cache=False, follow_links=False):
+        self.prune = frozenset(prune)
+        self.gitignore = gitignore
+        self.cache = cache
+        self.follow_links = follow_links
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    def walk(self, top):
+        """Yield ``(dirpath, dirnames, filenames)`` top-down with sorted names.
+
+        As with ``os.walk``, ``dirnames`` may be modified in place to prune
+        the walk further.
+        """
+        stack = [(top, self._parent_rules(top))]
+        while stack:
+            dirpath, rules = stack.pop()
+            dirnames, filenames, links = self._list(dirpath)
+            if self.gitignore:
+                rules = self._rules_for(dirpath, rules)
+                dirnames = [d for d in dirnames if not rules.ignored(os.path.join(dirpath, d), True)]
+                filenames = [f for f in filenames if not rules.ignored(os.path.join(dirpath, f), False)]
+            dirnames = [d for d in dirnames if d not in self.prune]
+            yield dirpath, dirnames, filenames
+            for dirname in reversed(dirnames):
+                if dirname in links and not self.follow_links:
+                    continue
+                stack.append((os.path.join(dirpath, dirname), rules))
+
+    def files(self, top):
+        """Yield path of each file below ``top``."""
+        for dirpath, _, filenames in self.walk(top):
+            for filename in filenames:
+                yield os.path.join(dirpath, filename)
+
+    def find_files(self, top, pattern):
+        """Yield path of each file below ``top`` with a name matching ``pattern``."""
+        for dirpath, _, filenames in self.walk(top):
+            for filename in fnmatch.filter(filenames, pattern):
+                yield os.path.join(dirpath, filename)
+
+    def _list(self, dirpath):
+        if self.cache:
+            with self._lock:
+                listing = self._listings.get(dirpath, None)
+            if listing is not None:
+                return list(listing[0]), list(listing[1]), listing[2]
+        listing = _list_directory(dirpath)
+        if self.cache:
+            with self._lock:
+                self._listings[dirpath] = listing
+        return list(listing[0]), list(listing[1]), listing[2]
+
+    def _parent_rules(self, top):
+        # Rules of .gitignore files between the repository root and top.
+        rules = IgnoreRules()
+        if not self.gitignore:
+            return rules
+        parents = []
+        directory = os.path.abspath(top)
+        while True:
+            parent = os.path.dirname(directory)
+            if os.path.exists(os.path.join(directory, GIT_DIRECTORY_NAME)) or parent == directory:
+                break
+            parents.append(parent)
+            directory = parent
+        if not os.path.exists(os.path.join(directory, GIT_DIRECTORY_NAME)):
+            # Not in a git repository, only rules below top apply.
+            return rules
+        for parent in reversed(parents):
+            rules = self._rules_for(parent, rules)
+        return rules
+
+    def _rules_for(self, dirpath, parent_rules):
+        if not self.gitignore:
+            return parent_rules
+        gitignore_path = os.path.join(dirpath, GITIGNORE_NAME)
+        if not os.path.isfile(gitignore_path):
+            return parent_rules
+        try:
+            with open(gitignore_path, "r") as f:
+                lines = f.read().splitlines()
+        except (OSError, IOError):
+            return parent_rules
+        return parent_rules.extended(dirpath, lines)
+
+
+class IgnoreRules(object):
+    """Ordered ``.gitignore`` style patterns, the last matching one wins.
+
+    Supports negation (``!``), directory-only (trailing ``/``) and anchored
+    (containing ``/``) patterns but not ``**``.
+    """
+
+    def __init__(self, rules=()):
+        self._rules = tuple(rules)
+
+    def extended(self, base_directory, lines):
+        rules = list(self._rules)
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            rules.append((base_directory, line.lstrip("/"), negate, directory_only, anchored))
+        return IgnoreRules(rules)
+
+    def ignored(self, path, is_directory):
+        ignored = False
+        for base_directory, pattern, negate, directory_only, anchored in self._rules:
+            if directory_only and not is_directory:
+                continue
+            if anchored:
+                matches = fnmatch.fnmatch(os.path.relpath(path, base_directory), pattern)
+            else:
+                matches = fnmatch.fnmatch(os.path.basename(path), pattern)
+            if matches:
+                ignored = not negate
+        return ignored
+
+
+def directory_walker(ctx):
+    """Return the caching :class:`DirectoryWalker` for this command invocation.
+
+    A new uncached walker is returned if ``ctx`` is None.
+    """
+    if ctx is None:
+        return DirectoryWalker(gitignore=True)
+    with _walkers_lock:
+        if ctx not in _walkers:
+            _walkers[ctx] = DirectoryWalker(gitignore=True, cache=True)
+        return _walkers[ctx]
+
+
+def _list_directory(dirpath):
+    dirnames = []
+    filenames = []
+    links = set()
+    for name, is_dir, is_link in _directory_entries(dirpath):
+        if is_dir:
+            dirnames.append(name)
+            if is_link:
+                links.add(name)
+        else:
+            filenames.append(name)
+    dirnames.sort()
+    filenames.sort()
+    return dirnames, filenames, frozenset(links)
+
+
+def _directory_entries(dirpath):
+    # As with os.walk, directories that cannot be listed are skipped.
+    if scandir is not None:
+        try:
+            entries = list(scandir(dirpath))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            yield entry.name, is_dir, is_dir and entry.is_symlink()
+    else:
+        try:
+            names = os.listdir(dirpath)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(dirpath, name)
+            is_dir = os.path.isdir(path)
+            yield name, is_dir, is_dir and os.path.islink(path)
+
+
+__all__ = (
+    "directory_walker",
+    "DirectoryWalker",
+    "IgnoreRules",
+    "PRUNED_DIRECTORIES",
+)
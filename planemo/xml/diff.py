@@ -1,15 +1,97 @@
+"""Compare XML documents ignoring insignificant whitespace.
 
-def diff(x1, x2, reporter=None):
-    """Return 0 if and only if the XML has the same content."""
-    compare = xml_compare(x1, x2, reporter)
-    return_val = 0 if compare else 1
-    return return_val
+Equality is decided by comparing :func:`canonical_hash` digests - one linear
+pass over each tree - and trees are only walked structurally to describe
+differences when they differ and a reporter is supplied.
+"""
+import hashlib
+import json
+
+import six
+
+
+def diff(x1, x2, reporter=None, ignore_attributes=None, full=False):
+    """Return 0 if and only if the XML has the same content.
+
+    ``ignore_attributes`` maps element tags to attribute names that should
+    not be compared. If the documents differ, the first difference (or every
+    difference if ``full`` is set) is described to ``reporter``.
+    """
+    if canonical_hash(x1, ignore_attributes) == canonical_hash(x2, ignore_attributes):
+        return 0
+    if reporter is not None:
+        if full:
+            for message in xml_differences(x1, x2, ignore_attributes):
+                reporter(message)
+        else:
+            xml_compare(x1, x2, reporter, ignore_attributes)
+    return 1
+
+
+def canonical_hash(element, ignore_attributes=None):
+    """Return digest of element's canonical form.
+
+    Attributes are sorted (ignored attributes dropped) and text and tails are
+    stripped of surrounding whitespace, so two elements have the same digest
+    if and only if :func:`xml_compare` considers them equal.
+    """
+    digest = hashlib.sha1()
+    stack = [element]
+    while stack:
+        current = stack.pop()
+        if current is None:
+            # Closes the element whose children were just hashed.
+            digest.update(b")")
+            continue
+        event = [
+            six.text_type(current.tag),
+            sorted(_attributes(current, ignore_attributes).items()),
+            _text(current.text),
+            _text(current.tail),
+        ]
+        digest.update(b"(")
+        digest.update(json.dumps(event).encode("utf-8"))
+        stack.append(None)
+        stack.extend(reversed(list(current)))
+    return digest.hexdigest()
+
+
+def xml_differences(x1, x2, ignore_attributes=None):
+    """Yield a message describing each difference between two elements."""
+    stack = [(x1, x2, "/%s" % x1.tag)]
+    while stack:
+        e1, e2, path = stack.pop()
+        if e1.tag != e2.tag:
+            yield 'Tags do not match at %s: %s and %s\n' % (path, e1.tag, e2.tag)
+            continue
+        attrib1 = _attributes(e1, ignore_attributes)
+        attrib2 = _attributes(e2, ignore_attributes)
+        for name, value in sorted(attrib1.items()):
+            if attrib2.get(name) != value:
+                yield ('Attributes do not match at %s: %s=%r, %s=%r\n'
+                       % (path, name, value, name, attrib2.get(name)))
+        for name in sorted(attrib2.keys()):
+            if name not in attrib1:
+                yield 'x2 has an attribute x1 is missing at %s: %s\n' % (path, name)
+        if not text_compare(e1.text, e2.text):
+            yield 'text at %s: %r != %r\n' % (path, e1.text, e2.text)
+        if not text_compare(e1.tail, e2.tail):
+            yield 'tail at %s: %r != %r\n' % (path, e1.tail, e2.tail)
+        cl1 = list(e1)
+        cl2 = list(e2)
+        if len(cl1) != len(cl2):
+            yield ('children length differs at %s, %i != %i\n'
+                   % (path, len(cl1), len(cl2)))
+        children = []
+        for i, (c1, c2) in enumerate(zip(cl1, cl2)):
+            children.append((c1, c2, "%s/%s[%i]" % (path, c1.tag, i + 1)))
+        stack.extend(reversed(children))
 
 
 # From
 # bitbucket.org/ianb/formencode/src/tip/formencode/doctest_xml_compare.py
 # with (PSF license)
-def xml_compare(x1, x2, reporter=None):
+def xml_compare(x1, x2, reporter=None, ignore_attributes=None):
     if reporter is None:
         def reporter(x):
             return None
@@ -17,13 +99,15 @@ def xml_compare(x1, x2, reporter=None):
     if x1.tag != x2.tag:
         reporter('Tags do not match: %s and %s\n' % (x1.tag, x2.tag))
         return False
-    for name, value in x1.attrib.items():
-        if x2.attrib.get(name) != value:
+    attrib1 = _attributes(x1, ignore_attributes)
+    attrib2 = _attributes(x2, ignore_attributes)
+    for name, value in attrib1.items():
+        if attrib2.get(name) != value:
             reporter('Attributes do not match: %s=%r, %s=%r\n'
-                     % (name, value, name, x2.attrib.get(name)))
+                     % (name, value, name, attrib2.get(name)))
             return False
-    for name in x2.attrib.keys():
-        if name not in x1.attrib:
+    for name in attrib2.keys():
+        if name not in attrib1:
             reporter('x2 has an attribute x1 is missing: %s\n'
                      % name)
             return False
@@ -33,12 +117,12 @@ def xml_compare(x1, x2, reporter=None):
     if not text_compare(x1.tail, x2.tail):
         reporter('tail: %r != %r\n' % (x1.tail, x2.tail))
         return False
-    return _compare_children(x1, x2, reporter)
+    return _compare_children(x1, x2, reporter, ignore_attributes)
 
 
-def _compare_children(x1, x2, reporter):
-    cl1 = x1.getchildren()
-    cl2 = x2.getchildren()
+def _compare_children(x1, x2, reporter, ignore_attributes):
+    cl1 = list(x1)
+    cl2 = list(x2)
     if len(cl1) != len(cl2):
         reporter('children length differs, %i != %i\n'
                  % (len(cl1), len(cl2)))
@@ -46,7 +130,7 @@ def _compare_children(x1, x2, reporter):
     i = 0
     for c1, c2 in zip(cl1, cl2):
         i += 1
-        if not xml_compare(c1, c2, reporter=reporter):
+        if not xml_compare(c1, c2, reporter, ignore_attributes):
             reporter('children %i do not match: %s\n'
                      % (i, c1.tag))
             return False
@@ -57,3 +141,14 @@ def text_compare(t1, t2):
     if not t1 and not t2:
         return True
     return (t1 or '').strip() == (t2 or '').strip()
+
+
+def _text(text):
+    return (text or '').strip()
+
+
+def _attributes(element, ignore_attributes):
+    if not ignore_attributes or element.tag not in ignore_attributes:
+        return element.attrib
+    ignored = ignore_attributes[element.tag]
+    return dict((k, v) for k, v in element.attrib.items() if k not in ignored)
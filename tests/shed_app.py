@@ -1,6 +1,7 @@
 """ Test app to emulate planemo-relevant portions of the
 the ToolShed API... for now :).
 """
+import hashlib
 import json
 import os
 import tarfile
@@ -61,6 +62,24 @@ def update_repository_contents(id):
     return json.dumps({"id": id})
 
 
+@app.route("/api/repositories/get_ordered_installable_revisions")
+def get_ordered_installable_revisions():
+    model = app.config["model"]
+    for id, repo in model.get_repositories().items():
+        if repo["name"] == request.args["name"] and repo["owner"] == request.args["owner"]:
+            return json.dumps(model.get_installable_revisions(id))
+    return json.dumps([])
+
+
+@app.route("/repos/<owner>/<name>")
+def repository_lookup(owner, name):
+    model = app.config["model"]
+    for id, repo in model.get_repositories().items():
+        if repo["name"] == name and repo["owner"] == owner:
+            return "1 %s\n" % model.get_tip(id)
+    return "0 unknown revision\n"
+
+
 @app.route("/api/categories")
 def get_categories():
     categories = app.config["model"].get_categories()
@@ -138,6 +157,16 @@ class InMemoryShedDataModel(object):
     def get_repository(self, id):
         return self._repositories[id]
 
+    def get_installable_revisions(self, id):
+        # Simulate a new revision for each upload.
+        uploads = len(self._repositories_msg.get(id, []))
+        return ["%s_%d" % (id, i) for i in range(uploads)]
+
+    def get_tip(self, id):
+        # Simulate a new changeset for each upload.
+        uploads = len(self._repositories_msg.get(id, []))
+        return hashlib.sha1(("%s_%d" % (id, uploads)).encode("utf-8")).hexdigest()
+
     def repository_path(self, id):
         return os.path.join(self.directory, id)
 
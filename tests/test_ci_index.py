@@ -0,0 +1,147 @@
+"""Test :class:`planemo.ci_index.FileDependencyIndex`."""
+import os
+
+from planemo.ci_index import FileDependencyIndex
+from planemo.io import temp_directory
+from .test_utils import test_context as _test_context
+
+TOOL_XML = """<tool id="cat" name="cat" version="1.0">
+    <macros>
+        <import>../shared/macros.xml</import>
+    </macros>
+    <expand macro="requirements" />
+    <command>cat $input > $output</command>
+    <inputs>
+        <param name="input" type="data" />
+        <param name="index" type="select">
+            <options from_data_table="all_fasta" />
+        </param>
+    </inputs>
+    <outputs>
+        <data name="output" format="txt" />
+    </outputs>
+    <tests>
+        <test>
+            <param name="input" value="1.txt" />
+            <output name="output" file="1.txt" />
+        </test>
+    </tests>
+</tool>
+"""
+
+# Galaxy resolves nested imports relative to the tool.
+MACROS_XML = """<macros>
+    <import>../shared/requirements.xml</import>
+</macros>
+"""
+
+REQUIREMENTS_XML = """<macros>
+    <xml name="requirements"><requirements /></xml>
+</macros>
+"""
+
+DATA_TABLES_XML = """<tables>
+    <table name="all_fasta" comment_char="#">
+        <columns>value, name, path</columns>
+        <file path="tool-data/all_fasta.loc" />
+    </table>
+</tables>
+"""
+
+SHED_YML = """name: cat
+owner: iuc
+description: cat
+categories: [Text Manipulation]
+include:
+  - "*.xml"
+  - "test-data/*"
+  - "tool-data/*"
+  - "tool_data_table_conf.xml.sample"
+"""
+
+
+def test_tool_and_repository_dependencies():
+    with temp_directory() as root:
+        _write(root, "cat/cat.xml", TOOL_XML)
+        _write(root, "cat/test-data/1.txt", "1")
+        _write(root, "cat/tool_data_table_conf.xml.sample", DATA_TABLES_XML)
+        _write(root, "cat/tool-data/all_fasta.loc.sample", "#")
+        _write(root, "cat/.shed.yml", SHED_YML)
+        _write(root, "shared/macros.xml", MACROS_XML)
+        _write(root, "shared/requirements.xml", REQUIREMENTS_XML)
+        _write(root, "other/other.txt", "other")
+
+        cache_path = os.path.join(root, "index.json")
+        index = FileDependencyIndex(root, cache_path=cache_path)
+        tool_path = os.path.join(root, "cat", "cat.xml")
+        assert index.tool_dependencies(tool_path) == set([
+            "cat/cat.xml",
+            "cat/.shed.yml",
+            "cat/test-data/1.txt",
+            "cat/tool_data_table_conf.xml.sample",
+            "cat/tool_data_table_conf.xml.test",
+            "cat/test-data/tool_data_table_conf.xml.test",
+            "cat/tool-data/all_fasta.loc.sample",
+            "shared/macros.xml",
+            "shared/requirements.xml",
+        ])
+        assert index.affected_tools(["cat/cat.xml"], ["shared/requirements.xml"]) == set(["cat/cat.xml"])
+        assert index.affected_tools(["cat/cat.xml"], ["other/other.txt"]) == set()
+
+        # Referenced test data that does not exist (yet) is a dependency too.
+        _write(root, "cat/cat.xml", TOOL_XML.replace('file="1.txt"', 'file="2.txt"'))
+        assert "cat/test-data/2.txt" in index.tool_dependencies(tool_path)
+        assert index.affected_tools(["cat/cat.xml"], ["cat/test-data/2.txt"]) == set(["cat/cat.xml"])
+        _write(root, "cat/cat.xml", TOOL_XML)
+
+        ctx = _test_context()
+        assert index.affected_repositories(ctx, ["cat"], ["shared/macros.xml"]) == set(["cat"])
+        assert index.affected_repositories(ctx, ["cat"], ["other/other.txt"]) == set()
+
+        # Dependencies are reused from the persisted index until a file changes.
+        index.save()
+        cached = FileDependencyIndex(root, cache_path=cache_path)
+        assert "cat/cat.xml" in cached._tools
+        assert "shared/macros.xml" in cached.tool_dependencies(tool_path)
+
+
+TEST_DATA_TABLES_XML = """<tables>
+    <table name="all_fasta" comment_char="#">
+        <columns>value, name, path</columns>
+        <file path="${__HERE__}/test-data/all_fasta.loc" />
+    </table>
+</tables>
+"""
+
+
+def test_dependencies_in_working_directory():
+    with temp_directory() as root:
+        root = os.path.realpath(root)
+        _write(root, "tools/cat/cat.xml", TOOL_XML)
+        _write(root, "tools/shared/macros.xml", MACROS_XML)
+        _write(root, "tools/shared/requirements.xml", REQUIREMENTS_XML)
+        # As planemo test does, test artifacts are found in the working directory.
+        _write(root, "test-data/1.txt", "1")
+        _write(root, "test-data/all_fasta.loc", "#")
+        _write(root, "tool_data_table_conf.xml.test", TEST_DATA_TABLES_XML)
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            index = FileDependencyIndex(root)
+            dependencies = index.tool_dependencies("tools/cat/cat.xml")
+            affected = index.affected_tools(["tools/cat/cat.xml"], ["tool_data_table_conf.xml.test"])
+        finally:
+            os.chdir(cwd)
+        assert "test-data/1.txt" in dependencies
+        assert "tools/cat/test-data/1.txt" in dependencies
+        assert "tool_data_table_conf.xml.test" in dependencies
+        assert "test-data/all_fasta.loc" in dependencies
+        assert affected == set(["tools/cat/cat.xml"])
+
+
+def _write(root, path, contents):
+    path = os.path.join(root, path)
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.write(contents)
@@ -0,0 +1,49 @@
+"""Module contains :class:`CmdBenchmarkTestCase` - integration tests for the ``benchmark`` command."""
+import json
+import os
+
+from .test_utils import (
+    CliTestCase,
+    skip_if_environ,
+    TEST_DATA_DIR,
+)
+
+
+class CmdBenchmarkTestCase(CliTestCase):
+    """Integration tests for the ``benchmark`` command."""
+
+    @skip_if_environ("PLANEMO_SKIP_CWLTOOL_TESTS")
+    def test_cwltool_benchmark_baseline(self):
+        """Test benchmarking a CWL tool with cwltool and comparing against baselines."""
+        with self._isolate() as f:
+            test_artifact = os.path.join(TEST_DATA_DIR, "int_tool.cwl")
+            self._check_exit_code([
+                "benchmark", "--repetitions", "2", test_artifact,
+            ], exit_code=0)
+            with open(os.path.join(f, "benchmark.json"), "r") as fh:
+                benchmark = json.load(fh)
+            assert benchmark["repetitions"] == 2
+            test = benchmark["tests"][0]
+            assert len(test["runs"]) == 2
+            assert test["num_failures"] == 0
+            assert test["statistics"]["wall_seconds"]["median"] > 0
+
+            for name, scale, exit_code in [("slow", 100.0, 0), ("fast", 0.01, 1)]:
+                baseline = json.loads(json.dumps(benchmark))
+                baseline["tests"][0]["statistics"]["wall_seconds"]["median"] *= scale
+                with open(os.path.join(f, "%s.json" % name), "w") as fh:
+                    json.dump(baseline, fh)
+                self._check_exit_code([
+                    "benchmark", "--repetitions", "1",
+                    "--benchmark_output", "current.json",
+                    "--baseline", "%s.json" % name,
+                    test_artifact,
+                ], exit_code=exit_code)
+
+    def test_invalid_regression_threshold(self):
+        """Test unknown metrics are rejected as regression thresholds."""
+        with self._isolate():
+            test_artifact = os.path.join(TEST_DATA_DIR, "int_tool.cwl")
+            self._check_exit_code([
+                "benchmark", "--regression_threshold", "moo=0.1", test_artifact,
+            ], exit_code=2)
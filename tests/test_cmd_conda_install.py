@@ -0,0 +1,55 @@
+"""Module contains :class:`CmdCondaInstallTestCase` - integration tests for the ``conda_install`` command."""
+import os
+
+from .test_utils import (
+    CliTestCase,
+    PROJECT_TEMPLATES_DIR,
+    skip_if_environ,
+)
+
+BWA_TOOL = os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa.xml")
+BWA_AND_SAMTOOLS_TOOL = os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa_and_samtools.xml")
+
+
+class CmdCondaInstallTestCase(CliTestCase):
+    """Integration tests for the ``conda_install`` command."""
+
+    @skip_if_environ("PLANEMO_SKIP_SLOW_TESTS")
+    def test_batch_install(self):
+        with self._isolate() as f:
+            conda_prefix = os.path.join(f, "conda")
+            install_command = [
+                "--verbose",
+                "conda_install",
+                "--conda_prefix", conda_prefix,
+                "--conda_auto_init",
+                "--batch",
+                "--jobs", "2",
+                BWA_TOOL,
+                BWA_AND_SAMTOOLS_TOOL,
+            ]
+            self._check_exit_code(install_command)
+            # One environment per tool, named as Galaxy's resolver expects.
+            env_names = sorted(os.listdir(os.path.join(conda_prefix, "envs")))
+            assert len(env_names) == 2, env_names
+            assert env_names[0] == "__bwa@0.7.12"
+            assert env_names[1].startswith("mulled-v1-")
+
+            result = self._check_exit_code(install_command)
+            assert "already exists, skipping" in result.output
+
+    @skip_if_environ("PLANEMO_SKIP_SLOW_TESTS")
+    def test_batch_install_global(self):
+        with self._isolate() as f:
+            conda_prefix = os.path.join(f, "conda")
+            install_command = [
+                "conda_install",
+                "--conda_prefix", conda_prefix,
+                "--conda_auto_init",
+                "--batch",
+                "--global",
+                BWA_AND_SAMTOOLS_TOOL,
+            ]
+            self._check_exit_code(install_command)
+            assert os.path.exists(os.path.join(conda_prefix, "bin", "samtools"))
+            assert not os.listdir(os.path.join(conda_prefix, "envs"))
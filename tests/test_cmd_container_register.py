@@ -0,0 +1,65 @@
+"""Module contains :class:`CmdContainerRegisterTestCase` - integration tests for the ``container_register`` command."""
+import os
+
+from galaxy.tools.deps.mulled.util import (
+    build_target,
+    v2_image_name,
+)
+
+from .test_utils import (
+    CliTestCase,
+    PROJECT_TEMPLATES_DIR,
+    skip_if_environ,
+)
+
+BWA_TOOL = os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa.xml")
+BWA_AND_SAMTOOLS_TOOL = os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa_and_samtools.xml")
+
+
+class CmdContainerRegisterTestCase(CliTestCase):
+    """Integration tests for the ``container_register`` command."""
+
+    def test_single_requirement_not_registered(self):
+        with self._isolate() as f:
+            output_directory = os.path.join(f, "combinations")
+            os.makedirs(output_directory)
+            register_command = [
+                "--verbose",
+                "container_register",
+                "--output_directory", output_directory,
+                "--no_pull_request",
+                "--conda_prefix", os.path.join(f, "conda"),
+                "--jobs", "2",
+                BWA_TOOL,
+            ]
+            result = self._check_exit_code(register_command)
+            assert "fewer than 2 targets discovered" in result.output
+            assert os.listdir(output_directory) == []
+
+    @skip_if_environ("PLANEMO_SKIP_SLOW_TESTS")
+    def test_registered_combination_skipped(self):
+        with self._isolate() as f:
+            output_directory = os.path.join(f, "combinations")
+            os.makedirs(output_directory)
+            name = v2_image_name([build_target("bwa", "0.7.15"), build_target("samtools", "1.3.1")])
+            target_path = os.path.join(output_directory, "%s-0.tsv" % name)
+            with open(target_path, "w") as target_file:
+                target_file.write("bwa=0.7.15,samtools=1.3.1")
+            duplicate_tool = os.path.join(f, "bwa_and_samtools_copy.xml")
+            with open(BWA_AND_SAMTOOLS_TOOL, "r") as source, open(duplicate_tool, "w") as dest:
+                dest.write(source.read())
+            register_command = [
+                "--verbose",
+                "container_register",
+                "--output_directory", output_directory,
+                "--no_pull_request",
+                "--conda_prefix", os.path.join(f, "conda"),
+                "--conda_auto_init",
+                "--jobs", "2",
+                BWA_AND_SAMTOOLS_TOOL,
+                duplicate_tool,
+            ]
+            result = self._check_exit_code(register_command)
+            # Both tools share the one combination, which is already registered.
+            assert result.output.count("already exists, skipping") == 1, result.output
+            assert os.listdir(output_directory) == [os.path.basename(target_path)]
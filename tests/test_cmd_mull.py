@@ -0,0 +1,37 @@
+"""Module contains :class:`CmdMullTestCase` - integration tests for the ``mull`` command."""
+import os
+
+from .test_utils import (
+    CliTestCase,
+    PROJECT_TEMPLATES_DIR,
+    skip_if_environ,
+    skip_unless_executable,
+)
+
+BWA_TOOL = os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa.xml")
+BWA_AND_SAMTOOLS_TOOL = os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa_and_samtools.xml")
+
+
+class CmdMullTestCase(CliTestCase):
+    """Integration tests for the ``mull`` command."""
+
+    @skip_if_environ("PLANEMO_SKIP_SLOW_TESTS")
+    @skip_unless_executable("docker")
+    def test_mull_concurrently(self):
+        with self._isolate() as f:
+            duplicate_tool = os.path.join(f, "bwa_and_samtools_copy.xml")
+            with open(BWA_AND_SAMTOOLS_TOOL, "r") as source, open(duplicate_tool, "w") as dest:
+                dest.write(source.read())
+            mull_command = [
+                "--verbose",
+                "mull",
+                "--jobs", "2",
+                BWA_TOOL,
+                BWA_AND_SAMTOOLS_TOOL,
+                duplicate_tool,
+            ]
+            self._check_exit_code(mull_command)
+
+            # Images built by the first run are not built again.
+            result = self._check_exit_code(mull_command)
+            assert result.output.count("already exists locally, skipping") == 2, result.output
@@ -0,0 +1,189 @@
+"""Test conda utilities in ``planemo.conda``."""
+import json
+import os
+import subprocess
+import sys
+
+from galaxy.tools.deps import conda_util
+
+from planemo.conda import (
+    build_conda_context,
+    collect_conda_target_sets,
+    conda_environment_name,
+    CondaEnvironmentStore,
+)
+from planemo.io import temp_directory
+from .test_utils import (
+    assert_equal,
+    PROJECT_TEMPLATES_DIR,
+    test_context,
+    TEST_DIR,
+    TEST_TOOLS_DIR,
+)
+
+
+def test_collect_conda_target_sets_deduplicates():
+    ctx = test_context()
+    paths = [
+        os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa.xml"),
+        os.path.join(TEST_TOOLS_DIR, "bwa_wrong_version.xml"),
+        "samtools=1.3.1,bwa=0.7.12",
+    ]
+    target_sets = collect_conda_target_sets(ctx, paths)
+    assert_equal(len(target_sets), 2)
+    env_names = [conda_environment_name(s) for s in target_sets]
+    assert "__bwa@0.7.12" in env_names
+    assert any(n.startswith("mulled-v1-") for n in env_names)
+
+
+def test_conda_environment_store_paths():
+    ctx = test_context()
+    conda_context = build_conda_context(ctx, conda_prefix="/tmp/planemo-test-conda")
+    store = CondaEnvironmentStore(ctx, conda_context)
+    assert store.directory.startswith(os.path.join(ctx.workspace, "conda_env_store"))
+    assert_equal(store.lockfile_path("__bwa@0.7.12"), os.path.join(store.directory, "locks", "__bwa@0.7.12.txt"))
+    assert not store.has_lockfile("__bwa@0.7.12")
+
+
+def test_conda_environment_name_stable_across_hash_seeds():
+    tool_path = os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa_and_samtools.xml")
+    script = (
+        "import sys\n"
+        "from planemo.conda import collect_conda_target_sets, conda_environment_name\n"
+        "from tests.test_utils import test_context\n"
+        "target_sets = collect_conda_target_sets(test_context(), [sys.argv[1], 'samtools=1.3.1,bwa=0.7.12'])\n"
+        "print(' '.join(conda_environment_name(s) for s in target_sets))\n"
+    )
+    names = set()
+    for seed in ["0", "1", "2", "3", "4"]:
+        env = os.environ.copy()
+        env["PYTHONHASHSEED"] = seed
+        names.add(subprocess.check_output(
+            [sys.executable, "-c", script, tool_path], cwd=os.path.join(TEST_DIR, os.path.pardir), env=env,
+        ))
+    assert_equal(len(names), 1)
+    # Galaxy hashes the targets in the tool's requirement declaration order.
+    galaxy_name = "mulled-v1-%s" % conda_util.hash_conda_packages([
+        conda_util.CondaTarget("bwa", "0.7.15"),
+        conda_util.CondaTarget("samtools", "1.3.1"),
+    ])
+    assert galaxy_name in names.pop().decode("utf-8").split()
+
+
+STORE_SCRIPT = """
+import json
+import sys
+
+from planemo.conda import collect_conda_target_sets, conda_environment_name, CondaEnvironmentStore
+from tests.test_utils import test_context
+
+
+class FakeCondaContext(object):
+    # Records conda invocations instead of running conda.
+    conda_prefix = sys.argv[3]
+
+    def __init__(self, envs):
+        self.envs = envs
+        self.created = []
+
+    def has_env(self, env_name):
+        return env_name in self.envs
+
+    def exec_command(self, operation, args, stdout_path=None):
+        with open(stdout_path, "w") as f:
+            f.write("@EXPLICIT\\n")
+        return 0
+
+    def exec_create(self, args):
+        self.created.append(args[1])
+        return 0
+
+
+ctx = test_context()
+ctx.planemo_directory = sys.argv[2]
+target_sets = collect_conda_target_sets(ctx, [sys.argv[4]])
+if sys.argv[1] == "record":
+    conda_context = FakeCondaContext(envs=["base"])
+    conda_context.envs.extend(conda_environment_name(s) for s in target_sets)
+    CondaEnvironmentStore(ctx, conda_context).record_all(ctx, target_sets)
+else:
+    conda_context = FakeCondaContext(envs=[])
+    return_codes = CondaEnvironmentStore(ctx, conda_context).restore_all(ctx, target_sets)
+    print(json.dumps({"return_codes": return_codes, "created": conda_context.created}))
+"""
+
+
+def test_conda_environment_store_restores_across_processes():
+    tool_path = os.path.join(PROJECT_TEMPLATES_DIR, "conda_testing", "bwa_and_samtools.xml")
+    with temp_directory() as workspace:
+        outputs = []
+        for seed, mode in [("1", "record"), ("2", "restore")]:
+            env = os.environ.copy()
+            env["PYTHONHASHSEED"] = seed
+            outputs.append(subprocess.check_output(
+                [sys.executable, "-c", STORE_SCRIPT, mode, workspace, "/tmp/planemo-test-conda", tool_path],
+                cwd=os.path.join(TEST_DIR, os.path.pardir), env=env,
+            ))
+        restored = json.loads(outputs[1].decode("utf-8"))
+        assert_equal(restored["return_codes"], [0])
+        assert_equal(len(restored["created"]), 1)
+        assert restored["created"][0].startswith("mulled-v1-")
+
+
+class FailingRestoreCondaContext(object):
+    """Fake Conda context on which creating environments from lockfiles fails."""
+
+    conda_prefix = "/tmp/planemo-test-conda"
+
+    def __init__(self):
+        self.envs = set()
+        self.removed = []
+        self.solved = []
+
+    def has_env(self, env_name):
+        return env_name in self.envs
+
+    def exec_create(self, args, allow_local=True):
+        # Failed creates may leave a partial environment behind.
+        self.envs.add(args[1])
+        if "--file" in args:
+            return 1
+        self.solved.append(args[1])
+        return 0
+
+    def exec_remove(self, args):
+        self.removed.extend(args)
+        self.envs.difference_update(args)
+        return 0
+
+    def exec_command(self, operation, args, stdout_path=None):
+        with open(stdout_path, "w") as f:
+            f.write("@EXPLICIT\n")
+        return 0
+
+
+def test_conda_environment_store_stale_lockfile():
+    ctx = test_context()
+    target_sets = collect_conda_target_sets(ctx, ["bwa=0.7.12"])
+    env_name = conda_environment_name(target_sets[0])
+    with temp_directory() as workspace:
+        ctx.planemo_directory = workspace
+        conda_context = FailingRestoreCondaContext()
+        store = CondaEnvironmentStore(ctx, conda_context)
+
+        # Restoring for Galaxy removes the partial environment and the lockfile.
+        with open(store.lockfile_path(env_name), "w") as f:
+            f.write("@EXPLICIT\nhttps://example.org/gone.tar.bz2\n")
+        assert_equal(store.restore_all(ctx, target_sets), [1])
+        assert not conda_context.has_env(env_name)
+        assert not store.has_lockfile(env_name)
+        assert_equal(conda_context.removed, [env_name])
+
+        # Installing falls back to solving and records a fresh lockfile.
+        with open(store.lockfile_path(env_name), "w") as f:
+            f.write("@EXPLICIT\nhttps://example.org/gone.tar.bz2\n")
+        assert_equal(store.install(env_name, target_sets[0]), 0)
+        assert_equal(conda_context.solved, [env_name])
+        assert conda_context.has_env(env_name)
+        with open(store.lockfile_path(env_name), "r") as f:
+            assert_equal(f.read(), "@EXPLICIT\n")
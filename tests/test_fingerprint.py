@@ -0,0 +1,65 @@
+"""Test :class:`planemo.fingerprint.Fingerprinter`."""
+import os
+import subprocess
+
+from planemo.fingerprint import (
+    blob_hash,
+    Fingerprinter,
+)
+from .test_git import (
+    _add_and_commit,
+    _git_directory,
+)
+from .test_utils import io
+
+
+def test_blob_hash_matches_git():
+    with _git_directory() as t:
+        readme = os.path.join(t, "README")
+        expected = subprocess.check_output(["git", "hash-object", readme]).decode("utf-8").strip()
+        assert blob_hash(readme) == expected
+
+
+def test_tracked_and_untracked_fingerprints():
+    with _git_directory() as t:
+        os.makedirs(os.path.join(t, "data"))
+        io.write_file(os.path.join(t, "data", "1.txt"), "1")
+        _add_and_commit(t, ["data/1.txt"])
+        io.write_file(os.path.join(t, "data", "2.txt"), "2")
+        fingerprinter = Fingerprinter()
+        tracked = fingerprinter.path_fingerprint(os.path.join(t, "data", "1.txt"))
+        assert tracked == blob_hash(os.path.join(t, "data", "1.txt"))
+        assert fingerprinter.path_fingerprint(os.path.join(t, "data", "2.txt")) == \
+            blob_hash(os.path.join(t, "data", "2.txt"))
+        # Only untracked files were hashed.
+        assert list(fingerprinter._hashes.keys()) == [os.path.realpath(os.path.join(t, "data", "2.txt"))]
+
+        # Modified tracked files are hashed from disk.
+        io.write_file(os.path.join(t, "data", "1.txt"), "changed")
+        fingerprinter = Fingerprinter()
+        assert fingerprinter.path_fingerprint(os.path.join(t, "data", "1.txt")) != tracked
+
+
+def test_directory_fingerprint():
+    with io.temp_directory() as t:
+        os.makedirs(os.path.join(t, "a"))
+        io.write_file(os.path.join(t, "a", "1.txt"), "1")
+        io.write_file(os.path.join(t, "a", "2.txt"), "2")
+        first = Fingerprinter().directory_fingerprint(os.path.join(t, "a"))
+        assert Fingerprinter().directory_fingerprint(os.path.join(t, "a")) == first
+        os.rename(os.path.join(t, "a", "2.txt"), os.path.join(t, "a", "3.txt"))
+        assert Fingerprinter().directory_fingerprint(os.path.join(t, "a")) != first
+
+
+def test_fingerprints_persisted():
+    with io.temp_directory() as t:
+        path = os.path.join(t, "1.txt")
+        io.write_file(path, "1")
+        cache_path = os.path.join(t, "cache", "fingerprints.json")
+        fingerprinter = Fingerprinter(cache_path=cache_path)
+        fingerprint = fingerprinter.path_fingerprint(path)
+        fingerprinter.save()
+        # Same mtime and size, so the recorded hash is reused.
+        reloaded = Fingerprinter(cache_path=cache_path)
+        assert reloaded._hashes[os.path.realpath(path)][2] == fingerprint
+        assert reloaded.path_fingerprint(path) == fingerprint
@@ -0,0 +1,29 @@
+"""Test utilities from :module:`planemo.galaxy.installs`."""
+
+from planemo.galaxy.installs import RepositoryInstallTracker
+
+
+def test_install_tracker():
+    tracker = RepositoryInstallTracker()
+    requested = []
+    tracker.submit("iuc", "cat", lambda: requested.append("cat"))
+    assert requested == ["cat"]
+
+    repositories = [
+        {"owner": "iuc", "name": "cat", "status": "Installed"},
+        {"owner": "iuc", "name": "package_dep", "status": "Installing"},
+    ]
+    assert tracker.update(repositories) is None
+    repositories[1]["status"] = "Installed"
+    assert tracker.update(repositories) is True
+    assert [(o, n) for (o, n, _) in tracker.durations()] == [("iuc", "cat"), ("iuc", "package_dep")]
+
+
+def test_install_tracker_error():
+    tracker = RepositoryInstallTracker()
+    exception = None
+    try:
+        tracker.update([{"owner": "iuc", "name": "cat", "status": "Error"}])
+    except Exception as e:
+        exception = e
+    assert exception is not None
@@ -0,0 +1,73 @@
+"""Unit tests for reading segments of Galaxy logs."""
+import io
+import os
+
+from planemo.galaxy.logs import (
+    filter_job_lines,
+    GalaxyLogTail,
+)
+from planemo.io import temp_directory
+
+LOG = u"""galaxy.jobs.handler DEBUG 2018-01-01 (12) Dispatching to local runner
+galaxy.jobs.runners DEBUG 2018-01-01 (123/4567) Job command line
+galaxy.jobs.runners ERROR 2018-01-01 (12/345) Job failed
+Traceback (most recent call last):
+  File "galaxy/jobs/runners/__init__.py", line 1
+galaxy.web.framework INFO 2018-01-01 GET /api/jobs/f2db41e1fa331b3e
+galaxy.jobs.handler DEBUG 2018-01-01 (123) Job finished
+"""
+
+
+def test_read_since_offset():
+    with temp_directory() as dir:
+        path = os.path.join(dir, "galaxy.log")
+        tail = GalaxyLogTail(path)
+        assert tail.offset() == 0
+        assert tail.read_since(0) == ""
+        _append(path, u"before\n")
+        offset = tail.offset()
+        _append(path, u"during \u00e9\n")
+        assert tail.read_since(offset) == u"during \u00e9\n"
+        assert tail.read_since(None) == u"before\nduring \u00e9\n"
+
+
+def test_read_since_truncated():
+    with temp_directory() as dir:
+        path = os.path.join(dir, "galaxy.log")
+        _append(path, u"a long line of a previous log\n")
+        tail = GalaxyLogTail(path)
+        offset = tail.offset()
+        with io.open(path, "w") as f:
+            f.write(u"new\n")
+        assert tail.read_since(offset) == u"new\n"
+
+
+def test_read_since_filtered():
+    with temp_directory() as dir:
+        path = os.path.join(dir, "galaxy.log")
+        _append(path, LOG)
+        lines = GalaxyLogTail(path).read_since(0, job_ids=["12"]).splitlines()
+        assert len(lines) == 4
+
+
+def test_filter_job_lines_decoded_id():
+    filtered = filter_job_lines(LOG, [12])
+    assert "(12) Dispatching" in filtered
+    assert "(12/345) Job failed" in filtered
+    assert "Traceback" in filtered
+    assert "line 1" in filtered
+    assert "(123" not in filtered
+
+
+def test_filter_job_lines_encoded_id():
+    filtered = filter_job_lines(LOG, ["f2db41e1fa331b3e", "123"])
+    assert filtered.splitlines() == [
+        "galaxy.jobs.runners DEBUG 2018-01-01 (123/4567) Job command line",
+        "galaxy.web.framework INFO 2018-01-01 GET /api/jobs/f2db41e1fa331b3e",
+        "galaxy.jobs.handler DEBUG 2018-01-01 (123) Job finished",
+    ]
+
+
+def _append(path, text):
+    with io.open(path, "a", encoding="utf-8") as f:
+        f.write(text)
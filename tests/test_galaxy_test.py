@@ -160,6 +160,20 @@ def test_passed():
     assert not passed(bad_testcase_el)
 
 
+def test_iterparse_xunit_report():
+    """Test :func:`iterparse_xunit_report` streams the cases :func:`find_cases` finds."""
+    root = structures.parse_xunit_report(xunit_report_with_failure).getroot()
+    expected_ids = [structures.case_id(el).id for el in structures.find_cases(root)]
+    pairs = list(structures.iterparse_xunit_report(xunit_report_with_failure))
+    assert pairs[0] == (dict(root.attrib), None)
+    ids = []
+    for suite_attrib, testcase_el in structures.iterparse_xunit_report(xunit_report_with_failure):
+        if testcase_el is not None:
+            assert suite_attrib["tests"] == root.attrib["tests"]
+            ids.append(structures.case_id(testcase_el).id)
+    assert ids == expected_ids
+
+
 class _MockConfig(object):
 
     def __init__(self, temp_directory):
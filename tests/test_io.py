@@ -1,5 +1,8 @@
 """Test utilities from :module:`planemo.io`."""
+import json
+import os
 import tempfile
+import time
 
 from planemo import io
 from .test_utils import assert_equal
@@ -42,3 +45,68 @@ def test_filter_paths():
         tmp.write("#exclude c\n\nc\n")
         tmp.flush()
         assert_filtered_is(["/a/b/c", "/a/b/d"], ["/a/b/d"], exclude_from=[tmp.name])
+
+
+def test_map_concurrently():
+    """Test :func:`planemo.io.map_concurrently` preserves order."""
+    items = list(range(10))
+    assert_equal(io.map_concurrently(lambda i: i * 2, items, jobs=4), [i * 2 for i in items])
+    assert_equal(io.map_concurrently(lambda i: i * 2, items), [i * 2 for i in items])
+
+
+def test_write_json_file():
+    """Test :func:`planemo.io.write_json_file` writes through a temporary file."""
+    with io.temp_directory() as directory:
+        path = os.path.join(directory, "cache", "data.json")
+        io.write_json_file(path, {"a": [1, 2]})
+        io.write_json_file(path, {"b": 3}, indent=2)
+        with open(path, "r") as f:
+            assert_equal(json.load(f), {"b": 3})
+        assert_equal(os.listdir(os.path.dirname(path)), ["data.json"])
+
+        # A failed write leaves the previous contents and no temporary file.
+        try:
+            io.write_json_file(path, {"c": object()})
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("Expected unserializable data to fail.")
+        with open(path, "r") as f:
+            assert_equal(json.load(f), {"b": 3})
+        assert_equal(os.listdir(os.path.dirname(path)), ["data.json"])
+
+
+def test_atomic_write_concurrently():
+    """Test :func:`planemo.io.atomic_write` from several threads of one process."""
+    with io.temp_directory() as directory:
+        path = os.path.join(directory, "report.html")
+        contents = [(u"\u2713 report %d\n" % i) * 1000 for i in range(8)]
+
+        def write(content):
+            with io.atomic_write(path, encoding="utf-8") as f:
+                for line in content.splitlines(True):
+                    f.write(line)
+                    time.sleep(0)
+
+        io.map_concurrently(write, contents, jobs=4)
+        with open(path, "rb") as f:
+            assert f.read().decode("utf-8") in contents
+        assert_equal(os.listdir(directory), ["report.html"])
+
+
+def test_buffered_output():
+    """Test :func:`planemo.io.buffered_output` keeps each thread's output together."""
+    def report(i):
+        with io.buffered_output():
+            io.info("start %d" % i)
+            time.sleep(0.01)
+            io.info("end %d" % i)
+        return i
+
+    with io.conditionally_captured_io(True, tee=False) as capture:
+        with io.thread_routed_io():
+            io.map_concurrently(report, range(4), jobs=4)
+    messages = [m["data"] for m in capture]
+    assert_equal(len(messages), 8)
+    for start, end in zip(messages[::2], messages[1::2]):
+        assert_equal(start.replace("start", "end"), end)
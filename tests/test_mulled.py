@@ -0,0 +1,103 @@
+"""Test mulled container utilities in ``planemo.mulled``."""
+import json
+import os
+
+from galaxy.tools.deps.mulled.util import build_target
+
+from planemo import (
+    io,
+    mulled,
+)
+from planemo.mulled import (
+    build_involucro_context,
+    mulled_image_name,
+    MulledTagIndex,
+    unique_mulled_target_lists,
+)
+from .test_utils import (
+    assert_equal,
+    test_context as _test_context,
+)
+
+LISTING = """# exported tag listing
+quay.io/biocontainers/seqtk:1.2--0
+seqtk:1.0--0
+seqtk:latest
+"""
+
+
+def test_tag_index_offline_listing():
+    with io.temp_directory() as t:
+        listing_path = os.path.join(t, "tags.txt")
+        io.write_file(listing_path, LISTING)
+        index = MulledTagIndex(listing_path=listing_path)
+        assert_equal(index.tags_for("seqtk"), ["1.2--0", "1.0--0"])
+        assert_equal(index.tags_for("bwa"), [])
+        assert_equal(
+            index.container_name([build_target("seqtk", "1.0")]),
+            "quay.io/biocontainers/seqtk:1.0--0",
+        )
+        assert_equal(
+            index.container_name([build_target("seqtk")]),
+            "quay.io/biocontainers/seqtk:1.2--0",
+        )
+        assert index.container_name([build_target("seqtk", "1.3")]) is None
+
+
+def test_tag_index_disk_cache():
+    with io.temp_directory() as t:
+        cache_directory = os.path.join(t, "cache")
+        os.makedirs(os.path.join(cache_directory, "biocontainers"))
+        with open(os.path.join(cache_directory, "biocontainers", "seqtk.json"), "w") as f:
+            json.dump(["1.2--0"], f)
+        index = MulledTagIndex(cache_directory=cache_directory)
+        assert_equal(index.tags_for("seqtk"), ["1.2--0"])
+
+
+def test_tag_index_empty_tags_not_cached():
+    published = {}
+
+    def quay_versions(namespace, image):
+        return published.get(image, [])
+
+    original_quay_versions = mulled.quay_versions
+    mulled.quay_versions = quay_versions
+    try:
+        with io.temp_directory() as t:
+            cache_directory = os.path.join(t, "cache")
+            assert_equal(MulledTagIndex(cache_directory=cache_directory).tags_for("seqtk"), [])
+            assert not os.path.exists(os.path.join(cache_directory, "biocontainers", "seqtk.json"))
+
+            # Once published the tags are found by the next index.
+            published["seqtk"] = ["1.2--0"]
+            assert_equal(MulledTagIndex(cache_directory=cache_directory).tags_for("seqtk"), ["1.2--0"])
+            published["seqtk"] = []
+            assert_equal(MulledTagIndex(cache_directory=cache_directory).tags_for("seqtk"), ["1.2--0"])
+    finally:
+        mulled.quay_versions = original_quay_versions
+
+
+def test_unique_mulled_target_lists():
+    samtools = build_target("samtools", "1.3.1")
+    bwa = build_target("bwa", "0.7.15")
+    target_lists = [[samtools, bwa], [], [bwa, samtools], [bwa]]
+    unique = unique_mulled_target_lists(target_lists)
+    assert_equal(unique, [[samtools, bwa], [bwa]])
+    assert mulled_image_name([bwa, samtools]).startswith("mulled-v2-")
+    assert mulled_image_name([bwa, samtools]).endswith("-0")
+
+
+def test_involucro_path_resolved():
+    with io.temp_directory() as directory:
+        os.makedirs(os.path.join(directory, "bin"))
+        open(os.path.join(directory, "bin", "involucro"), "w").close()
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            involucro_context = build_involucro_context(
+                _test_context(), involucro_path=os.path.join("bin", "involucro")
+            )
+        finally:
+            os.chdir(cwd)
+        # Builds run involucro from their own working directories.
+        assert_equal(involucro_context.involucro_bin, os.path.join(os.path.realpath(directory), "bin", "involucro"))
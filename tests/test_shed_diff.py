@@ -1,13 +1,22 @@
 """ Integration tests for shed_diff command.
 """
 
+import json
 import os
+import subprocess
 import sys
 import tempfile
 from os.path import join
 from xml.etree import ElementTree
 
+from six import StringIO
+
 from planemo import io
+from planemo.shed.diff import (
+    compare_manifests,
+    RepositoryManifest,
+    write_manifest_diff,
+)
 from planemo.xml.diff import diff
 from .test_shed_upload import update_package_1
 from .test_utils import (
@@ -36,6 +45,39 @@ class ShedDiffTestCase(CliShedTestCase):
             self._check_diff(f, True)
             self._check_diff(f, False)
 
+    def test_shed_diff_caches_tip(self):
+        with self._isolate_repo("single_tool") as f:
+            upload_command = ["shed_upload", "--force_repository_creation"]
+            upload_command.extend(self._shed_args())
+            self._check_exit_code(upload_command)
+            diff_command = ["--verbose", "shed_diff"] + self._shed_args(read_only=True)
+            r = self._check_exit_code(diff_command)
+            assert "Using cached tarball" not in r.output
+            r = self._check_exit_code(diff_command)
+            assert "Using cached tarball" in r.output
+
+            # A new upload moves the tip so the cached archive is not used.
+            io.write_file(join(f, "related_file"), "A related non-tool file (modified).\n")
+            self._check_exit_code(["shed_update"] + self._shed_args())
+            r = self._check_exit_code(diff_command)
+            assert "Using cached tarball" not in r.output
+
+    def test_shed_diff_json(self):
+        with self._isolate_repo("single_tool") as f:
+            upload_command = ["shed_upload", "--force_repository_creation"]
+            upload_command.extend(self._shed_args())
+            self._check_exit_code(upload_command)
+            io.write_file(join(f, "related_file"), "A related non-tool file (modified).\n")
+            io.write_file(join(f, "new_file"), "New.\n")
+            diff_command = ["shed_diff", "-o", "diff.json", "--diff_format", "json"]
+            diff_command.extend(self._shed_args(read_only=True))
+            self._check_exit_code(diff_command, exit_code=1)
+            with open(join(f, "diff.json"), "r") as diff_f:
+                result = json.load(diff_f)
+            assert result["different"]
+            statuses = dict((c["path"], c["status"]) for c in result["files"])
+            assert statuses == {"related_file": "modified", "new_file": "only_in_a"}, statuses
+
     def test_diff_doesnt_exist(self):
         with self._isolate_repo("multi_repos_nested"):
             diff_command = ["shed_diff"]
@@ -156,3 +198,36 @@ class ShedDiffTestCase(CliShedTestCase):
                 y.text = ""
 
         return node
+
+
+def test_manifest_diff_matches_diff_r():
+    with io.temp_directory() as f:
+        for path, contents in [
+            ("_a_/same", "same\n"),
+            ("_b_/same", "same\n"),
+            ("_a_/changed", "1\n2\n3\n4\n"),
+            ("_b_/changed", "1\ntwo\n3\n4\n5\n"),
+            ("_a_/sub/only_a", "a\n"),
+            ("_b_/sub/only_b", "b\n"),
+            ("_a_/dir_a/file", "a\n"),
+        ]:
+            path = join(f, path)
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            io.write_file(path, contents)
+        manifest_a = _directory_manifest(f, "_a_")
+        manifest_b = _directory_manifest(f, "_b_")
+        out = StringIO()
+        write_manifest_diff(compare_manifests(manifest_a, manifest_b), manifest_a, manifest_b, out)
+        expected = subprocess.Popen(
+            ["diff", "-r", "_a_", "_b_"], cwd=f, stdout=subprocess.PIPE
+        ).communicate()[0].decode("utf-8")
+        assert out.getvalue() == expected, out.getvalue()
+
+
+def _directory_manifest(parent, label):
+    directory = join(parent, label)
+    files = []
+    for dirpath, _, filenames in os.walk(directory):
+        files.extend(os.path.relpath(join(dirpath, name), directory) for name in filenames)
+    return RepositoryManifest.from_directory(label, directory, files)
@@ -1,8 +1,30 @@
 """Test some lower-level utilities in planemo.shed."""
 
+import io
 import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+
+import requests
+import six
+from bioblend import ConnectionError
+from six.moves import BaseHTTPServer
 
 from planemo import shed
+from planemo.bioblend import toolshed
+from planemo.io import temp_directory
+from planemo.shed.cache import TarballCache
+from planemo.shed.interface import (
+    download_tar_file,
+    is_transient_api_exception,
+    RepositoryIndex,
+)
+from planemo.shed.ledger import UploadLedger
+from planemo.shed.planner import RepositoryPlanner
+from planemo.shed.tarball import RepositoryTarball
 from .test_utils import (
     mock_shed_context,
     TEST_REPOS_DIR,
@@ -50,6 +72,156 @@ def test_find_repository_id_missing_exception():
         assert exception is not None
 
 
+def test_repository_index_cache():
+    with mock_shed_context() as shed_context, temp_directory() as cache_directory:
+        tsi = shed_context.tsi
+        index = RepositoryIndex(cache_directory=cache_directory, ttl=60)
+        assert index.find(tsi, "iuc", "test_repo_1")["id"] == "r1"
+        assert index.find(tsi, "iuc", "test_repo_absent") is None
+        assert index.find(tsi, "devteam", "test_repo_1") is None
+
+        # A new index (i.e. a later planemo invocation) reads the listing
+        # from disk.
+        cached_index = RepositoryIndex(cache_directory=cache_directory, ttl=60)
+        cached_index._fetch = None
+        assert cached_index.find(tsi, "iuc", "test_repo_1")["id"] == "r1"
+
+        index.invalidate(tsi)
+        expired_index = RepositoryIndex(cache_directory=cache_directory, ttl=60)
+        assert expired_index._read_cache((tsi.base_url.rstrip("/"), "iuc")) is None
+
+
+def test_repository_index_invalidate_owner():
+    with mock_shed_context() as shed_context, temp_directory() as cache_directory:
+        tsi = shed_context.tsi
+        shed_key = tsi.base_url.rstrip("/")
+        index = RepositoryIndex(cache_directory=cache_directory, ttl=60)
+        assert index.find(tsi, "iuc", "test_repo_1")["id"] == "r1"
+        assert index.find(tsi, "devteam", "test_repo_1") is None
+
+        # Only the listing of the given owner is refetched.
+        index.invalidate(tsi, "iuc")
+        assert index._read_cache((shed_key, "iuc")) is None
+        assert index._read_cache((shed_key, "devteam")) == []
+        assert (shed_key, "devteam") in index._repositories
+        assert index.find(tsi, "iuc", "test_repo_1")["id"] == "r1"
+
+
+def test_download_tar_file_gzip_content_encoding():
+    # Some servers (e.g. werkzeug's send_file) label .tar.gz downloads with
+    # a gzip Content-Encoding, the archive must still be saved compressed.
+    tar_bytes = io.BytesIO()
+    with tarfile.open(fileobj=tar_bytes, mode="w:gz") as tar:
+        contents = b"Hello World!"
+        info = tarfile.TarInfo("repo/README")
+        info.size = len(contents)
+        tar.addfile(info, io.BytesIO(contents))
+    body = tar_bytes.getvalue()
+
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+        def do_GET(self):  # noqa
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-tar")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        tsi = toolshed.ToolShedInstance(url="http://127.0.0.1:%d/" % server.server_port)
+        fileobj = download_tar_file(tsi, "r1", io.BytesIO())
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert fileobj.read() == body
+    fileobj.seek(0)
+    with tarfile.open(fileobj=fileobj, mode="r:gz") as tar:
+        assert tar.getnames() == ["repo/README"]
+
+
+LEDGER_SCRIPT = """
+import sys
+from planemo.shed.ledger import UploadLedger
+ledger = UploadLedger(sys.argv[1])
+for i in range(20):
+    ledger.record("http://localhost:9009", sys.argv[2], "repo%d" % i, "digest", "tip")
+"""
+
+
+def test_upload_ledger_concurrent_processes():
+    with temp_directory() as directory:
+        path = os.path.join(directory, "ledger", "ledger.json")
+        owners = ["owner%d" % i for i in range(4)]
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-c", LEDGER_SCRIPT, path, owner],
+                cwd=os.path.join(os.path.dirname(__file__), os.path.pardir),
+            )
+            for owner in owners
+        ]
+        assert [p.wait() for p in processes] == [0] * len(owners)
+        # No process lost another's entries.
+        ledger = UploadLedger(path)
+        for owner in owners:
+            for i in range(20):
+                assert ledger.entry("http://localhost:9009", owner, "repo%d" % i) is not None
+
+
+def test_is_transient_api_exception():
+    assert is_transient_api_exception(requests.exceptions.ConnectionError())
+    assert is_transient_api_exception(requests.exceptions.Timeout())
+    assert is_transient_api_exception(ConnectionError("Unexpected response", status_code=502))
+    assert not is_transient_api_exception(ConnectionError("Unexpected response", status_code=400))
+    assert not is_transient_api_exception(Exception("Repository description is required"))
+
+
+def test_planner_retries_only_transient_errors():
+    with mock_shed_context() as shed_context:
+        planner = RepositoryPlanner(None, shed_context, retries=1)
+        calls = []
+
+        def fail(exception):
+            def f():
+                calls.append(exception)
+                raise exception
+            return f
+
+        assert planner._with_retries("create", fail(ConnectionError("Conflict", status_code=409))) is None
+        assert len(calls) == 1
+        assert planner._with_retries("create", fail(ConnectionError("Bad gateway", status_code=502))) is None
+        assert len(calls) == 3
+
+
+def test_tarball_cache():
+    with temp_directory() as cache_directory:
+        cache = TarballCache(cache_directory, max_size=10)
+        shed_url = "http://localhost:9009/"
+        assert cache.open(shed_url, "r1", "abc") is None
+
+        def writer(contents):
+            return lambda f: f.write(contents)
+
+        with cache.store(shed_url, "r1", "abc", writer(b"123456")) as f:
+            assert f.read() == b"123456"
+        with cache.open(shed_url, "r1", "abc") as f:
+            assert f.read() == b"123456"
+
+        # Storing a second archive exceeds max_size so the least recently
+        # used one is evicted.
+        cache.store(shed_url, "r1", "def", writer(b"789012")).close()
+        assert cache.open(shed_url, "r1", "abc") is None
+        with cache.open(shed_url, "r1", "def") as f:
+            assert f.read() == b"789012"
+
+
 def test_find_category_ids():
     with mock_shed_context() as shed_context:
         category_ids = shed.find_category_ids(
@@ -78,3 +250,34 @@ def test_create_simple():
             owner="iuc"
         )
         assert repo_id == create_response["id"]
+
+
+def test_tarball_reproducible():
+    with temp_directory() as f:
+        repo = os.path.join(f, "single_tool")
+        shutil.copytree(os.path.join(TEST_REPOS_DIR, "single_tool"), repo)
+        first = RepositoryTarball(repo)
+        first.write_to_path(os.path.join(f, "first.tar.gz"))
+        os.utime(os.path.join(repo, "cat.xml"), (0, 1234567))
+
+        second = RepositoryTarball(repo)
+        with second.spooled() as tarball_file:
+            tar = tarfile.open(fileobj=tarball_file, mode="r:gz")
+            members = tar.getmembers()
+        assert first.digest == second.digest
+        assert first.size == second.size == os.path.getsize(os.path.join(f, "first.tar.gz"))
+        assert [m.name for m in members] == sorted(m.name for m in members)
+        assert "cat.xml" in [m.name for m in members]
+        assert all(m.mtime == 0 and m.uid == 0 for m in members)
+
+
+def test_virtual_realization():
+    for name in ["multi_repos_nested", "suite_auto"]:
+        path = os.path.join(TEST_REPOS_DIR, name)
+        for realized_repository in shed._realize_effective_repositories(None, path, owner="iuc"):
+            assert realized_repository.manifest
+            from_manifest = realized_repository.tarball().write_to(six.BytesIO())
+            # Accessing path materialises the realized directory.
+            from_directory = RepositoryTarball(realized_repository.path).write_to(six.BytesIO())
+            assert from_manifest.files() == from_directory.files()
+            assert from_manifest.digest == from_directory.digest
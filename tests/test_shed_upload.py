@@ -74,6 +74,67 @@ class ShedUploadTestCase(CliShedTestCase):
 
             self._assert_shed_diff(diff=0)
 
+    def test_update_with_check_diff_ledger(self):
+        with self._isolate_repo("single_tool") as f:
+            upload_command = [
+                "--verbose", "shed_update", "--force_repository_creation", "--check_diff"
+            ]
+            upload_command.extend(self._shed_args())
+            self._check_exit_code(upload_command)
+
+            # Contents and remote revision match the ledger, nothing downloaded.
+            r = self._check_exit_code(upload_command)
+            assert "match the last upload recorded in the ledger" in r.output
+            assert "not different, skipping upload." in r.output
+
+            with open(join(f, "related_file"), "w") as rf:
+                rf.write("new_contents")
+            r = self._check_exit_code(upload_command)
+            assert "match the last upload recorded in the ledger" not in r.output
+            assert "not different, skipping upload." not in r.output
+
+    def test_update_with_check_diff_ledger_without_owner(self):
+        with self._isolate_repo("single_tool") as f:
+            # Owner is resolved from the authenticated user.
+            shed_yml = join(f, ".shed.yml")
+            with open(shed_yml, "r") as sf:
+                lines = [line for line in sf if not line.startswith("owner:")]
+            with open(shed_yml, "w") as sf:
+                sf.writelines(lines)
+            upload_command = [
+                "--verbose", "shed_update", "--force_repository_creation", "--check_diff"
+            ]
+            upload_command.extend(self._shed_args())
+            self._check_exit_code(upload_command)
+            r = self._check_exit_code(upload_command)
+            assert "match the last upload recorded in the ledger" in r.output
+
+    def test_update_plan_updates_metadata_by_default(self):
+        with self._isolate_repo("multi_repos_nested"):
+            upload_command = ["shed_update", "-r", "--force_repository_creation"]
+            upload_command.extend(self._shed_args())
+            r = self._check_exit_code(upload_command)
+            assert "2 to create, 0 metadata updates, 2 content uploads" in r.output
+
+            # Metadata the listing does not expose may have been edited on
+            # the shed, so it is sent again.
+            r = self._check_exit_code(upload_command)
+            assert "0 to create, 2 metadata updates, 2 content uploads" in r.output
+
+    def test_update_plan_skips_unchanged_metadata(self):
+        with self._isolate_repo("multi_repos_nested"):
+            upload_command = [
+                "shed_update", "-r", "--force_repository_creation", "--skip_unchanged_metadata"
+            ]
+            upload_command.extend(self._shed_args())
+            r = self._check_exit_code(upload_command)
+            assert "2 to create, 0 metadata updates, 2 content uploads" in r.output
+
+            # Metadata was set on creation and has not changed since.
+            r = self._check_exit_code(upload_command)
+            assert "0 to create, 0 metadata updates, 2 content uploads" in r.output
+            assert "Repository metadata already up to date" in r.output
+
     def test_update_with_check_diff_package(self):
         with self._isolate_repo("package_1") as f:
             self._shed_create()
@@ -208,6 +269,17 @@ class ShedUploadTestCase(CliShedTestCase):
             self._verify_upload(f, ["cat1.xml", "macros.xml"], ["cat1"])
             self._verify_upload(f, ["cat2.xml", "macros.xml"], ["cat2"])
 
+    def test_upload_recursive_concurrent(self):
+        with self._isolate_repo("multi_repos_nested") as f:
+            upload_command = [
+                "shed_update", "-r", "--force_repository_creation",
+                "--jobs", "2",
+            ]
+            upload_command.extend(self._shed_args())
+            self._check_exit_code(upload_command)
+            self._verify_upload(f, ["cat1.xml", "macros.xml"], ["cat1"])
+            self._verify_upload(f, ["cat2.xml", "macros.xml"], ["cat2"])
+
     def test_upload_filters_invalid_suite(self):
         with self._isolate_repo("suite_1") as f:
             # No .shed.yml, make sure to test it can infer type
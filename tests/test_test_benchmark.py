@@ -0,0 +1,60 @@
+"""Unit tests for benchmark statistics and baseline comparison."""
+from planemo.test.benchmark import (
+    benchmark_data,
+    compare_to_baseline,
+    parse_regression_thresholds,
+    percentile,
+    run_data,
+)
+
+
+def _runs(*wall_seconds):
+    return [
+        run_data({"data": {"status": "success", "job_metrics": {"runtime_seconds": s / 2.0}}}, s)
+        for s in wall_seconds
+    ]
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 90) == 3.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 90) == 4.6
+    assert percentile([1.0, 2.0], 100) == 2.0
+
+
+def test_benchmark_data():
+    benchmark = benchmark_data([("cat_0", _runs(3.0, 1.0, 2.0))], 3)
+    test = benchmark["tests"][0]
+    assert test["num_failures"] == 0
+    assert test["statistics"]["wall_seconds"]["median"] == 2.0
+    assert test["statistics"]["wall_seconds"]["min"] == 1.0
+    assert test["statistics"]["runtime_seconds"]["max"] == 1.5
+    assert "cpu_seconds" not in test["statistics"]
+
+    failed = run_data({"data": {"status": "failure"}}, 1.0)
+    assert benchmark_data([("cat_0", [failed])], 1)["tests"][0]["num_failures"] == 1
+
+
+def test_compare_to_baseline():
+    baseline = benchmark_data([("cat_0", _runs(2.0)), ("cat_1", _runs(2.0))], 1)
+    current = benchmark_data([("cat_0", _runs(2.4)), ("cat_1", _runs(3.0)), ("new_0", _runs(9.0))], 1)
+    regressions = compare_to_baseline(current, baseline)
+    assert [(r.test_id, r.metric) for r in regressions] == [("cat_1", "wall_seconds")]
+    assert regressions[0].change == 0.5
+
+    thresholds = {"wall_seconds": 0.1, "runtime_seconds": 0.6}
+    regressions = compare_to_baseline(current, baseline, thresholds)
+    assert [(r.test_id, r.metric) for r in regressions] == [("cat_0", "wall_seconds"), ("cat_1", "wall_seconds")]
+
+
+def test_parse_regression_thresholds():
+    assert parse_regression_thresholds(["wall_seconds=0.5", "cpu_seconds=1"]) == {
+        "wall_seconds": 0.5, "cpu_seconds": 1.0,
+    }
+    for invalid in ["wall_seconds", "moo=0.1"]:
+        try:
+            parse_regression_thresholds([invalid])
+        except ValueError:
+            continue
+        raise AssertionError("Expected ValueError for [%s]" % invalid)
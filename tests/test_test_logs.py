@@ -0,0 +1,57 @@
+"""Test :mod:`planemo.test.logs`."""
+import json
+import os
+
+from planemo.io import temp_directory
+from planemo.test.logs import (
+    log_store,
+    read_log_reference,
+)
+from planemo.test.results import merge_structured_data
+
+
+def test_externalize_large_logs():
+    with temp_directory() as t:
+        store = log_store(os.path.join(t, "tool_test_output.json"), inline_limit=100)
+        stdout = u"start\n" + u"x\u00e9" * 500 + u"\nend"
+        test = {"id": "t1", "data": {
+            "status": "failure",
+            "problem_log": "short",
+            "job": {"stdout": stdout, "stderr": "", "command_line": "cat"},
+        }}
+        store.externalize_test(test)
+        data = test["data"]
+        assert data["problem_log"] == "short"
+        assert data["job"]["command_line"] == "cat"
+        inline = data["job"]["stdout"]
+        assert inline.startswith("start") and inline.endswith("end")
+        assert len(inline) < 200
+        reference = data["log_references"]["job.stdout"]
+        assert reference["path"] == "tool_test_output_logs.txt"
+        assert read_log_reference(reference, t) == stdout
+
+        # A second log is appended after the first.
+        second = {"id": "t2", "data": {"status": "error", "problem_log": u"y" * 1000}}
+        store.externalize_test(second)
+        reference = second["data"]["log_references"]["problem_log"]
+        assert reference["offset"] == len(stdout.encode("utf-8"))
+        assert read_log_reference(reference, t) == u"y" * 1000
+
+
+def test_logs_kept_inline_without_limit():
+    assert log_store("tool_test_output.json", inline_limit=0) is None
+    assert log_store(None) is None
+
+
+def test_merge_rebases_log_references():
+    with temp_directory() as t:
+        os.makedirs(os.path.join(t, "chunk1"))
+        json_path = os.path.join(t, "chunk1", "tool_test_output.json")
+        store = log_store(json_path, inline_limit=10)
+        test = store.externalize_test({"id": "t1", "data": {"status": "success", "problem_log": "z" * 100}})
+        with open(json_path, "w") as f:
+            json.dump({"tests": [test]}, f)
+        merged = merge_structured_data([json_path])
+        reference = merged.structured_data["tests"][0]["data"]["log_references"]["problem_log"]
+        assert reference["path"] == os.path.join(t, "chunk1", "tool_test_output_logs.txt")
+        assert read_log_reference(reference, os.getcwd()) == "z" * 100
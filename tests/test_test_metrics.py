@@ -0,0 +1,60 @@
+"""Unit tests for summarizing Galaxy job metrics of tests."""
+from planemo.test.metrics import (
+    add_tests_job_metrics,
+    format_metric,
+    galaxy_job_metrics,
+    slowest_tests,
+)
+
+
+def _job(runtime, create_time="2018-01-01T12:00:00.500000"):
+    return {
+        "create_time": create_time,
+        "job_metrics": [
+            {"plugin": "core", "name": "runtime_seconds", "raw_value": "%d.0000000" % runtime},
+            {"plugin": "core", "name": "galaxy_slots", "raw_value": "2"},
+            {"plugin": "core", "name": "start_epoch", "raw_value": "1514808002.0000000"},
+            {"plugin": "cgroup", "name": "cpuacct.usage", "raw_value": "1500000000"},
+            {"plugin": "cgroup", "name": "memory.max_usage_in_bytes", "raw_value": "1048576"},
+            {"plugin": "cgroup", "name": "memory.limit_in_bytes", "raw_value": "9223372036854771712"},
+        ],
+    }
+
+
+def test_galaxy_job_metrics():
+    metrics = galaxy_job_metrics(_job(12))
+    assert metrics == {
+        "runtime_seconds": 12.0,
+        "cores": 2,
+        "cpu_seconds": 1.5,
+        "memory_peak_bytes": 1048576,
+        "queue_seconds": 1.5,
+    }
+
+
+def test_galaxy_job_metrics_missing():
+    assert galaxy_job_metrics(None) is None
+    assert galaxy_job_metrics({"job_metrics": []}) is None
+    metrics = galaxy_job_metrics(_job(3, create_time=None))
+    assert "queue_seconds" not in metrics
+
+
+def test_slowest_tests():
+    structured_data = {"tests": [
+        {"id": "fast", "data": {"status": "success", "job": _job(1)}},
+        {"id": "slow", "data": {"status": "failure", "job": _job(30)}},
+        {"id": "no_job", "data": {"status": "error"}},
+        {"id": "no_data", "data": None},
+        {"id": "medium", "data": {"status": "success", "job": _job(10)}},
+    ]}
+    add_tests_job_metrics(structured_data)
+    assert [t["id"] for t in slowest_tests(structured_data, 2)] == ["slow", "medium"]
+    assert len(slowest_tests(structured_data)) == 3
+    assert slowest_tests(structured_data, 0) == []
+
+
+def test_format_metric():
+    assert format_metric("runtime_seconds", 12) == "12.0 s"
+    assert format_metric("memory_peak_bytes", 3 * 1024 * 1024) == "3.0 MB"
+    assert format_metric("cores", 4) == "4"
+    assert format_metric("cpu_seconds", None) == ""
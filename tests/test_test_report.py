@@ -1,4 +1,6 @@
+import json
 import os
+from xml.etree import ElementTree
 
 from .test_utils import CliTestCase, TEST_DATA_DIR
 
@@ -9,3 +11,87 @@ class TestReportsTestCase(CliTestCase):
         with self._isolate():
             json_path = os.path.join(TEST_DATA_DIR, "issue381.json")
             self._check_exit_code(["test_reports", json_path], exit_code=0)
+
+    def test_build_sharded_html_report(self):
+        with self._isolate() as f:
+            json_path = os.path.join(TEST_DATA_DIR, "issue381.json")
+            self._check_exit_code([
+                "test_reports", json_path,
+                "--test_output", "report.html",
+                "--test_output_html_mode", "sharded",
+            ], exit_code=0)
+            with open(json_path, "r") as fh:
+                tests = json.load(fh)["tests"]
+            shards = sorted(os.listdir(os.path.join(f, "report_files")))
+            assert shards[0] == "details_0000.js"
+            with open(os.path.join(f, "report_files", shards[0]), "r") as fh:
+                shard = fh.read()
+            assert shard.startswith("planemoReportShard(0, ")
+            assert json.loads(shard[len("planemoReportShard(0, "):-len(");\n")])[0] == tests[0]
+            with open(os.path.join(f, "report.html"), "r") as fh:
+                report = fh.read()
+            assert "report_files/details_0000.js" in report
+            assert '"shard": [0, 0]' in report
+
+    def test_merge_reports(self):
+        with self._isolate() as f:
+            json_path = os.path.join(TEST_DATA_DIR, "issue381.json")
+            with open(json_path, "r") as fh:
+                data = json.load(fh)
+            # A second chunk re-running the first two tests, both now failing.
+            rerun = {"tests": data["tests"][:2]}
+            rerun["tests"][0]["data"]["status"] = "failure"
+            with open(os.path.join(f, "rerun.json"), "w") as fh:
+                json.dump(rerun, fh)
+
+            self._check_exit_code([
+                "merge_test_reports", json_path, "rerun.json", "merged.json",
+                "--test_output_xunit", "merged.xml",
+                "--test_output_markdown", "merged.md",
+            ], exit_code=1)
+            with open(os.path.join(f, "merged.json"), "r") as fh:
+                merged = json.load(fh)
+            assert [t["id"] for t in merged["tests"]] == [t["id"] for t in data["tests"]]
+            assert merged["summary"] == {"num_tests": 4, "num_failures": 3, "num_errors": 1, "num_skips": 0}
+            root = ElementTree.parse(os.path.join(f, "merged.xml")).getroot()
+            assert root.attrib["failures"] == "3"
+            assert len(root.findall("testcase/failure")) == 3
+            assert len(root.findall("testcase/error")) == 1
+
+    def test_merge_reports_first_failure(self):
+        with self._isolate() as f:
+            json_path = os.path.join(TEST_DATA_DIR, "issue381.json")
+            with open(json_path, "r") as fh:
+                data = json.load(fh)
+            # Passing re-run of a failed test.
+            rerun = {"tests": data["tests"][1:2]}
+            rerun["tests"][0]["data"]["status"] = "success"
+            with open(os.path.join(f, "rerun.json"), "w") as fh:
+                json.dump(rerun, fh)
+            for policy, num_failures in [("last", 1), ("first_failure", 2)]:
+                self._check_exit_code([
+                    "merge_test_reports", "--merge_policy", policy,
+                    json_path, "rerun.json", "merged.json",
+                ], exit_code=1)
+                with open(os.path.join(f, "merged.json"), "r") as fh:
+                    assert json.load(fh)["summary"]["num_failures"] == num_failures
+
+    def test_job_metrics_reports(self):
+        with self._isolate() as f:
+            json_path = os.path.join(TEST_DATA_DIR, "issue381.json")
+            with open(json_path, "r") as fh:
+                data = json.load(fh)
+            data["tests"][1]["data"]["job_metrics"] = {"runtime_seconds": 42.0, "cores": 1}
+            with open(os.path.join(f, "metrics.json"), "w") as fh:
+                json.dump(data, fh)
+            self._check_exit_code([
+                "test_reports", "metrics.json",
+                "--test_output", "report.html",
+                "--test_output_markdown", "report.md",
+            ], exit_code=0)
+            with open(os.path.join(f, "report.md"), "r") as fh:
+                markdown = fh.read()
+            assert "## Slowest Tests" in markdown
+            assert "| %s | 42.0 s |  |  | 1 |  |" % data["tests"][1]["id"] in markdown
+            with open(os.path.join(f, "report.html"), "r") as fh:
+                assert '"job_metrics": {"runtime_seconds": 42.0' in fh.read()
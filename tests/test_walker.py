@@ -0,0 +1,97 @@
+"""Test :class:`planemo.walker.DirectoryWalker`."""
+import os
+import shutil
+
+from planemo.io import (
+    find_matching_directories,
+    temp_directory,
+)
+from planemo.walker import (
+    directory_walker,
+    DirectoryWalker,
+)
+from .test_utils import test_context as _test_context
+
+
+def test_walker_prunes_and_sorts():
+    with temp_directory() as root:
+        _touch(root, "b/tool.xml")
+        _touch(root, "a/tool.xml")
+        _touch(root, ".git/objects/tool.xml")
+        _touch(root, "node_modules/x/tool.xml")
+        files = list(DirectoryWalker().find_files(root, "*.xml"))
+        assert files == [os.path.join(root, "a/tool.xml"), os.path.join(root, "b/tool.xml")]
+
+
+def test_walker_gitignore():
+    with temp_directory() as root:
+        _write(root, ".gitignore", "build/\n*.pyc\n!keep.pyc\n/top.xml\n")
+        _write(root, "sub/.gitignore", "local.xml\n")
+        _touch(root, "build/tool.xml")
+        _touch(root, "top.xml")
+        _touch(root, "sub/top.xml")
+        _touch(root, "sub/local.xml")
+        _touch(root, "sub/x.pyc")
+        _touch(root, "sub/keep.pyc")
+        _touch(root, "local.xml")
+        walker = DirectoryWalker(gitignore=True)
+        files = set(os.path.relpath(f, root) for f in walker.files(root))
+        assert files == set([
+            ".gitignore", "local.xml", "sub/.gitignore", "sub/top.xml", "sub/keep.pyc",
+        ]), files
+        # Without gitignore support everything is listed.
+        assert len(list(DirectoryWalker().files(root))) == 9
+
+
+def test_walker_gitignore_from_repository_root():
+    with temp_directory() as root:
+        os.makedirs(os.path.join(root, ".git"))
+        _write(root, ".gitignore", "build/\n*.pyc\n/tools/skipped.xml\n")
+        _touch(root, "tools/build/tool.xml")
+        _touch(root, "tools/x.pyc")
+        _touch(root, "tools/skipped.xml")
+        _touch(root, "tools/tool.xml")
+        walker = DirectoryWalker(gitignore=True)
+        files = list(walker.files(os.path.join(root, "tools")))
+        assert files == [os.path.join(root, "tools/tool.xml")], files
+
+
+def test_walker_skips_unreadable_directories():
+    with temp_directory() as root:
+        _touch(root, "a/tool.xml")
+        _touch(root, "b/tool.xml")
+        walker = DirectoryWalker(cache=True)
+        list(walker.walk(root))
+        # Directory removed (e.g. by another process) after its parent was
+        # listed.
+        shutil.rmtree(os.path.join(root, "a"))
+        del walker._listings[os.path.join(root, "a")]
+        files = list(walker.files(root))
+        assert files == [os.path.join(root, "b/tool.xml")]
+        assert list(DirectoryWalker().files(os.path.join(root, "missing"))) == []
+
+
+def test_walker_cached_per_context():
+    ctx = _test_context()
+    walker = directory_walker(ctx)
+    assert walker is directory_walker(ctx)
+    with temp_directory() as root:
+        _touch(root, "repo/.shed.yml")
+        assert find_matching_directories(root, ".shed.yml", True, walker=walker) == [os.path.join(root, "repo")]
+        # Listings are reused for the rest of the invocation.
+        _touch(root, "other/.shed.yml")
+        assert len(find_matching_directories(root, ".shed.yml", True, walker=walker)) == 1
+        assert len(find_matching_directories(root, ".shed.yml", True)) == 2
+
+
+def _touch(root, relative_path):
+    _write(root, relative_path, "")
+
+
+def _write(root, relative_path, contents):
+    path = os.path.join(root, relative_path)
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, "w") as f:
+        f.write(contents)
@@ -2,7 +2,10 @@ import os
 import sys
 from xml.etree import ElementTree
 
-from planemo.xml.diff import diff
+from planemo.xml.diff import (
+    canonical_hash,
+    diff,
+)
 from .test_utils import TEST_DIR
 
 
@@ -45,5 +48,26 @@ def _check(reporter):
                 reporter)
 
 
+def test_diff_ignore_attributes():
+    ignore = {"repository": ["changeset_revision", "toolshed"]}
+    assert not diff(_root("repository_dependencies.xml"),
+                    _root("repository_dependencies_shed.xml"),
+                    ignore_attributes=ignore)
+    assert canonical_hash(ElementTree.fromstring('<moo a="1" b="2"> cow </moo>')) == \
+        canonical_hash(ElementTree.fromstring('<moo b="2" a="1">cow</moo>'))
+
+
+def test_diff_full():
+    messages = []
+    assert diff(ElementTree.fromstring('<moo><c a="1"/><c>x</c><d/></moo>'),
+                ElementTree.fromstring('<moo><c a="2"/><c>y</c></moo>'),
+                messages.append,
+                full=True)
+    assert len(messages) == 3, messages
+    assert "children length differs at /moo" in messages[0]
+    assert "/moo/c[1]" in messages[1]
+    assert "/moo/c[2]" in messages[2]
+
+
 def _root(*args):
     return ElementTree.parse(os.path.join(TEST_DIR, *args)).getroot()